@@ -0,0 +1,66 @@
+"""add_analytics_rollup_tables
+
+Revision ID: 69fcbd611a3b
+Revises: f93aebd9ac90
+Create Date: 2026-10-17 09:12:40.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '69fcbd611a3b'
+down_revision: Union[str, None] = 'f93aebd9ac90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Daily booking rollup keyed by (day, listing, owner, status)
+    op.create_table(
+        'daily_metrics',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('listing_id', sa.Integer(), sa.ForeignKey('listings.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(50), nullable=False),
+        sa.Column('bookings', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('amount', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('day', 'listing_id', 'owner_id', 'status'),
+    )
+    op.create_index('ix_daily_metrics_owner_id_day', 'daily_metrics', ['owner_id', 'day'], unique=False)
+    op.create_index('ix_daily_metrics_listing_id', 'daily_metrics', ['listing_id'], unique=False)
+
+    # Daily signups rollup
+    op.create_table(
+        'daily_signups',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('users', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    # Backfill from historical data (same as `python -m apps.core.rollups --rebuild`)
+    op.execute("""
+        INSERT INTO daily_metrics (day, listing_id, owner_id, status, bookings, amount)
+        SELECT CAST(b.created_at AS DATE), b.listing_id, l.owner_id, COALESCE(b.status, 'unknown'),
+               COUNT(b.id), COALESCE(SUM(b.amount), 0)
+        FROM bookings b
+        JOIN listings l ON b.listing_id = l.id
+        WHERE b.created_at IS NOT NULL
+        GROUP BY CAST(b.created_at AS DATE), b.listing_id, l.owner_id, COALESCE(b.status, 'unknown')
+    """)
+    op.execute("""
+        INSERT INTO daily_signups (day, users)
+        SELECT CAST(date_joined AS DATE), COUNT(id)
+        FROM users
+        WHERE date_joined IS NOT NULL
+        GROUP BY CAST(date_joined AS DATE)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('daily_signups')
+    op.drop_index('ix_daily_metrics_listing_id', table_name='daily_metrics')
+    op.drop_index('ix_daily_metrics_owner_id_day', table_name='daily_metrics')
+    op.drop_table('daily_metrics')
@@ -0,0 +1,53 @@
+"""add_catalog_versions
+
+Revision ID: a6d2f8c1e4b7
+Revises: e5b9d2a7c4f3
+Create Date: 2026-10-17 21:04:37.118205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d2f8c1e4b7'
+down_revision: Union[str, None] = 'e5b9d2a7c4f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CATALOG_TABLES = ('listings', 'faculty')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'catalog_versions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('changed_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.execute("INSERT INTO catalog_versions (id) VALUES (1)")
+
+    # Once per statement (COPY, cascades and TRUNCATE included), not per row
+    op.execute("""
+        CREATE FUNCTION bump_catalog_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO catalog_versions (id, version, changed_at) VALUES (1, 1, now())
+            ON CONFLICT (id) DO UPDATE SET version = catalog_versions.version + 1, changed_at = now();
+            RETURN NULL;
+        END $$
+    """)
+    for table in CATALOG_TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_catalog_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version()
+        """)
+
+
+def downgrade() -> None:
+    for table in CATALOG_TABLES:
+        op.execute(f"DROP TRIGGER {table}_catalog_version ON {table}")
+    op.execute("DROP FUNCTION bump_catalog_version()")
+    op.drop_table('catalog_versions')
@@ -0,0 +1,55 @@
+"""add_query_pattern_indexes
+
+Revision ID: a9e3c7f1d2b8
+Revises: f2c5d8a1b7e4
+Create Date: 2026-10-17 15:04:51.372816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e3c7f1d2b8'
+down_revision: Union[str, None] = 'f2c5d8a1b7e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bookings of a listing by status, and the owners' pending inbox
+    op.create_index('ix_bookings_listing_id_status', 'bookings', ['listing_id', 'status'], unique=False)
+    op.create_index('ix_bookings_pending', 'bookings', ['listing_id', 'created_at', 'id'], unique=False,
+                    postgresql_where=sa.text("status = 'pending'"))
+    # A user's bookings (also the ON DELETE CASCADE from users)
+    op.create_index('ix_bookings_user_id_created_at_id', 'bookings', ['user_id', 'created_at', 'id'], unique=False)
+    # Admin listing / export by date, alone and behind the status filter; payment verification queue
+    op.create_index('ix_bookings_created_at_id', 'bookings', ['created_at', 'id'], unique=False)
+    op.create_index('ix_bookings_status_created_at_id', 'bookings', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_bookings_payment_pending', 'bookings', ['created_at', 'id'], unique=False,
+                    postgresql_where=sa.text("payment_status = 'pending'"))
+
+    op.create_index(op.f('ix_users_date_joined'), 'users', ['date_joined'], unique=False)
+    op.create_index(op.f('ix_faculty_listing_id'), 'faculty', ['listing_id'], unique=False)
+
+    op.create_check_constraint('ck_bookings_quantity_positive', 'bookings', 'quantity >= 1')
+    op.create_check_constraint('ck_bookings_amount_not_negative', 'bookings', 'amount >= 0')
+    op.create_check_constraint('ck_listings_price_not_negative', 'listings', 'price >= 0')
+
+
+def downgrade() -> None:
+    op.drop_constraint('ck_listings_price_not_negative', 'listings', type_='check')
+    op.drop_constraint('ck_bookings_amount_not_negative', 'bookings', type_='check')
+    op.drop_constraint('ck_bookings_quantity_positive', 'bookings', type_='check')
+
+    op.drop_index(op.f('ix_faculty_listing_id'), table_name='faculty')
+    op.drop_index(op.f('ix_users_date_joined'), table_name='users')
+
+    op.drop_index('ix_bookings_payment_pending', table_name='bookings')
+    op.drop_index('ix_bookings_status_created_at_id', table_name='bookings')
+    op.drop_index('ix_bookings_created_at_id', table_name='bookings')
+    op.drop_index('ix_bookings_user_id_created_at_id', table_name='bookings')
+    op.drop_index('ix_bookings_pending', table_name='bookings')
+    op.drop_index('ix_bookings_listing_id_status', table_name='bookings')
@@ -0,0 +1,47 @@
+"""add_email_outbox
+
+Revision ID: b5d2f8e4c1a3
+Revises: a9e3c7f1d2b8
+Create Date: 2026-10-17 15:48:12.604391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d2f8e4c1a3'
+down_revision: Union[str, None] = 'a9e3c7f1d2b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('email_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('to_address', sa.String(length=256), nullable=False),
+    sa.Column('subject', sa.String(length=255), nullable=False),
+    sa.Column('html', sa.Text(), nullable=False),
+    sa.Column('dedup_key', sa.String(length=255), nullable=True),
+    sa.Column('status', sa.String(length=20), server_default='pending', nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_email_outbox_dedup_key', 'email_outbox', ['dedup_key'], unique=True)
+    op.create_index('ix_email_outbox_due', 'email_outbox', ['next_attempt_at', 'id'], unique=False,
+                    postgresql_where=sa.text("status = 'pending'"))
+    op.create_index('ix_email_outbox_sent_at', 'email_outbox', ['sent_at'], unique=False,
+                    postgresql_where=sa.text("status = 'sent'"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_email_outbox_sent_at', table_name='email_outbox')
+    op.drop_index('ix_email_outbox_due', table_name='email_outbox')
+    op.drop_index('ix_email_outbox_dedup_key', table_name='email_outbox')
+    op.drop_table('email_outbox')
@@ -0,0 +1,26 @@
+"""add_token_version_to_users
+
+Revision ID: b7d41e2c9a05
+Revises: 69fcbd611a3b
+Create Date: 2026-10-17 10:03:27.514862
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41e2c9a05'
+down_revision: Union[str, None] = '69fcbd611a3b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,43 @@
+"""add_listings_pagination_indexes
+
+Revision ID: c3f8a9d1e6b2
+Revises: b7d41e2c9a05
+Create Date: 2026-10-17 11:26:08.941530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a9d1e6b2'
+down_revision: Union[str, None] = 'b7d41e2c9a05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # (sort column, id) for each sort key of GET /listings/, alone and behind the type / owner filters
+    op.create_index('ix_listings_created_at_id', 'listings', ['created_at', 'id'], unique=False)
+    op.create_index('ix_listings_price_id', 'listings', ['price', 'id'], unique=False)
+    op.create_index('ix_listings_type_created_at_id', 'listings', ['type', 'created_at', 'id'], unique=False)
+    op.create_index('ix_listings_type_price_id', 'listings', ['type', 'price', 'id'], unique=False)
+    op.create_index('ix_listings_owner_id_created_at_id', 'listings', ['owner_id', 'created_at', 'id'], unique=False)
+
+    # features @> ARRAY[...] and location ILIKE '%...%'
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_listings_features', 'listings', ['features'], unique=False, postgresql_using='gin')
+    op.create_index('ix_listings_location_trgm', 'listings', ['location'], unique=False, postgresql_using='gin',
+                    postgresql_ops={'location': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_listings_location_trgm', table_name='listings')
+    op.drop_index('ix_listings_features', table_name='listings')
+    op.drop_index('ix_listings_owner_id_created_at_id', table_name='listings')
+    op.drop_index('ix_listings_type_price_id', table_name='listings')
+    op.drop_index('ix_listings_type_created_at_id', table_name='listings')
+    op.drop_index('ix_listings_price_id', table_name='listings')
+    op.drop_index('ix_listings_created_at_id', table_name='listings')
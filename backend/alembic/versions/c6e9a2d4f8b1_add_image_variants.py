@@ -0,0 +1,31 @@
+"""add_image_variants
+
+Revision ID: c6e9a2d4f8b1
+Revises: b5d2f8e4c1a3
+Create Date: 2026-10-17 16:42:37.218504
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e9a2d4f8b1'
+down_revision: Union[str, None] = 'b5d2f8e4c1a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('listings', sa.Column('image_variants', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column('faculty', sa.Column('image_variants', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column('users', sa.Column('profile_image_variants', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'profile_image_variants')
+    op.drop_column('faculty', 'image_variants')
+    op.drop_column('listings', 'image_variants')
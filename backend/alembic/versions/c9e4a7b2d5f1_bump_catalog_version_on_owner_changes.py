@@ -0,0 +1,44 @@
+"""bump_catalog_version_on_owner_changes
+
+Revision ID: c9e4a7b2d5f1
+Revises: a6d2f8c1e4b7
+Create Date: 2026-10-17 23:41:09.552870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e4a7b2d5f1'
+down_revision: Union[str, None] = 'a6d2f8c1e4b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The owner card embedded in the listing responses (ListingOwnerInfo)
+OWNER_CARD_COLUMNS = ('first_name', 'last_name', 'profile_image', 'profile_image_variants')
+
+
+def upgrade() -> None:
+    # Only listing owners, and only when their card changes: logins (last_login, updated_at) don't count
+    op.execute("""
+        CREATE FUNCTION bump_catalog_version_for_owner() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM listings WHERE owner_id = NEW.id) THEN
+                INSERT INTO catalog_versions (id, version, changed_at) VALUES (1, 1, now())
+                ON CONFLICT (id) DO UPDATE SET version = catalog_versions.version + 1, changed_at = now();
+            END IF;
+            RETURN NULL;
+        END $$
+    """)
+    changed = ' OR '.join(f'OLD.{column} IS DISTINCT FROM NEW.{column}' for column in OWNER_CARD_COLUMNS)
+    op.execute(f"""
+        CREATE TRIGGER users_catalog_version AFTER UPDATE OF {', '.join(OWNER_CARD_COLUMNS)} ON users
+        FOR EACH ROW WHEN ({changed}) EXECUTE FUNCTION bump_catalog_version_for_owner()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER users_catalog_version ON users")
+    op.execute("DROP FUNCTION bump_catalog_version_for_owner()")
@@ -0,0 +1,32 @@
+"""move_payment_images_to_storage
+
+Revision ID: d3f7b1e5a9c2
+Revises: c6e9a2d4f8b1
+Create Date: 2026-10-17 17:21:05.447136
+
+Adds the content-hash columns of payment screenshots and QR codes, which are now kept
+in the upload backend. Rows still holding base64 are moved by a separate one-off run
+(python -m apps.core.services.blobs), outside of the migration's transaction.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f7b1e5a9c2'
+down_revision: Union[str, None] = 'c6e9a2d4f8b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('bookings', sa.Column('payment_screenshot_sha256', sa.String(length=64), nullable=True))
+    op.add_column('admin_settings', sa.Column('payment_qr_code_sha256', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('admin_settings', 'payment_qr_code_sha256')
+    op.drop_column('bookings', 'payment_screenshot_sha256')
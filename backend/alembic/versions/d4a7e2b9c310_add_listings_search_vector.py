@@ -0,0 +1,44 @@
+"""add_listings_search_vector
+
+Revision ID: d4a7e2b9c310
+Revises: c3f8a9d1e6b2
+Create Date: 2026-10-17 12:08:51.207364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7e2b9c310'
+down_revision: Union[str, None] = 'c3f8a9d1e6b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('listings', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=False,
+                                        server_default=sa.text("''::tsvector")))
+
+    # Same document as ListingService.search_document
+    op.execute("""
+        UPDATE listings SET search_vector =
+            setweight(to_tsvector('english'::regconfig, coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(location, '')), 'B') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(array_to_string(features, ' '), '')), 'C') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'D')
+    """)
+
+    op.create_index('ix_listings_search_vector', 'listings', ['search_vector'], unique=False, postgresql_using='gin')
+    # pg_trgm is created by c3f8a9d1e6b2
+    op.create_index('ix_listings_name_trgm', 'listings', ['name'], unique=False, postgresql_using='gin',
+                    postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_listings_name_trgm', table_name='listings')
+    op.drop_index('ix_listings_search_vector', table_name='listings')
+    op.drop_column('listings', 'search_vector')
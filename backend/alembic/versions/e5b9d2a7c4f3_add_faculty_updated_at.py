@@ -0,0 +1,27 @@
+"""add_faculty_updated_at
+
+Revision ID: e5b9d2a7c4f3
+Revises: d3f7b1e5a9c2
+Create Date: 2026-10-17 18:47:12.603418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b9d2a7c4f3'
+down_revision: Union[str, None] = 'd3f7b1e5a9c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows start at the migration time
+    op.add_column('faculty', sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('faculty', 'updated_at')
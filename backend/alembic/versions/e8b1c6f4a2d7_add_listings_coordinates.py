@@ -0,0 +1,31 @@
+"""add_listings_coordinates
+
+Revision ID: e8b1c6f4a2d7
+Revises: d4a7e2b9c310
+Create Date: 2026-10-17 13:41:19.662085
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b1c6f4a2d7'
+down_revision: Union[str, None] = 'd4a7e2b9c310'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('listings', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('listings', sa.Column('longitude', sa.Float(), nullable=True))
+    op.create_index('ix_listings_latitude_longitude', 'listings', ['latitude', 'longitude'], unique=False)
+    # Existing listings: python -m apps.core.geocoding
+
+
+def downgrade() -> None:
+    op.drop_index('ix_listings_latitude_longitude', table_name='listings')
+    op.drop_column('listings', 'longitude')
+    op.drop_column('listings', 'latitude')
@@ -0,0 +1,27 @@
+"""add_bookings_inbox_index
+
+Revision ID: f2c5d8a1b7e4
+Revises: e8b1c6f4a2d7
+Create Date: 2026-10-17 14:22:37.105948
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c5d8a1b7e4'
+down_revision: Union[str, None] = 'e8b1c6f4a2d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Owner inbox: bookings of each of the owner's listings, by date
+    op.create_index('ix_bookings_listing_id_created_at_id', 'bookings', ['listing_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bookings_listing_id_created_at_id', table_name='bookings')
@@ -1,4 +1,5 @@
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, func, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
 from config.database import FastModel
@@ -14,6 +15,8 @@ class User(FastModel):
         password (str): Hashed password for user authentication.
         first_name (str, optional): User's first name. Default is None.
         last_name (str, optional): User's last name. Default is None.
+        profile_image (str, optional): URL of the user's profile image. Default is None.
+        profile_image_variants (list, optional): Resized copies of the profile image ({url, width, format}).
         is_verified_email (bool): Flag indicating whether the user's email address has been verified.
         is_active (bool): Flag indicating whether the user's account is active.
         is_superuser (bool): Flag indicating whether the user has superuser privileges.
@@ -21,6 +24,7 @@ class User(FastModel):
         date_joined (datetime): Timestamp indicating when the user account was created.
         updated_at (datetime, optional): Timestamp indicating when the user account was last updated. Default is None.
         last_login (datetime, optional): Timestamp indicating the user's last login time. Default is None.
+        token_version (int): Version embedded in access tokens; bumping it revokes every token issued before.
         change (relationship): Relationship attribute linking this user to change requests initiated by the user.
     """
 
@@ -35,6 +39,8 @@ class User(FastModel):
     
     # Profile image
     profile_image = Column(String(500), nullable=True)  # Cloudinary URL
+    # Resized copies of the profile image: [{"url", "width", "format"}] (see apps/core/services/images.py)
+    profile_image_variants = Column(JSONB, nullable=True)
     
     # Contact and address information
     phone_number = Column(String(20), nullable=True)
@@ -53,7 +59,10 @@ class User(FastModel):
     # For listing owners - needs admin approval
     is_approved_lister = Column(Boolean, default=False)
 
-    date_joined = Column(DateTime, server_default=func.now())
+    # Bumped on login, logout, password and permission changes (see TokenVersions)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    date_joined = Column(DateTime, server_default=func.now(), index=True)
     updated_at = Column(DateTime, nullable=True, onupdate=func.now())
     last_login = Column(DateTime, nullable=True)
 
@@ -4,8 +4,10 @@ from fastapi.security import OAuth2PasswordRequestForm
 from apps.accounts import schemas
 from apps.accounts.services.authenticate import AccountService
 from apps.accounts.services.permissions import Permission
+from apps.accounts.services.token import Principal
 from apps.accounts.services.user import User, UserManager
-from apps.core.cloudinary_service import CloudinaryService
+from apps.core.query_budget import query_budget
+from apps.core.services.uploads import UploadService
 
 router = APIRouter(
     prefix='/accounts'
@@ -37,8 +39,9 @@ activates their account.
 Please note that users cannot log in to their accounts until their email addresses are verified.
 """,
     tags=['Authentication'])
+@query_budget(5)
 async def register(payload: schemas.RegisterIn = Body(**schemas.RegisterIn.examples())):
-    return AccountService.register(**payload.model_dump(exclude={"password_confirm"}))
+    return await AccountService.register(**payload.model_dump(exclude={"password_confirm"}))
 
 
 @router.patch(
@@ -48,8 +51,9 @@ async def register(payload: schemas.RegisterIn = Body(**schemas.RegisterIn.examp
     summary='Verify user registration',
     description='Verify a new user registration by confirming the provided OTP.',
     tags=['Authentication'])
+@query_budget(6)
 async def verify_registration(payload: schemas.RegisterVerifyIn):
-    return AccountService.verify_registration(**payload.model_dump())
+    return await AccountService.verify_registration(**payload.model_dump())
 
 
 # ---------------------
@@ -64,8 +68,9 @@ async def verify_registration(payload: schemas.RegisterVerifyIn):
     summary='Login a user',
     description='Login a user with valid credentials, if user account is active.',
     tags=['Authentication'])
+@query_budget(5)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    return AccountService.login(form_data.username, form_data.password)
+    return await AccountService.login(form_data.username, form_data.password)
 
 
 @router.post(
@@ -75,8 +80,9 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     description="Logout the currently authenticated user. "
                 "Revokes the user's access token and invalidates the session.",
     tags=['Authentication'])
-async def logout(current_user: User = Depends(AccountService.current_user)):
-    AccountService.logout(current_user)
+@query_budget(3)
+async def logout(current_user: Principal = Depends(AccountService.current_principal)):
+    await AccountService.logout(current_user)
 
 
 # ------------------------
@@ -92,8 +98,9 @@ async def logout(current_user: User = Depends(AccountService.current_user)):
     description="Initiate a password reset request by sending a verification email to the user's "
                 "registered email address.",
     tags=['Authentication'])
+@query_budget(4)
 async def reset_password(payload: schemas.PasswordResetIn):
-    return AccountService.reset_password(**payload.model_dump())
+    return await AccountService.reset_password(**payload.model_dump())
 
 
 @router.patch(
@@ -104,8 +111,9 @@ async def reset_password(payload: schemas.PasswordResetIn):
     description="Verify the password reset request by confirming the provided OTP sent to the user's "
                 "registered email address. If the change is successful, the user will need to login again.",
     tags=['Authentication'])
+@query_budget(5)
 async def verify_reset_password(payload: schemas.PasswordResetVerifyIn):
-    return AccountService.verify_reset_password(**payload.model_dump(exclude={"password_confirm"}))
+    return await AccountService.verify_reset_password(**payload.model_dump(exclude={"password_confirm"}))
 
 
 # -------------------
@@ -126,8 +134,9 @@ async def verify_reset_password(payload: schemas.PasswordResetVerifyIn):
     """,
 
     tags=['Authentication'])
+@query_budget(4)
 async def resend_otp(payload: schemas.OTPResendIn = Body(**schemas.OTPResendIn.examples())):
-    AccountService.resend_otp(**payload.model_dump())
+    await AccountService.resend_otp(**payload.model_dump())
 
 
 # ---------------------
@@ -142,6 +151,7 @@ async def resend_otp(payload: schemas.OTPResendIn = Body(**schemas.OTPResendIn.e
     summary='Retrieve current user',
     description='Retrieve current user if user is active.',
     tags=['Users'])
+@query_budget(2)
 async def retrieve_me(current_user: User = Depends(AccountService.current_user)):
     return {'user': UserManager.to_dict(current_user)}
 
@@ -153,8 +163,9 @@ async def retrieve_me(current_user: User = Depends(AccountService.current_user))
     summary='Update current user',
     description='Update current user.',
     tags=['Users'])
+@query_budget(4)
 async def update_me(payload: schemas.UpdateUserIn, current_user: User = Depends(AccountService.current_user)):
-    user = UserManager.update_user(current_user.id, **payload.user.model_dump())
+    user = await UserManager.update_user(current_user.id, **payload.user.model_dump())
     return {'user': UserManager.to_dict(user)}
 
 
@@ -165,19 +176,20 @@ async def update_me(payload: schemas.UpdateUserIn, current_user: User = Depends(
     summary='Upload profile image',
     description='Upload a profile image for the current user.',
     tags=['Users'])
+@query_budget(4)
 async def upload_profile_image(
     file: UploadFile = File(...),
     current_user: User = Depends(AccountService.current_user)
 ):
-    """Upload profile image to Cloudinary and update user profile"""
-    # Upload to Cloudinary (async call)
-    result = await CloudinaryService.upload_image(file, folder="prephub/profiles")
+    """Upload profile image and update user profile"""
+    result = await UploadService.upload_image(file, folder="prephub/profiles", max_dimension=500, derivatives=True)
     
     # Get user ID (handle both User object and dict)
     user_id = current_user.id if isinstance(current_user, User) else current_user['id']
     
     # Update user with image URL
-    user = UserManager.update_user(user_id, profile_image=result['url'])
+    user = await UserManager.update_user(user_id, profile_image=result['url'],
+                                         profile_image_variants=result['variants'])
     return {'user': UserManager.to_dict(user)}
 
 
@@ -189,9 +201,10 @@ async def upload_profile_image(
     description='Change the password for the current user. If the change is successful, the user will '
                 'need to login again.',
     tags=['Users'])
+@query_budget(4)
 async def change_password(payload: schemas.PasswordChangeIn = Body(**schemas.PasswordChangeIn.examples()),
                           current_user: User = Depends(AccountService.current_user)):
-    return AccountService.change_password(current_user, **payload.model_dump(exclude={"password_confirm"}))
+    return await AccountService.change_password(current_user, **payload.model_dump(exclude={"password_confirm"}))
 
 
 @router.post(
@@ -204,8 +217,9 @@ async def change_password(payload: schemas.PasswordChangeIn = Body(**schemas.Pas
 After the new email is set, an OTP code will be sent to the new email address for verification purposes.
 """,
     tags=['Users'])
+@query_budget(5)
 async def change_email(email: schemas.EmailChangeIn, current_user: User = Depends(AccountService.current_user)):
-    return AccountService.change_email(current_user, **email.model_dump())
+    return await AccountService.change_email(current_user, **email.model_dump())
 
 
 @router.patch(
@@ -219,9 +233,10 @@ Validating the OTP code sent to the user's new email address. If the OTP is vali
 email address will be saved as the user's main email address.
 """,
     tags=['Users'])
+@query_budget(6)
 async def verify_change_email(otp: schemas.EmailChangeVerifyIn,
                               current_user: User = Depends(AccountService.current_user)):
-    return AccountService.verify_change_email(current_user, **otp.model_dump())
+    return await AccountService.verify_change_email(current_user, **otp.model_dump())
 
 
 @router.get(
@@ -233,8 +248,9 @@ async def verify_change_email(otp: schemas.EmailChangeVerifyIn,
     tags=['Users'],
     dependencies=[Depends(Permission.is_admin)]
 )
+@query_budget(1)
 async def retrieve_user(user_id: int):
-    user = UserManager.get_user_by_id(user_id)
+    user = await UserManager.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return {'user': UserManager.to_dict(user)}
@@ -252,8 +268,9 @@ async def retrieve_user(user_id: int):
     tags=['Admin'],
     dependencies=[Depends(Permission.is_admin)]
 )
+@query_budget(1)
 async def list_all_users(skip: int = 0, limit: int = 100):
-    users = UserManager.list_users(skip=skip, limit=limit)
+    users = await UserManager.list_users(skip=skip, limit=limit)
     return {"users": [schemas.UserListItem.from_user(u) for u in users], "total": len(users)}
 
 
@@ -266,13 +283,14 @@ async def list_all_users(skip: int = 0, limit: int = 100):
     tags=['Admin'],
     dependencies=[Depends(Permission.is_admin)]
 )
+@query_budget(4)
 async def update_user_role(user_id: int, payload: schemas.UpdateUserRoleIn):
-    user = UserManager.get_user_by_id(user_id)
+    user = await UserManager.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    UserManager.update_user(user_id, role=payload.role)
-    updated_user = UserManager.get_user_by_id(user_id)
+    await UserManager.update_user(user_id, role=payload.role)
+    updated_user = await UserManager.get_user_by_id(user_id)
     
     return {
         "id": updated_user.id,
@@ -291,8 +309,9 @@ async def update_user_role(user_id: int, payload: schemas.UpdateUserRoleIn):
     tags=['Admin'],
     dependencies=[Depends(Permission.is_admin)]
 )
+@query_budget(4)
 async def approve_lister(user_id: int, payload: schemas.ApproveListerIn):
-    user = UserManager.get_user_by_id(user_id)
+    user = await UserManager.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -300,8 +319,8 @@ async def approve_lister(user_id: int, payload: schemas.ApproveListerIn):
     if user.role not in ['hostel', 'coaching', 'library', 'tiffin']:
         raise HTTPException(status_code=400, detail="User must have a listing role (hostel, coaching, library, tiffin)")
     
-    UserManager.update_user(user_id, is_approved_lister=payload.approve)
-    updated_user = UserManager.get_user_by_id(user_id)
+    await UserManager.update_user(user_id, is_approved_lister=payload.approve)
+    updated_user = await UserManager.get_user_by_id(user_id)
     
     return {
         "message": f"User {'approved' if payload.approve else 'rejected'} as lister",
@@ -318,20 +337,57 @@ async def approve_lister(user_id: int, payload: schemas.ApproveListerIn):
     tags=['Admin'],
     dependencies=[Depends(Permission.is_admin)]
 )
+@query_budget(8)
 async def delete_user_account(user_id: int):
-    user = UserManager.get_user_by_id(user_id)
+    user = await UserManager.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Delete user
-    from config.database import SessionLocal
-    db = SessionLocal()
-    try:
-        db.delete(user)
-        db.commit()
+    from config.database import get_async_session
+    from apps.core.cache import AnalyticsCache
+    from apps.core.rollups import MetricsRollup
+    from apps.accounts.services.revocation import TokenVersions
+    from apps.accounts.services.user_cache import UserCache
+    async with get_async_session() as db:
+        user = await db.get(User, user_id)
+        # Bookings are removed by the FK cascade, so take them out of the rollups first
+        await MetricsRollup.forget_user_bookings(db, user.id)
+        await MetricsRollup.add_signup(db, user.date_joined, sign=-1)
+        await db.delete(user)
+        await db.commit()
+        await AnalyticsCache.invalidate_all()
+        await TokenVersions.forget(user_id)
+        UserCache.invalidate(user_id)
         return {"message": f"User {user.email} deleted successfully"}
-    finally:
-        db.close()
+
+
+@router.get(
+    '/admin/auth-cache',
+    status_code=status.HTTP_200_OK,
+    summary='Authenticated-user cache stats',
+    description='Hit / miss / eviction counters of the per-worker authenticated-user cache. Admin only.',
+    tags=['Admin'],
+    dependencies=[Depends(Permission.is_admin)]
+)
+@query_budget(0)
+async def auth_cache_stats():
+    from apps.accounts.services.user_cache import UserCache
+    return UserCache.stats()
+
+
+@router.get(
+    '/admin/password-pool',
+    status_code=status.HTTP_200_OK,
+    summary='Password hashing pool stats',
+    description='Concurrency, queueing and rejection counters of the bcrypt hashing pool. Admin only.',
+    tags=['Admin'],
+    dependencies=[Depends(Permission.is_admin)]
+)
+@query_budget(0)
+async def password_pool_stats():
+    from apps.accounts.services.password import PasswordManager
+    return PasswordManager.pool.stats()
 
 
 @router.get(
@@ -343,20 +399,26 @@ async def delete_user_account(user_id: int):
     tags=['Admin'],
     dependencies=[Depends(Permission.is_admin)]
 )
+@query_budget(2)
 async def get_user_details(user_id: int):
-    from config.database import SessionLocal
+    from sqlalchemy import select
+    from config.database import get_async_session
     from apps.bookings.models import Booking
     from apps.listings.models import Listing
     from apps.core.date_time import DateTime
     
-    db = SessionLocal()
-    try:
-        user = UserManager.get_user_by_id(user_id)
+    async with get_async_session() as db:
+        user = await UserManager.get_user_by_id(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Get all bookings for this user
-        bookings = db.query(Booking).filter(Booking.user_id == user_id).all()
+        # Get all bookings for this user, with the name and type of their listing (one query)
+        rows = (await db.execute(
+            select(Booking, Listing.name, Listing.type)
+            .outerjoin(Listing, Listing.id == Booking.listing_id)
+            .where(Booking.user_id == user_id)
+        )).all()
+        bookings = [booking for booking, _, _ in rows]
         
         # Calculate stats
         stats = schemas.UserStats(
@@ -369,13 +431,12 @@ async def get_user_details(user_id: int):
         
         # Format bookings with listing info
         booking_info = []
-        for booking in bookings:
-            listing = db.query(Listing).filter(Listing.id == booking.listing_id).first()
+        for booking, listing_name, listing_type in rows:
             booking_info.append(schemas.UserBookingInfo(
                 id=booking.id,
                 listing_id=booking.listing_id,
-                listing_name=listing.name if listing else "Unknown",
-                listing_type=listing.type if listing else "Unknown",
+                listing_name=listing_name or "Unknown",
+                listing_type=listing_type or "Unknown",
                 status=booking.status,
                 amount=float(booking.amount),
                 payment_id=booking.payment_id,
@@ -402,8 +463,6 @@ async def get_user_details(user_id: int):
             stats=stats,
             bookings=booking_info
         )
-    finally:
-        db.close()
 
 
 # TODO DELETE /accounts/me
@@ -93,6 +93,7 @@ class UserOut(BaseModel):
     is_superuser: bool
     is_approved_lister: bool = False
     profile_image: str | None = None
+    profile_image_srcset: dict[str, str] | None = None
     phone_number: str | None = None
     address: str | None = None
     city: str | None = None
@@ -303,6 +304,8 @@ class UserSchema(BaseModel):
     first_name: str | None
     last_name: str | None
     profile_image: str | None = None
+    # `srcset` of the resized copies of `profile_image`, per format (avif, webp)
+    profile_image_srcset: dict[str, str] | None = None
     phone_number: str | None = None
     address: str | None = None
     city: str | None = None
@@ -3,9 +3,11 @@ from fastapi.security import OAuth2PasswordBearer
 
 from apps.accounts.models import User
 from apps.accounts.services.password import PasswordManager
-from apps.accounts.services.token import TokenService
+from apps.accounts.services.token import Principal, TokenService
 from apps.accounts.services.user import UserManager
+from apps.core.cache import AnalyticsCache
 from apps.core.date_time import DateTime
+from apps.core.services.images import ImageDerivatives
 from apps.core.services.email_manager import EmailService
 
 
@@ -16,21 +18,31 @@ class AccountService:
         user = await TokenService.fetch_user(token)
         return user
 
+    @classmethod
+    async def current_principal(cls, token: str = Depends(OAuth2PasswordBearer(tokenUrl="accounts/login"))) -> Principal:
+        """
+        Lightweight alternative to `current_user` for endpoints that only need the caller's id, role and
+        flags: in stateless auth mode it is resolved from the token without touching the database.
+        """
+        return await TokenService.fetch_principal(token)
+
     # ----------------
     # --- Register ---
     # ----------------
 
     @classmethod
-    def register(cls, email: str, password: str):
-        if UserManager.get_user(email=email):
+    async def register(cls, email: str, password: str):
+        if await UserManager.get_user(email=email):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="This email has already been taken."
             )
 
-        new_user = UserManager.create_user(email=email, password=password)
-        TokenService(new_user.id).request_is_register()
-        EmailService.register_send_verification_email(new_user.email)
+        hashed_password = await PasswordManager.hash_password_async(password)
+        new_user = await UserManager.create_user(email=email, hashed_password=hashed_password)
+        await AnalyticsCache.invalidate_users()
+        await TokenService(new_user.id).request_is_register()
+        await EmailService.register_send_verification_email(new_user.email)
 
         return {
             'email': new_user.email,
@@ -38,8 +50,8 @@ class AccountService:
         }
 
     @classmethod
-    def verify_registration(cls, email: str, otp: str):
-        user = UserManager.get_user(email=email)
+    async def verify_registration(cls, email: str, otp: str):
+        user = await UserManager.get_user(email=email)
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
 
@@ -56,17 +68,17 @@ class AccountService:
                 detail="Invalid OTP code. Please double-check and try again."
             )
 
-        UserManager.update_user(
+        await UserManager.update_user(
             user.id,
             is_verified_email=True,
             is_active=True,
             last_login=DateTime.now()
         )
 
-        token.reset_otp_token_type()
+        await token.reset_otp_token_type()
 
         return {
-            'access_token': token.create_access_token(),
+            'access_token': await token.create_access_token(),
             'message': 'Your email address has been confirmed. Account activated successfully.'
         }
 
@@ -75,8 +87,8 @@ class AccountService:
     # -------------
 
     @classmethod
-    def login(cls, email: str, password: str):
-        user = cls.authenticate_user(email, password)
+    async def login(cls, email: str, password: str):
+        user = await cls.authenticate_user(email, password)
         token = TokenService(user)
 
         if not user:
@@ -88,10 +100,10 @@ class AccountService:
         if not user.is_verified_email:
             raise HTTPException(status_code=403, detail="Unverified email address.")
 
-        UserManager.update_last_login(user.id)
+        await UserManager.update_last_login(user.id)
 
         return {
-            "access_token": token.create_access_token(),
+            "access_token": await token.create_access_token(),
             "token_type": "bearer",
             "user": {
                 "id": user.id,
@@ -101,6 +113,7 @@ class AccountService:
                 "is_superuser": bool(user.is_superuser),
                 "is_approved_lister": getattr(user, 'is_approved_lister', False),
                 "profile_image": user.profile_image,
+                "profile_image_srcset": ImageDerivatives.srcset(user.profile_image_variants),
                 "phone_number": user.phone_number,
                 "address": user.address,
                 "city": user.city,
@@ -110,11 +123,11 @@ class AccountService:
         }
 
     @classmethod
-    def authenticate_user(cls, email: str, password: str):
-        user = UserManager.get_user(email=email)
+    async def authenticate_user(cls, email: str, password: str):
+        user = await UserManager.get_user(email=email)
         if not user:
             return False
-        if not PasswordManager.verify_password(password, user.password):
+        if not await PasswordManager.verify_password_async(password, user.password):
             return False
         return user
 
@@ -123,17 +136,17 @@ class AccountService:
     # --------------
 
     @classmethod
-    def logout(cls, user: User):
+    async def logout(cls, user: User | Principal):
         token = TokenService(user)
-        token.revoke_access_token()
+        await token.revoke_access_token()
 
     # ----------------------
     # --- Reset Password ---
     # ----------------------
 
     @classmethod
-    def reset_password(cls, email: str):
-        user = UserManager.get_user(email=email)
+    async def reset_password(cls, email: str):
+        user = await UserManager.get_user(email=email)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -146,16 +159,16 @@ class AccountService:
                 detail="Email not verified. Please verify your email first."
             )
 
-        TokenService(user.id).request_is_reset_password()
-        EmailService.reset_password_send_verification_email(user.email)
+        await TokenService(user.id).request_is_reset_password()
+        await EmailService.reset_password_send_verification_email(user.email)
 
         return {
             'message': 'Password reset OTP has been sent to your email address.'
         }
 
     @classmethod
-    def verify_reset_password(cls, email: str, otp: str, password: str):
-        user = UserManager.get_user(email=email)
+    async def verify_reset_password(cls, email: str, otp: str, password: str):
+        user = await UserManager.get_user(email=email)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -169,10 +182,10 @@ class AccountService:
                 detail="Invalid OTP code. Please double-check and try again."
             )
 
-        # Update password (update_user handles hashing)
-        UserManager.update_user(user.id, password=password)
+        # Hash on the password pool, off the event loop
+        await UserManager.update_user(user.id, hashed_password=await PasswordManager.hash_password_async(password))
 
-        token.reset_otp_token_type()
+        await token.reset_otp_token_type()
 
         return {
             'message': 'Your password has been reset successfully. Please login with your new password.'
@@ -183,19 +196,19 @@ class AccountService:
     # -----------------------
 
     @classmethod
-    def change_password(cls, user: User, current_password: str, password: str):
-        if not PasswordManager.verify_password(current_password, user.password):
+    async def change_password(cls, user: User, current_password: str, password: str):
+        if not await PasswordManager.verify_password_async(current_password, user.password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Current password is incorrect."
             )
 
-        # Update password (update_user handles hashing)
-        UserManager.update_user(user.id, password=password)
+        # Hash on the password pool, off the event loop
+        await UserManager.update_user(user.id, hashed_password=await PasswordManager.hash_password_async(password))
 
         # Revoke current token so user needs to login again
         token = TokenService(user)
-        token.revoke_access_token()
+        await token.revoke_access_token()
 
         return {
             'message': 'Password changed successfully. Please login with your new password.'
@@ -206,22 +219,22 @@ class AccountService:
     # --------------------
 
     @classmethod
-    def change_email(cls, user: User, new_email: str):
-        if UserManager.get_user(email=new_email):
+    async def change_email(cls, user: User, new_email: str):
+        if await UserManager.get_user(email=new_email):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="This email is already in use."
             )
 
-        TokenService(user.id).request_is_change_email(new_email)
-        EmailService.change_email_send_verification_email(new_email)
+        await TokenService(user.id).request_is_change_email(new_email)
+        await EmailService.change_email_send_verification_email(new_email)
 
         return {
             'message': 'Verification OTP has been sent to your new email address.'
         }
 
     @classmethod
-    def verify_change_email(cls, user: User, otp: str):
+    async def verify_change_email(cls, user: User, otp: str):
         token = TokenService(user=user)
         if not token.validate_otp_token(otp):
             raise HTTPException(
@@ -229,15 +242,15 @@ class AccountService:
                 detail="Invalid OTP code. Please double-check and try again."
             )
 
-        new_email = token.get_new_email()
+        new_email = await token.get_new_email()
         if not new_email:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No email change request found."
             )
 
-        UserManager.update_user(user.id, email=new_email)
-        token.reset_otp_token_type()
+        await UserManager.update_user(user.id, email=new_email)
+        await token.reset_otp_token_type()
 
         return {
             'message': 'Email address updated successfully.'
@@ -248,8 +261,8 @@ class AccountService:
     # -----------------
 
     @classmethod
-    def resend_otp(cls, request_type: str, email: str):
-        user = UserManager.get_user(email=email)
+    async def resend_otp(cls, request_type: str, email: str):
+        user = await UserManager.get_user(email=email)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -262,17 +275,17 @@ class AccountService:
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Email is already verified."
                 )
-            TokenService(user.id).request_is_register()
-            EmailService.register_send_verification_email(user.email)
+            await TokenService(user.id).request_is_register()
+            await EmailService.register_send_verification_email(user.email)
         elif request_type == "reset-password":
-            TokenService(user.id).request_is_reset_password()
-            EmailService.reset_password_send_verification_email(user.email)
+            await TokenService(user.id).request_is_reset_password()
+            await EmailService.reset_password_send_verification_email(user.email)
         elif request_type == "change-email":
             token = TokenService(user=user)
-            new_email = token.get_new_email()
+            new_email = await token.get_new_email()
             if not new_email:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="No email change request found."
                 )
-            EmailService.change_email_send_verification_email(new_email)
+            await EmailService.change_email_send_verification_email(new_email)
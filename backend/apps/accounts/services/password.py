@@ -1,12 +1,97 @@
+import asyncio
 import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
 
 from fastapi import HTTPException
 from passlib.context import CryptContext
 from starlette import status
 
+from config.settings import PASSWORD_HASH_MAX_QUEUE, PASSWORD_HASH_WORKERS
+
+
+class HashingPool:
+    """
+    Bounded thread pool for bcrypt.
+
+    A bcrypt round takes a few hundred milliseconds of CPU and releases the GIL, so running it
+    on worker threads keeps the event loop free and lets concurrent logins use every core. At
+    most ``workers`` calls run at once and at most ``max_queue`` more may wait; anything beyond
+    that is rejected with 503 so a login burst can't build an unbounded backlog.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = max(1, workers)
+        self.max_pending = self.workers + max(0, max_queue)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.peak_pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many authentication requests. Please try again shortly.",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+            self.submitted += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+
+        future = self.executor.submit(self._timed, func, args, time.perf_counter())
+        # Released when the call really ends: a cancelled request leaves bcrypt running on its thread
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future: Future):
+        with self._lock:
+            self.pending -= 1
+
+    def _timed(self, func: Callable[..., Any], args: tuple, queued_at: float) -> Any:
+        started_at = time.perf_counter()
+        with self._lock:
+            self.running += 1
+            self.wait_seconds += started_at - queued_at
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.run_seconds += time.perf_counter() - started_at
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self.completed
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "peak_pending": self.peak_pending,
+                "submitted": self.submitted,
+                "completed": completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.wait_seconds / completed * 1000, 2) if completed else 0.0,
+                "avg_run_ms": round(self.run_seconds / completed * 1000, 2) if completed else 0.0,
+            }
+
 
 class PasswordManager:
     password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pool = HashingPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
     min_length: int = 8
     max_length: int = 24
 
@@ -74,3 +159,13 @@ class PasswordManager:
     @classmethod
     def verify_password(cls, plain_password: str, hashed_password: str):
         return cls.password_context.verify(plain_password, hashed_password)
+
+    # Async variants run on the hashing pool; use them from request handlers
+
+    @classmethod
+    async def hash_password_async(cls, password: str) -> str:
+        return await cls.pool.run(cls.hash_password, password)
+
+    @classmethod
+    async def verify_password_async(cls, plain_password: str, hashed_password: str) -> bool:
+        return await cls.pool.run(cls.verify_password, plain_password, hashed_password)
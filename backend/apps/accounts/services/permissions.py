@@ -1,12 +1,12 @@
 from fastapi import HTTPException, status, Depends
 
-from apps.accounts.models import User
 from apps.accounts.services.authenticate import AccountService
+from apps.accounts.services.token import Principal
 
 
 class Permission:
     @classmethod
-    async def is_admin(cls, current_user: User = Depends(AccountService.current_user)):
+    async def is_admin(cls, current_user: Principal = Depends(AccountService.current_principal)):
         if current_user.role != 'admin':
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
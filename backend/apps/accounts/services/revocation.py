@@ -0,0 +1,78 @@
+"""
+Token-version store used by stateless authentication.
+
+Every user has a ``token_version`` that is embedded in the access tokens issued to
+them. Login, logout, password and permission changes bump the version, which
+revokes every token carrying an older one. Instead of reading the version from the
+database on each request, it is kept in a small cache:
+
+- token version == cached version -> valid, no query
+- token version <  cached version -> revoked
+- token version >  cached version (or not cached) -> re-read once from ``users``
+
+With the default in-process store a revocation made by one worker is seen by the
+others after at most ``AUTH_REVOCATION_TTL`` seconds; set ``AUTH_REVOCATION_URL`` to
+share the store between workers. Store calls go through the backend's awaitable methods,
+so a slow Redis holds up only the request waiting on it, never the event loop.
+"""
+
+from typing import Optional
+
+from sqlalchemy import select
+
+from apps.accounts.models import User
+from apps.core.cache import CacheBackend, MemoryCache, RedisCache
+from apps.core.logger import log
+from config.database import get_async_session
+from config.settings import AUTH_REVOCATION_MAX_ENTRIES, AUTH_REVOCATION_TTL, AUTH_REVOCATION_URL
+
+
+class TokenVersions:
+    """user_id -> current token version."""
+
+    store: CacheBackend = (
+        RedisCache.from_url(AUTH_REVOCATION_URL, prefix="sk-mvp:token-version:")
+        if AUTH_REVOCATION_URL else MemoryCache(AUTH_REVOCATION_MAX_ENTRIES)
+    )
+
+    @classmethod
+    async def is_current(cls, user_id: int, version: int) -> bool:
+        """True if a token carrying ``version`` has not been revoked for this user."""
+        current = await cls.get(user_id)
+        if current is None or version > current:
+            # Unknown user or a newer token issued by another worker: consult the database
+            current = await cls.load(user_id)
+        return current is not None and version == current
+
+    @classmethod
+    async def get(cls, user_id: int) -> Optional[int]:
+        try:
+            return await cls.store.aget(str(user_id))
+        except Exception as e:
+            log.error("Token version store read failed", category="AUTH", user_id=user_id, error=str(e))
+            return None
+
+    @classmethod
+    async def set(cls, user_id: int, version: int):
+        try:
+            await cls.store.aset(str(user_id), version, AUTH_REVOCATION_TTL)
+        except Exception as e:
+            log.error("Token version store write failed", category="AUTH", user_id=user_id, error=str(e))
+
+    @classmethod
+    async def forget(cls, user_id: int):
+        """Drop the cached version, e.g. after the user has been deleted."""
+        try:
+            await cls.store.adelete(str(user_id))
+        except Exception as e:
+            log.error("Token version store delete failed", category="AUTH", user_id=user_id, error=str(e))
+
+    @classmethod
+    async def load(cls, user_id: int) -> Optional[int]:
+        """Read the version from the database and cache it; ``None`` if the user doesn't exist."""
+        async with get_async_session() as db:
+            version = (await db.execute(select(User.token_version).where(User.id == user_id))).scalar_one_or_none()
+
+        if version is not None:
+            await cls.set(user_id, version)
+        return version
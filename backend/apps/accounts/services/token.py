@@ -1,4 +1,6 @@
+from dataclasses import dataclass
 from datetime import timedelta, datetime
+from typing import Any, Dict, Tuple
 
 from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -6,8 +8,49 @@ from jose import JWTError, jwt
 from pyotp import TOTP
 
 from apps.accounts.models import User, UserVerification
+from apps.accounts.services.revocation import TokenVersions
+from apps.accounts.services.user_cache import CachedUser, UserCache
 from apps.accounts.services.user import UserManager
-from config.settings import AppConfig
+from config.settings import AUTH_MODE, AppConfig
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    The authenticated caller, built from the access token claims.
+
+    Exposes the same attribute names as `User` for the fields routers check (id, role,
+    is_active, is_superuser, is_approved_lister), without loading the user row.
+    """
+
+    id: int
+    role: str
+    is_active: bool
+    is_superuser: bool
+    is_approved_lister: bool
+    token_version: int
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            role=user.role,
+            is_active=bool(user.is_active),
+            is_superuser=bool(user.is_superuser),
+            is_approved_lister=bool(user.is_approved_lister),
+            token_version=user.token_version or 0,
+        )
+
+    @classmethod
+    def from_claims(cls, payload: Dict[str, Any]) -> "Principal":
+        return cls(
+            id=payload["user_id"],
+            role=payload["role"],
+            is_active=payload["is_active"],
+            is_superuser=payload["is_superuser"],
+            is_approved_lister=payload["is_approved_lister"],
+            token_version=payload["ver"],
+        )
 
 
 class TokenService:
@@ -26,11 +69,14 @@ class TokenService:
                                           detail="Could not validate credentials.",
                                           headers={"WWW-Authenticate": "Bearer"})
 
-    def __init__(self, user: int | User | None = None):
+    def __init__(self, user: int | User | Principal | None = None):
         if user is not None:
             if isinstance(user, User):
                 self.user = user
                 self.user_id = user.id
+            elif isinstance(user, Principal):
+                self.user = None
+                self.user_id = user.id
             else:
                 self.user = None
                 self.user_id = user
@@ -49,79 +95,166 @@ class TokenService:
     wants to log out of the system, the current token will no longer be valid.
     """
 
-    def create_access_token(self) -> str:
+    async def create_access_token(self) -> str:
         """
         Create a new access token for the provided user.
 
+        The user's token version is bumped first, so the previously issued token stops being valid
+        (one active token per user, as with the stored `active_access_token`). The user's claims are
+        read in the same query and embedded in the token for stateless authentication.
+
         Returns:
             str: Access token string.
         """
 
+        claims = await UserManager.rotate_token_version(self.user_id)
+        if claims is None:
+            raise self.credentials_exception
+
         # --- set data to encode ---
-        to_encode = {'user_id': self.user_id}
+        now = datetime.utcnow()
+        to_encode = {
+            'user_id': self.user_id,
+            'role': claims.role,
+            'is_active': bool(claims.is_active),
+            'is_superuser': bool(claims.is_superuser),
+            'is_approved_lister': bool(claims.is_approved_lister),
+            'ver': claims.token_version,
+            'iat': now,
+        }
 
         # --- set expire date ---
-        to_encode.update({"exp": datetime.utcnow() + timedelta(self.app_config.access_token_expire_minutes)})
+        to_encode.update({"exp": now + timedelta(self.app_config.access_token_expire_minutes)})
 
         # --- generate access token ---
         access_token = jwt.encode(to_encode, self.app_config.secret_key, algorithm=self.ALGORITHM)
 
-        self.update_access_token(access_token)
+        # --- kept up to date so AUTH_MODE=stateful keeps working with the same tokens ---
+        await self.update_access_token(access_token)
         return access_token
 
-    def update_access_token(self, token: str):
-        UserVerification.update(UserVerification.filter(UserVerification.user_id == self.user_id).first().id,
-                                active_access_token=token)
+    async def update_access_token(self, token: str):
+        verification = await UserVerification.afirst(UserVerification.user_id == self.user_id)
+        await UserVerification.aupdate(verification.id, active_access_token=token)
+        UserCache.invalidate(self.user_id)
 
-    def reset_access_token(self):
-        UserVerification.update(UserVerification.filter(UserVerification.user_id == self.user_id).first().id,
-                                active_access_token=None)
+    async def reset_access_token(self):
+        verification = await UserVerification.afirst(UserVerification.user_id == self.user_id)
+        await UserVerification.aupdate(verification.id, active_access_token=None)
+        UserCache.invalidate(self.user_id)
 
-    def revoke_access_token(self):
+    async def revoke_access_token(self):
         """
         Revoke the current access token (used for logout).
         """
-        self.reset_access_token()
+        await self.reset_access_token()
+        await UserManager.rotate_token_version(self.user_id)
 
     @classmethod
-    async def fetch_user(cls, token: str) -> User:
+    def decode_token(cls, token: str) -> Dict[str, Any]:
         """
-        Retrieve the user associated with the provided JWT token.
+        Validate the signature and expiry of a JWT token and return its payload.
+        """
+
+        try:
+            payload = jwt.decode(token, cls.app_config.secret_key, algorithms=[cls.ALGORITHM])
+        except JWTError:
+            raise cls.credentials_exception
+
+        if payload.get("user_id") is None:
+            raise cls.credentials_exception
+        return payload
+
+    @staticmethod
+    def is_stateless(payload: Dict[str, Any]) -> bool:
+        # Tokens issued before claims were embedded carry no version and use the database check
+        return AUTH_MODE == "stateless" and "ver" in payload
+
+    @classmethod
+    async def fetch_principal(cls, token: str) -> Principal:
+        """
+        Retrieve the caller associated with the provided JWT token.
+
+        In stateless mode the claims come from the token itself and revocation is checked against
+        `TokenVersions`, so no query is made while the user's version is cached.
 
         Args:
             token (str): JWT token.
 
         Returns:
-            User: User object if the token is valid, raises HTTPException if not.
+            Principal: The caller if the token is valid, raises HTTPException if not.
         """
 
-        # --- validate token ---
+        payload = cls.decode_token(token)
+        if not cls.is_stateless(payload):
+            return Principal.from_user(await cls.fetch_user(token))
+
         try:
-            payload = jwt.decode(token, cls.app_config.secret_key, algorithms=[cls.ALGORITHM])
-        except JWTError as e:
+            principal = Principal.from_claims(payload)
+        except KeyError:
             raise cls.credentials_exception
 
-        # --- validate payloads in token ---
-        user_id = payload.get("user_id")
-        if user_id is None:
+        if not await TokenVersions.is_current(principal.id, principal.token_version):
             raise cls.credentials_exception
 
-        # --- get user ---
-        # TODO move user data to token and dont fetch them from database
-        user = UserManager.get_user(user_id)
-        if user is None:
-            raise cls.credentials_exception
+        UserManager.is_active(principal)
+        return principal
 
-        UserManager.is_active(user)
+    @classmethod
+    async def fetch_user(cls, token: str) -> User:
+        """
+        Retrieve the user associated with the provided JWT token.
 
-        # --- validate access token ---
-        active_access_token = UserVerification.filter(UserVerification.user_id == user_id).first().active_access_token
-        if token != active_access_token:
-            raise cls.credentials_exception
+        Args:
+            token (str): JWT token.
+
+        Returns:
+            User: User object if the token is valid, raises HTTPException if not.
+        """
+
+        # --- validate token ---
+        payload = cls.decode_token(token)
+        user_id = payload["user_id"]
+
+        # --- stateless: the token version replaces the stored access token ---
+        stateless = cls.is_stateless(payload)
+        if stateless:
+            await cls.fetch_principal(token)
+
+        # --- get user and its active access token (cached per worker) ---
+        user, active_access_token = await cls._resolve_user(user_id)
+        if not cls._token_matches(token, payload, stateless, user, active_access_token):
+            # The cached entry may predate a login handled by another worker: re-read it once
+            UserCache.invalidate(user_id)
+            user, active_access_token = await cls._resolve_user(user_id)
+            if not cls._token_matches(token, payload, stateless, user, active_access_token):
+                raise cls.credentials_exception
 
         UserManager.is_active(user)
         return user
 
+    @classmethod
+    async def _resolve_user(cls, user_id: int) -> Tuple[User, str | None]:
+        entry = await UserCache.get_or_load(user_id, lambda: cls._load_user(user_id))
+        if entry is None:
+            raise cls.credentials_exception
+        return entry.user(), entry.active_access_token
+
+    @staticmethod
+    async def _load_user(user_id: int) -> CachedUser | None:
+        user = await UserManager.get_user(user_id)
+        if user is None:
+            return None
+        verification = await UserVerification.afirst(UserVerification.user_id == user_id)
+        return CachedUser.of(user, verification.active_access_token if verification else None)
+
+    @staticmethod
+    def _token_matches(token: str, payload: Dict[str, Any], stateless: bool, user: User,
+                       active_access_token: str | None) -> bool:
+        if stateless:
+            return user.token_version == payload["ver"]
+        return token == active_access_token
+
     # -----------------
     # --- OTP Token ---
     # -----------------
@@ -131,47 +264,47 @@ class TokenService:
         totp = TOTP(cls.app_config.otp_secret_key, interval=cls.app_config.otp_expire_seconds)
         return totp.now()
 
-    def request_is_register(self):
+    async def request_is_register(self):
         """
         Will be used just when a new user is registered.
         """
 
-        UserVerification.create(user_id=self.user_id, request_type='register')
+        await UserVerification.acreate(user_id=self.user_id, request_type='register')
 
-    def get_new_email(self):
-        _change: UserVerification = UserVerification.filter(UserVerification.user_id == self.user_id).first()
+    async def get_new_email(self):
+        _change: UserVerification = await UserVerification.afirst(UserVerification.user_id == self.user_id)
         if _change.request_type == 'change-email':
             return _change.new_email
         return False
 
-    def request_is_change_email(self, new_email: str):
-        _change = UserVerification.filter(UserVerification.user_id == self.user_id).first().id
-        UserVerification.update(_change, new_email=new_email, request_type='change-email')
+    async def request_is_change_email(self, new_email: str):
+        _change = (await UserVerification.afirst(UserVerification.user_id == self.user_id)).id
+        await UserVerification.aupdate(_change, new_email=new_email, request_type='change-email')
 
-    def reset_is_change_email(self):
-        _change = UserVerification.filter(UserVerification.user_id == self.user_id).first().id
-        UserVerification.update(_change, new_email=None, request_type=None)
+    async def reset_is_change_email(self):
+        _change = (await UserVerification.afirst(UserVerification.user_id == self.user_id)).id
+        await UserVerification.aupdate(_change, new_email=None, request_type=None)
 
-    def request_is_reset_password(self):
+    async def request_is_reset_password(self):
         """
         Set the request type to reset-password for OTP verification.
         """
-        _change = UserVerification.filter(UserVerification.user_id == self.user_id).first()
+        _change = await UserVerification.afirst(UserVerification.user_id == self.user_id)
         if _change:
-            UserVerification.update(_change.id, request_type='reset-password')
+            await UserVerification.aupdate(_change.id, request_type='reset-password')
         else:
-            UserVerification.create(user_id=self.user_id, request_type='reset-password')
+            await UserVerification.acreate(user_id=self.user_id, request_type='reset-password')
 
-    def reset_otp_token_type(self):
+    async def reset_otp_token_type(self):
         """
         Remove the request_type for otp token by set it to None.
         """
 
-        _change = UserVerification.filter(UserVerification.user_id == self.user_id).first().id
-        UserVerification.update(_change, request_type=None)
+        _change = (await UserVerification.afirst(UserVerification.user_id == self.user_id)).id
+        await UserVerification.aupdate(_change, request_type=None)
 
-    def get_otp_request_type(self):
-        return UserVerification.filter(UserVerification.user_id == self.user_id).first().request_type
+    async def get_otp_request_type(self):
+        return (await UserVerification.afirst(UserVerification.user_id == self.user_id)).request_type
 
     @classmethod
     def validate_otp_token(cls, token: str):
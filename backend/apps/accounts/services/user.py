@@ -3,12 +3,19 @@
 from fastapi import HTTPException
 from starlette import status
 
-from sqlalchemy.orm import Session
+import asyncio
 
-from config.database import SessionLocal
+from sqlalchemy import select, update
+from sqlalchemy.engine import Row
+
+from config.database import get_async_session
 from apps.accounts.models import User
 from apps.accounts.services.password import PasswordManager
+from apps.accounts.services.revocation import TokenVersions
+from apps.accounts.services.user_cache import UserCache
 from apps.core.date_time import DateTime
+from apps.core.services.images import ImageDerivatives
+from apps.core.rollups import MetricsRollup
 
 
 class UserManager:
@@ -17,10 +24,10 @@ class UserManager:
     # CREATE USER
     # --------------------------------------------------------
     @classmethod
-    def create_user(
+    async def create_user(
         cls,
         email: str,
-        password: str,
+        password: str | None = None,
         first_name: str | None = None,
         last_name: str | None = None,
         is_verified_email: bool = False,
@@ -29,14 +36,16 @@ class UserManager:
         role: str = "user",
         updated_at: DateTime = None,
         last_login: DateTime = None,
+        hashed_password: str | None = None,
     ) -> User:
+        """A plaintext `password` is hashed in the hashing pool; pass `hashed_password` if it already is."""
+        if hashed_password is None:
+            hashed_password = await PasswordManager.hash_password_async(password)
 
-        db: Session = SessionLocal()
-
-        try:
+        async with get_async_session() as db:
             user = User(
                 email=email,
-                password=PasswordManager.hash_password(password),
+                password=hashed_password,
                 first_name=first_name,
                 last_name=last_name,
                 is_verified_email=is_verified_email,
@@ -48,78 +57,76 @@ class UserManager:
             )
 
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await MetricsRollup.add_signup(db)
+            await db.commit()
+            await db.refresh(user)
             return user
 
-        finally:
-            db.close()
-
     # --------------------------------------------------------
     # GET USER (BY ID OR EMAIL)
     # --------------------------------------------------------
     @staticmethod
-    def get_user(user_id: int | None = None, email: str | None = None) -> User | None:
+    async def get_user(user_id: int | None = None, email: str | None = None) -> User | None:
         """Get user by ID or email with connection retry logic"""
         max_retries = 3
         last_error = None
         
+        if user_id:
+            query = select(User).where(User.id == user_id)
+        elif email:
+            query = select(User).where(User.email == email)
+        else:
+            return None
+
         for attempt in range(max_retries):
-            db: Session = SessionLocal()
-            try:
-                query = db.query(User)
-
-                if user_id:
-                    return query.filter(User.id == user_id).first()
-
-                if email:
-                    return query.filter(User.email == email).first()
-
-                return None
-
-            except Exception as e:
-                last_error = e
-                db.rollback()
-                if attempt < max_retries - 1:
-                    # Brief pause before retry
-                    import time
-                    time.sleep(0.1 * (attempt + 1))
-                    continue
-                else:
-                    raise
-            finally:
-                db.close()
+            async with get_async_session() as db:
+                # The request's session may already hold other work: a failed attempt then only
+                # rolls back its own savepoint
+                savepoint = await db.begin_nested() if db.in_transaction() else None
+                try:
+                    user = (await db.execute(query)).scalars().first()
+                    if savepoint is not None:
+                        await savepoint.commit()
+                    return user
+
+                except Exception as e:
+                    last_error = e
+                    if savepoint is not None:
+                        await savepoint.rollback()
+                    else:
+                        await db.rollback()
+                    if attempt < max_retries - 1:
+                        # Brief pause before retry
+                        await asyncio.sleep(0.1 * (attempt + 1))
+                        continue
+                    else:
+                        raise
         
         if last_error:
             raise last_error
 
     @staticmethod
-    def get_user_by_id(user_id: int) -> User | None:
+    async def get_user_by_id(user_id: int) -> User | None:
         """Retrieve a user by ID"""
-        return UserManager.get_user(user_id=user_id)
+        return await UserManager.get_user(user_id=user_id)
 
     @staticmethod
-    def list_users(skip: int = 0, limit: int = 100) -> list[User]:
+    async def list_users(skip: int = 0, limit: int = 100) -> list[User]:
         """List all users with pagination"""
-        db: Session = SessionLocal()
-        try:
-            users = db.query(User).offset(skip).limit(limit).all()
-            return users
-        finally:
-            db.close()
+        async with get_async_session() as db:
+            users = (await db.execute(select(User).offset(skip).limit(limit))).scalars().all()
+            return list(users)
 
     # --------------------------------------------------------
     # GET USER OR RAISE 404
     # --------------------------------------------------------
     @staticmethod
-    def get_user_or_404(user_id: int | None = None, email: str | None = None) -> User:
-        db: Session = SessionLocal()
-
-        try:
+    async def get_user_or_404(user_id: int | None = None, email: str | None = None) -> User:
+        async with get_async_session() as db:
             if user_id:
-                user = db.query(User).filter(User.id == user_id).first()
+                user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
             elif email:
-                user = db.query(User).filter(User.email == email).first()
+                user = (await db.execute(select(User).where(User.email == email))).scalars().first()
             else:
                 raise HTTPException(404, "User not found.")
 
@@ -128,14 +135,11 @@ class UserManager:
 
             return user
 
-        finally:
-            db.close()
-
     # --------------------------------------------------------
     # UPDATE USER
     # --------------------------------------------------------
     @classmethod
-    def update_user(
+    async def update_user(
         cls,
         user_id: int,
         email: str | None = None,
@@ -143,6 +147,7 @@ class UserManager:
         first_name: str | None = None,
         last_name: str | None = None,
         profile_image: str | None = None,
+        profile_image_variants: list[dict] | None = None,
         phone_number: str | None = None,
         address: str | None = None,
         city: str | None = None,
@@ -154,21 +159,27 @@ class UserManager:
         role: str | None = None,
         is_approved_lister: bool | None = None,
         last_login: DateTime | None = None,
+        hashed_password: str | None = None,
     ) -> User:
+        if password is not None:
+            # In the hashing pool, before a connection is checked out
+            hashed_password = await PasswordManager.hash_password_async(password)
 
-        db: Session = SessionLocal()
-
-        try:
-            user = db.query(User).filter(User.id == user_id).first()
+        async with get_async_session() as db:
+            user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
             if not user:
                 raise HTTPException(404, "User not found.")
 
+            claims = cls._token_claims(user)
+
             if first_name is not None:
                 user.first_name = first_name
             if last_name is not None:
                 user.last_name = last_name
             if profile_image is not None:
                 user.profile_image = profile_image
+                # Resized copies only exist for images uploaded through the API
+                user.profile_image_variants = profile_image_variants
             if phone_number is not None:
                 user.phone_number = phone_number
             if address is not None:
@@ -181,8 +192,8 @@ class UserManager:
                 user.pincode = pincode
             if email is not None:
                 user.email = email
-            if password is not None:
-                user.password = PasswordManager.hash_password(password)
+            if hashed_password is not None:
+                user.password = hashed_password
             if is_verified_email is not None:
                 user.is_verified_email = is_verified_email
             if is_active is not None:
@@ -200,31 +211,63 @@ class UserManager:
 
             user.updated_at = DateTime.now()
 
-            db.commit()
-            db.refresh(user)
-            return user
+            # Access tokens carry these claims, so changing them (or the password) revokes issued tokens
+            revoke_tokens = hashed_password is not None or cls._token_claims(user) != claims
+            if revoke_tokens:
+                user.token_version = (user.token_version or 0) + 1
 
-        finally:
-            db.close()
+            await db.commit()
+            await db.refresh(user)
+
+            UserCache.invalidate(user.id)
+            if revoke_tokens:
+                await TokenVersions.set(user.id, user.token_version)
+            return user
 
     # --------------------------------------------------------
     # UPDATE LAST LOGIN
     # --------------------------------------------------------
     @classmethod
-    def update_last_login(cls, user_id: int):
-        db: Session = SessionLocal()
-
-        try:
-            user = db.query(User).filter(User.id == user_id).first()
+    async def update_last_login(cls, user_id: int):
+        async with get_async_session() as db:
+            user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
             if not user:
                 return
 
             user.last_login = DateTime.now()
 
-            db.commit()
+            await db.commit()
+            UserCache.invalidate(user_id)
 
-        finally:
-            db.close()
+    # --------------------------------------------------------
+    # TOKEN VERSION
+    # --------------------------------------------------------
+    @staticmethod
+    async def rotate_token_version(user_id: int) -> Row | None:
+        """
+        Bump the user's token version, revoking every access token issued so far.
+
+        Returns the fresh claims (id, role, is_active, is_superuser, is_approved_lister,
+        token_version) in the same round trip, or None if the user doesn't exist.
+        """
+        async with get_async_session() as db:
+            claims = (await db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(token_version=User.token_version + 1)
+                .returning(User.id, User.role, User.is_active, User.is_superuser,
+                           User.is_approved_lister, User.token_version)
+            )).first()
+            await db.commit()
+
+        UserCache.invalidate(user_id)
+        if claims is not None:
+            await TokenVersions.set(claims.id, claims.token_version)
+        return claims
+
+    @staticmethod
+    def _token_claims(user: User) -> tuple:
+        return user.role, user.is_active, user.is_superuser, user.is_approved_lister
 
     # --------------------------------------------------------
     # CONVERT USER TO DICT
@@ -237,6 +280,7 @@ class UserManager:
             "first_name": user.first_name,
             "last_name": user.last_name,
             "profile_image": user.profile_image,
+            "profile_image_srcset": ImageDerivatives.srcset(user.profile_image_variants),
             "phone_number": user.phone_number,
             "address": user.address,
             "city": user.city,
@@ -255,17 +299,14 @@ class UserManager:
     # NEW USER DIRECT INSERT
     # --------------------------------------------------------
     @classmethod
-    def new_user(cls, **user_data):
-        db: Session = SessionLocal()
-
-        try:
+    async def new_user(cls, **user_data):
+        async with get_async_session() as db:
             user = User(**user_data)
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await MetricsRollup.add_signup(db, user_data.get("date_joined"))
+            await db.commit()
+            await db.refresh(user)
             return user
-        finally:
-            db.close()
 
     # --------------------------------------------------------
     # STATUS CHECKS
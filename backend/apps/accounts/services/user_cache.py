@@ -0,0 +1,69 @@
+"""
+Per-worker cache of authenticated users.
+
+`TokenService.fetch_user` resolves the same user (and their active access token) for
+every request they make. The resolved pair is cached here in a bounded LRU with a
+TTL, as an immutable `CachedUser` snapshot of the row: each request gets its own
+detached `User` built from it, so nothing a request does to its user object leaks
+into another request.
+
+Every write that changes a user invalidates their entry; `ResultCache` stamps the key
+so an entry computed before the write is never served after it, even if a request
+that started earlier stores it late. The stamps live in the same bounded backend.
+
+The cache is in-process: other workers see a change after at most
+``AUTH_USER_CACHE_TTL`` seconds.
+"""
+
+import copy
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional
+
+from sqlalchemy import inspect
+
+from apps.accounts.models import User
+from apps.core.cache import MemoryCache, ResultCache
+from apps.core.logger import log
+from config.settings import AUTH_USER_CACHE_MAX_ENTRIES, AUTH_USER_CACHE_TTL
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Column values of a user row and their active access token, as loaded."""
+
+    columns: Mapping[str, Any]
+    active_access_token: Optional[str]
+
+    @classmethod
+    def of(cls, user: User, active_access_token: Optional[str]) -> "CachedUser":
+        columns = {attr.key: copy.deepcopy(getattr(user, attr.key)) for attr in inspect(User).column_attrs}
+        return cls(MappingProxyType(columns), active_access_token)
+
+    def user(self) -> User:
+        """A new detached `User` with the cached values"""
+        return User(**copy.deepcopy(dict(self.columns)))
+
+
+class UserCache:
+    """user_id -> `CachedUser`."""
+
+    cache = ResultCache("auth-users", MemoryCache(AUTH_USER_CACHE_MAX_ENTRIES))
+
+    @classmethod
+    async def get_or_load(cls, user_id: int,
+                          loader: Callable[[], Awaitable[Optional[CachedUser]]]) -> Optional[CachedUser]:
+        """Return the cached entry for ``user_id`` or await ``loader`` (``None`` results aren't cached)."""
+        return await cls.cache.aget_or_set(cls.cache.key(user_id), AUTH_USER_CACHE_TTL, loader)
+
+    @classmethod
+    def invalidate(cls, user_id: int):
+        """Drop the user's entry, and any entry still being loaded for them."""
+        try:
+            cls.cache.invalidate([cls.cache.key(user_id)])
+        except Exception as e:
+            log.error("User cache invalidation failed", category="AUTH", user_id=user_id, error=str(e))
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        return cls.cache.stats()
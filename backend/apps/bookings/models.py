@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Numeric, Text, Boolean, Enum
+from sqlalchemy import (
+    Column, Integer, String, DateTime, func, ForeignKey, Numeric, Text, Boolean, Enum, Index, CheckConstraint, text
+)
 from sqlalchemy.orm import relationship
 import enum
 
@@ -24,7 +26,9 @@ class Booking(FastModel):
     
     # Payment details
     payment_id = Column(String(255), nullable=True)
-    payment_screenshot = Column(Text, nullable=True)  # URL or base64
+    # Image reference (URL) and, when the server stored the bytes, their sha256 (see apps/core/services/blobs.py)
+    payment_screenshot = Column(Text, nullable=True)
+    payment_screenshot_sha256 = Column(String(64), nullable=True)
     payment_verified = Column(Boolean, default=False, nullable=False)  # Keep for backward compatibility
     payment_status = Column(Enum(PaymentStatus), default=PaymentStatus.pending, nullable=False)
     payment_verified_at = Column(DateTime, nullable=True)
@@ -35,3 +39,18 @@ class Booking(FastModel):
     # Relationships
     listing = relationship("Listing", back_populates="bookings")
     user = relationship("User", foreign_keys=[user_id])
+
+    __table_args__ = (
+        # Owner inbox: the owner's listings (ix_listings_owner_id_created_at_id), then their bookings by date
+        Index("ix_bookings_listing_id_created_at_id", "listing_id", "created_at", "id"),
+        Index("ix_bookings_listing_id_status", "listing_id", "status"),
+        Index("ix_bookings_pending", "listing_id", "created_at", "id", postgresql_where=text("status = 'pending'")),
+        # A user's own bookings, and the ON DELETE CASCADE / rollup cleanup when a user is deleted
+        Index("ix_bookings_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Admin listing / export by date, alone and behind the status filter; payment verification queue
+        Index("ix_bookings_created_at_id", "created_at", "id"),
+        Index("ix_bookings_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_bookings_payment_pending", "created_at", "id", postgresql_where=text("payment_status = 'pending'")),
+        CheckConstraint("quantity >= 1", name="ck_bookings_quantity_positive"),
+        CheckConstraint("amount >= 0", name="ck_bookings_amount_not_negative"),
+    )
@@ -1,55 +1,93 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, List, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from apps.bookings.schemas import (
     BookingCreate, BookingUpdate, BookingOut, BookingListOut,
     BookingCreateResponse, PaymentProofUpload, BookingStatusUpdate,
-    BookingWithDetails, PaymentVerificationUpdate, AdminSettingsOut, AdminSettingsUpdate
+    BookingWithDetails, PaymentVerificationUpdate, AdminSettingsOut, AdminSettingsUpdate,
+    BookingAdminFilters, PaymentStatus
+)
+from apps.bookings.services import (
+    BookingService, AdminSettingsService, PAYMENT_QR_CODES_FOLDER, PAYMENT_SCREENSHOTS_FOLDER,
 )
-from apps.bookings.services import BookingService, AdminSettingsService
 from apps.accounts.services.authenticate import AccountService
-from apps.accounts.models import User
-from apps.core.cloudinary_service import CloudinaryService
+from apps.accounts.services.token import Principal
+from apps.core.services.uploads import UploadService
+from apps.core.http_cache import HttpCache
 from apps.core.logger import log
-from config.database import get_db
+from apps.core.query_budget import query_budget
+from config.database import get_async_db
+from config.settings import BOOKINGS_MAX_PAGE_LIMIT, BOOKINGS_PAGE_LIMIT
 
 router = APIRouter(prefix="/bookings", tags=["Bookings"])
 
 
-def get_booking_service(db: Session = Depends(get_db)) -> BookingService:
+def get_booking_service(db: AsyncSession = Depends(get_async_db)) -> BookingService:
     return BookingService(db)
 
 
-def get_admin_settings_service(db: Session = Depends(get_db)) -> AdminSettingsService:
+def get_admin_settings_service(db: AsyncSession = Depends(get_async_db)) -> AdminSettingsService:
     return AdminSettingsService(db)
 
 
+def get_admin_booking_filters(
+    booking_status: List[str] = Query(None, alias="status"),
+    payment_status: List[PaymentStatus] = Query(None),
+    created_from: Union[datetime, date] = Query(None, description="Bookings created at or after this date/time (UTC)"),
+    created_to: Union[datetime, date] = Query(None, description="Bookings created before this date/time (UTC)"),
+    listing_type: str = Query(None),
+) -> BookingAdminFilters:
+    return BookingAdminFilters(
+        statuses=booking_status,
+        payment_statuses=payment_status,
+        created_from=created_from,
+        created_to=created_to,
+        listing_type=listing_type,
+    )
+
+
 @router.get("/payment-info", response_model=AdminSettingsOut)
-def get_payment_info(
+@query_budget(1)
+async def get_payment_info(
+    request: Request,
+    response: Response,
     settings_service: AdminSettingsService = Depends(get_admin_settings_service),
 ):
-    """Get admin payment QR code and UPI ID for bookings"""
-    settings = settings_service.get_settings()
+    """Get admin payment QR code and UPI ID for bookings; answers conditional requests"""
+    settings = await settings_service.get_settings()
     if not settings or not settings.payment_qr_code:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="Payment information not configured by admin"
         )
+    etag = HttpCache.etag(settings.id, settings.updated_at, settings.payment_qr_code, settings.payment_upi_id)
+    not_modified = HttpCache.check(request, response, etag, settings.updated_at)
+    if not_modified:
+        return not_modified
     return settings
 
 
 @router.post("/", response_model=BookingOut, status_code=status.HTTP_201_CREATED)
-def create_booking(
+@query_budget(10)
+async def create_booking(
     data: BookingCreate,
-    current_user: User = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: BookingService = Depends(get_booking_service),
 ):
     """Create a new booking with quantity and payment proof"""
     log.api("POST /bookings/", user_id=current_user.id, listing_id=data.listing_id)
     log.info("Creating new booking", user_id=current_user.id, quantity=data.quantity)
     
-    booking = service.create_booking(
+    booking = await service.create_booking(
         data, 
         user_id=current_user.id,
         payment_id=data.payment_id,
@@ -61,14 +99,15 @@ def create_booking(
 
 
 @router.post("/{booking_id}/payment", response_model=BookingOut)
-def upload_payment_proof(
+@query_budget(5)
+async def upload_payment_proof(
     booking_id: int,
     data: PaymentProofUpload,
-    current_user: User = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: BookingService = Depends(get_booking_service),
 ):
     """Upload payment proof (screenshot and payment ID) for a booking"""
-    booking = service.get_booking(booking_id)
+    booking = await service.get_booking(booking_id)
     if not booking:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
     
@@ -76,22 +115,23 @@ def upload_payment_proof(
     if booking.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
     
-    return service.upload_payment_proof(booking_id, data.payment_id, data.payment_screenshot)
+    return await service.upload_payment_proof(booking_id, data.payment_id, data.payment_screenshot)
 
 
 @router.patch("/{booking_id}/status", response_model=BookingOut)
-def update_booking_status(
+@query_budget(8)
+async def update_booking_status(
     booking_id: int,
     data: BookingStatusUpdate,
-    current_user: User = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: BookingService = Depends(get_booking_service),
 ):
     """Lister can accept/reject/waitlist a booking. Supports all status transitions including waitlist->accepted."""
     log.api(f"PATCH /bookings/{booking_id}/status", user_id=current_user.id, new_status=data.status)
     
-    booking = service.get_booking(booking_id)
+    booking = await service.get_booking(booking_id)
     if not booking:
-        log.warn("Booking not found", booking_id=booking_id)
+        log.warn("Booking not found", category="API", booking_id=booking_id)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
     
     log.info("Updating booking status", booking_id=booking_id, old_status=booking.status, new_status=data.status)
@@ -99,26 +139,26 @@ def update_booking_status(
     # Check if current user is the owner of the listing
     from apps.listings.services import ListingService
     listing_service = ListingService(service.db)
-    listing = listing_service.get_listing(booking.listing_id)
+    listing = await listing_service.get_listing(booking.listing_id)
     
     if not listing or listing.owner_id != current_user.id:
-        log.warn("Unauthorized status update attempt", booking_id=booking_id, user_id=current_user.id)
+        log.warn("Unauthorized status update attempt", category="API", booking_id=booking_id, user_id=current_user.id)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
     
     # Validate status
     valid_statuses = ["accepted", "rejected", "waitlist"]
     if data.status not in valid_statuses:
-        log.warn("Invalid status", booking_id=booking_id, attempted_status=data.status)
+        log.warn("Invalid status", category="API", booking_id=booking_id, attempted_status=data.status)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
         )
     
     # Update status (allows any transition: pending->accepted, pending->waitlist, waitlist->accepted, etc.)
-    updated_booking = service.update_booking_status(booking_id, data.status)
+    updated_booking = await service.update_booking_status(booking_id, data.status)
     
     if not updated_booking:
-        log.error("Failed to update booking status", booking_id=booking_id)
+        log.error("Failed to update booking status", category="API", booking_id=booking_id)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to update booking status")
     
     log.info("Booking status updated successfully", booking_id=booking_id, new_status=data.status)
@@ -126,61 +166,128 @@ def update_booking_status(
 
 
 @router.get("/", response_model=BookingListOut)
+@query_budget(3)
 async def list_bookings(
     listing_id: int = Query(None),
-    current_user: User = Depends(AccountService.current_user),
+    booking_status: List[str] = Query(None, alias="status", description="Lister inbox: only these statuses"),
+    sort: str = Query("-created_at", pattern="^-?created_at$", description="Lister inbox order"),
+    after: str = Query(None, description="Lister inbox: `next_cursor` of the previous page"),
+    limit: int = Query(BOOKINGS_PAGE_LIMIT, ge=1, le=BOOKINGS_MAX_PAGE_LIMIT),
+    include_total: bool = Query(False, description="Lister inbox: also count every matching booking"),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: BookingService = Depends(get_booking_service),
 ):
-    """List bookings for the current user or their listings"""
+    """List bookings for the current user, or the paginated inbox of bookings on a lister's listings"""
     log.api("GET /bookings/", user_id=current_user.id, listing_id=listing_id, user_role=current_user.role)
     
     # If user is a listing owner, show bookings for their listings
     if current_user.role in ['hostel', 'coaching', 'library', 'tiffin']:
         log.info("Fetching bookings for lister", user_id=current_user.id, role=current_user.role)
-        from apps.listings.services import ListingService
-        listing_service = ListingService(service.db)
-        my_listings = listing_service.list_listings(owner_id=current_user.id)
-        listing_ids = [l.id for l in my_listings]
-        
-        log.debug("Lister owns listings", user_id=current_user.id, listing_count=len(listing_ids))
-        
-        # Get all bookings for owner's listings
-        all_bookings = []
-        for lid in listing_ids:
-            bookings = service.list_bookings(listing_id=lid)
-            all_bookings.extend(bookings)
+        bookings, next_cursor = await service.owner_inbox(
+            current_user.id, statuses=booking_status, listing_id=listing_id, sort=sort, after=after, limit=limit
+        )
+        total = None
+        if include_total:
+            total = await service.count_owner_inbox(current_user.id, statuses=booking_status, listing_id=listing_id)
         
-        log.info("Fetched bookings for lister", user_id=current_user.id, booking_count=len(all_bookings))
-        return {"bookings": all_bookings, "total": len(all_bookings)}
+        log.info("Fetched bookings for lister", user_id=current_user.id, booking_count=len(bookings))
+        return {"bookings": bookings, "next_cursor": next_cursor, "total": total}
     
     # For regular users, show their bookings
     log.info("Fetching bookings for user", user_id=current_user.id)
-    bookings = service.list_bookings(user_id=current_user.id, listing_id=listing_id)
+    bookings = await service.list_bookings(user_id=current_user.id, listing_id=listing_id)
     log.info("Fetched user bookings", user_id=current_user.id, booking_count=len(bookings))
     return {"bookings": bookings, "total": len(bookings)}
 
 
-@router.get("/admin/all", response_model=List[BookingOut])
-def list_all_bookings_admin(
-    current_user: User = Depends(AccountService.current_user),
+@router.get("/admin/all", response_model=BookingListOut)
+@query_budget(3)
+async def list_all_bookings_admin(
+    filters: BookingAdminFilters = Depends(get_admin_booking_filters),
+    sort: str = Query("-created_at", pattern="^-?created_at$"),
+    after: str = Query(None, description="`next_cursor` of the previous page"),
+    limit: int = Query(BOOKINGS_PAGE_LIMIT, ge=1, le=BOOKINGS_MAX_PAGE_LIMIT),
+    include_total: bool = Query(False, description="Also count every matching booking"),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: BookingService = Depends(get_booking_service),
 ):
-    """Admin can view all bookings with detailed user and listing information"""
+    """Admin can page through all bookings with detailed user and listing information"""
     if current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
     
-    bookings = service.list_bookings_with_details()
-    return bookings
+    bookings, next_cursor = await service.list_bookings_admin(filters, sort=sort, after=after, limit=limit)
+    total = await service.count_bookings_admin(filters) if include_total else None
+    return {"bookings": bookings, "next_cursor": next_cursor, "total": total}
+
+
+@router.get("/admin/export")
+@query_budget(2)
+async def export_bookings_admin(
+    filters: BookingAdminFilters = Depends(get_admin_booking_filters),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    current_user: Principal = Depends(AccountService.current_principal),
+    service: BookingService = Depends(get_booking_service),
+):
+    """Admin downloads every booking matching the filters as CSV or NDJSON, streamed as it is read"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+    log.api("GET /bookings/admin/export", user_id=current_user.id, format=format,
+            filters=filters.model_dump(exclude_none=True))
+
+    rows = service.stream_bookings_admin(filters)
+    filename = f"bookings-{date.today():%Y%m%d}.{format}"
+    return StreamingResponse(
+        _csv_lines(rows) if format == "csv" else _ndjson_lines(rows),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _export_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+async def _csv_lines(rows: AsyncIterator[Dict[str, Any]], chunk_rows: int = 200) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.key for column in BookingService.EXPORT_COLUMNS])
+    count = 0
+    async for row in rows:
+        writer.writerow([_export_value(value) for value in row.values()])
+        count += 1
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+async def _ndjson_lines(rows: AsyncIterator[Dict[str, Any]], chunk_rows: int = 200) -> AsyncIterator[str]:
+    lines = []
+    async for row in rows:
+        lines.append(json.dumps({key: _export_value(value) for key, value in row.items()}) + "\n")
+        if len(lines) == chunk_rows:
+            yield "".join(lines)
+            lines = []
+    yield "".join(lines)
 
 
 @router.get("/{booking_id}", response_model=BookingOut)
-def get_booking(
+@query_budget(2)
+async def get_booking(
     booking_id: int,
-    current_user: User = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: BookingService = Depends(get_booking_service),
 ):
     """Get a single booking by ID"""
-    booking = service.get_booking(booking_id)
+    booking = await service.get_booking(booking_id)
     if not booking:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
     
@@ -192,14 +299,15 @@ def get_booking(
 
 
 @router.put("/{booking_id}", response_model=BookingOut)
-def update_booking(
+@query_budget(8)
+async def update_booking(
     booking_id: int,
     data: BookingUpdate,
-    current_user: User = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: BookingService = Depends(get_booking_service),
 ):
     """Update a booking"""
-    booking = service.get_booking(booking_id)
+    booking = await service.get_booking(booking_id)
     if not booking:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
     
@@ -207,18 +315,19 @@ def update_booking(
     if booking.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this booking")
     
-    updated_booking = service.update_booking(booking_id, data)
+    updated_booking = await service.update_booking(booking_id, data)
     return updated_booking
 
 
 @router.delete("/{booking_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_booking(
+@query_budget(8)
+async def delete_booking(
     booking_id: int,
-    current_user: User = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: BookingService = Depends(get_booking_service),
 ):
     """Delete a booking"""
-    booking = service.get_booking(booking_id)
+    booking = await service.get_booking(booking_id)
     if not booking:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
     
@@ -226,81 +335,78 @@ def delete_booking(
     if booking.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this booking")
     
-    service.delete_booking(booking_id)
+    await service.delete_booking(booking_id)
     return None
 
 
 # Admin endpoints for payment verification and settings
 @router.patch("/{booking_id}/verify-payment", response_model=BookingOut)
-def verify_payment(
+@query_budget(6)
+async def verify_payment(
     booking_id: int,
     data: PaymentVerificationUpdate,
-    current_user: User = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: BookingService = Depends(get_booking_service),
 ):
     """Admin verifies payment for a booking. Can mark as verified, fake, or pending."""
     if current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
     
-    booking = service.get_booking(booking_id)
+    booking = await service.get_booking(booking_id)
     if not booking:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
     
-    return service.verify_payment(booking_id, data.payment_status.value)
+    return await service.verify_payment(booking_id, data.payment_status.value)
 
 
 @router.post("/upload-payment-screenshot")
+@query_budget(0)
 async def upload_payment_screenshot(
     file: UploadFile = File(...),
-    current_user: User = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
 ):
-    """Upload payment screenshot to Cloudinary"""
-    try:
-        # Upload to Cloudinary
-        result = await CloudinaryService.upload_image(file, folder="prephub/payment_screenshots")
-        return {"url": result['url']}
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    """Upload payment screenshot"""
+    result = await UploadService.upload_image(file, folder=PAYMENT_SCREENSHOTS_FOLDER, max_dimension=500)
+    return {"url": result['url']}
 
 
 @router.post("/admin/upload-qr")
+@query_budget(0)
 async def upload_qr_code(
     file: UploadFile = File(...),
-    current_user: User = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
 ):
-    """Admin uploads QR code image to Cloudinary"""
+    """Admin uploads QR code image"""
     if current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
     
-    try:
-        # Upload to Cloudinary
-        result = await CloudinaryService.upload_image(file, folder="prephub/payment_qr_codes")
-        return {"url": result['url']}
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    result = await UploadService.upload_image(file, folder=PAYMENT_QR_CODES_FOLDER, max_dimension=500)
+    return {"url": result['url']}
 
 
 @router.get("/admin/settings", response_model=AdminSettingsOut)
-def get_admin_settings(
-    current_user: User = Depends(AccountService.current_user),
+@query_budget(1)
+async def get_admin_settings(
+    current_user: Principal = Depends(AccountService.current_principal),
     settings_service: AdminSettingsService = Depends(get_admin_settings_service),
 ):
     """Get admin payment settings"""
     if current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
     
-    settings = settings_service.get_settings()
+    settings = await settings_service.get_settings()
     return settings if settings else {"id": 0, "payment_qr_code": None, "payment_upi_id": None}
 
 
 @router.put("/admin/settings", response_model=AdminSettingsOut)
-def update_admin_settings(
+@query_budget(4)
+async def update_admin_settings(
     data: AdminSettingsUpdate,
-    current_user: User = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     settings_service: AdminSettingsService = Depends(get_admin_settings_service),
 ):
     """Update admin payment settings (QR code and UPI ID)"""
     if current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
     
-    return settings_service.update_settings(data, current_user.id)
+    return await settings_service.update_settings(data, current_user.id)
@@ -1,5 +1,5 @@
-from datetime import datetime
-from typing import List, Optional
+from datetime import date, datetime, time, timezone
+from typing import List, Optional, Union
 from pydantic import BaseModel, ConfigDict, field_validator, model_validator
 from enum import Enum
 
@@ -40,13 +40,21 @@ class BookingCreate(BaseModel):
 
 
 class BookingUpdate(BaseModel):
+    # Both may be left out, but not set to null: bookings always have a status and an amount
     status: Optional[str] = None
     amount: Optional[float] = None
 
+    @field_validator('status', 'amount')
+    @classmethod
+    def validate_not_null(cls, v, info):
+        if v is None:
+            raise ValueError(f'{info.field_name} cannot be null')
+        return v
+
 
 class PaymentProofUpload(BaseModel):
     payment_id: str
-    payment_screenshot: str  # URL or base64 encoded image
+    payment_screenshot: str  # URL, or a base64 encoded image (moved to upload storage)
 
 
 class BookingStatusUpdate(BaseModel):
@@ -100,6 +108,7 @@ class BookingOut(BaseModel):
     quantity: int
     payment_id: Optional[str] = None
     payment_screenshot: Optional[str] = None
+    payment_screenshot_sha256: Optional[str] = None
     payment_verified: bool = False
     payment_status: PaymentStatus = PaymentStatus.pending
     payment_verified_at: Optional[datetime] = None
@@ -136,7 +145,31 @@ class BookingWithDetails(BaseModel):
 
 class BookingListOut(BaseModel):
     bookings: List[BookingOut]
-    total: int
+    # Cursor to pass as `after` for the next page of a lister's inbox; None on the last page
+    next_cursor: Optional[str] = None
+    # Not computed for a lister's inbox unless requested with `include_total=true`
+    total: Optional[int] = None
+
+
+class BookingAdminFilters(BaseModel):
+    """Filters of the admin booking listing and export"""
+    statuses: Optional[List[str]] = None
+    payment_statuses: Optional[List[PaymentStatus]] = None
+    created_from: Optional[Union[datetime, date]] = None  # inclusive, a date means its midnight
+    created_to: Optional[Union[datetime, date]] = None  # exclusive
+    listing_type: Optional[str] = None
+
+    @field_validator('created_from', 'created_to')
+    @classmethod
+    def naive_utc(cls, v):
+        """`created_at` is stored without a time zone (UTC)"""
+        if v is None:
+            return v
+        if not isinstance(v, datetime):
+            v = datetime.combine(v, time.min)
+        if v.tzinfo is not None:
+            v = v.astimezone(timezone.utc).replace(tzinfo=None)
+        return v
 
 
 class BookingCreateResponse(BaseModel):
@@ -155,6 +188,7 @@ class PaymentVerificationUpdate(BaseModel):
 class AdminSettingsOut(BaseModel):
     id: int
     payment_qr_code: Optional[str] = None
+    payment_qr_code_sha256: Optional[str] = None
     payment_upi_id: Optional[str] = None
     updated_at: Optional[datetime] = None
     
@@ -1,20 +1,31 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import select
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, joinedload
+from sqlalchemy import func, select
 from datetime import datetime
 
 from apps.bookings.models import Booking, PaymentStatus
-from apps.bookings.schemas import BookingCreate, BookingUpdate, AdminSettingsUpdate
+from apps.bookings.schemas import BookingCreate, BookingUpdate, AdminSettingsUpdate, BookingAdminFilters
 from apps.core.models import AdminSettings
 from apps.accounts.models import User
+from apps.core.cache import AnalyticsCache
 from apps.core.logger import log
+from apps.core.pagination import Keyset
+from apps.core.rollups import MetricsRollup
+from apps.core.services.blobs import Blobs
+from apps.listings.models import Listing
+from config.settings import BOOKINGS_EXPORT_BATCH_SIZE, BOOKINGS_PAGE_LIMIT
+
+# Upload backend folders of the payment images
+PAYMENT_SCREENSHOTS_FOLDER = "prephub/payment_screenshots"
+PAYMENT_QR_CODES_FOLDER = "prephub/payment_qr_codes"
 
 
 class BookingService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def list_bookings(self, user_id: Optional[int] = None, listing_id: Optional[int] = None) -> List[Booking]:
+    async def list_bookings(self, user_id: Optional[int] = None, listing_id: Optional[int] = None) -> List[Booking]:
         """List all bookings with user and listing details, optionally filtered by user or listing"""
         log.service("list_bookings called", user_id=user_id, listing_id=listing_id)
         
@@ -28,50 +39,163 @@ class BookingService:
         if listing_id:
             query = query.where(Booking.listing_id == listing_id)
         
-        result = self.db.execute(query)
+        result = await self.db.execute(query)
         bookings = list(result.scalars().all())
         
         log.service("list_bookings completed", count=len(bookings))
         return bookings
 
-    def list_bookings_with_details(self) -> List[Booking]:
-        """List all bookings with detailed user and listing information"""
-        query = select(Booking).options(
-            joinedload(Booking.user),
-            joinedload(Booking.listing)
+    async def owner_inbox(
+        self,
+        owner_id: int,
+        statuses: Optional[List[str]] = None,
+        listing_id: Optional[int] = None,
+        sort: str = "-created_at",
+        after: Optional[str] = None,
+        limit: int = BOOKINGS_PAGE_LIMIT,
+    ) -> Tuple[List[Booking], Optional[str]]:
+        """
+        One page of the bookings of every listing an owner has, newest first by default, in a single
+        query (bookings joined to the owner's listings). Returns the page and the next page's cursor.
+        """
+        log.service("owner_inbox called", owner_id=owner_id, statuses=statuses, listing_id=listing_id, sort=sort)
+
+        query = self._owner_bookings(owner_id, statuses, listing_id).options(
+            contains_eager(Booking.listing),
+            joinedload(Booking.user)
         )
-        
-        result = self.db.execute(query)
-        bookings = result.scalars().all()
-        
-        return bookings
+        query = Keyset.paginate(query, sort, Booking.created_at, Booking.id, sort.startswith("-"), after, limit)
+
+        result = await self.db.execute(query)
+        bookings, next_cursor = Keyset.page(result.scalars().all(), sort, limit,
+                                            key=lambda booking: (booking.created_at, booking.id))
+
+        log.service("owner_inbox completed", owner_id=owner_id, count=len(bookings))
+        return bookings, next_cursor
+
+    async def count_owner_inbox(self, owner_id: int, statuses: Optional[List[str]] = None,
+                                listing_id: Optional[int] = None) -> int:
+        """Number of bookings in an owner's inbox matching the filters"""
+        query = self._owner_bookings(owner_id, statuses, listing_id).with_only_columns(func.count(Booking.id))
+        return (await self.db.execute(query)).scalar_one()
+
+    @staticmethod
+    def _owner_bookings(owner_id: int, statuses: Optional[List[str]], listing_id: Optional[int]):
+        query = select(Booking).join(Listing, Booking.listing_id == Listing.id).where(Listing.owner_id == owner_id)
+        if statuses:
+            query = query.where(Booking.status.in_(statuses))
+        if listing_id:
+            query = query.where(Booking.listing_id == listing_id)
+        return query
+
+    # Columns of the admin export, in order
+    EXPORT_COLUMNS = (
+        Booking.id, Booking.created_at, Booking.updated_at, Booking.status, Booking.amount, Booking.quantity,
+        Booking.payment_id, Booking.payment_status, Booking.payment_verified, Booking.payment_verified_at,
+        Booking.payment_screenshot, Booking.user_id, User.email.label("user_email"),
+        User.first_name.label("user_first_name"), User.last_name.label("user_last_name"),
+        Booking.listing_id, Listing.name.label("listing_name"), Listing.type.label("listing_type"),
+    )
+
+    async def list_bookings_admin(
+        self,
+        filters: BookingAdminFilters,
+        sort: str = "-created_at",
+        after: Optional[str] = None,
+        limit: int = BOOKINGS_PAGE_LIMIT,
+    ) -> Tuple[List[Booking], Optional[str]]:
+        """One page of all bookings with their user and listing, and the next page's cursor"""
+        log.service("list_bookings_admin called", filters=filters.model_dump(exclude_none=True), sort=sort)
 
-    def get_booking(self, booking_id: int) -> Optional[Booking]:
-        """Get a single booking by ID with user and listing details"""
+        query = self._admin_filter(select(Booking).join(Booking.listing), filters).options(
+            contains_eager(Booking.listing),
+            joinedload(Booking.user)
+        )
+        query = Keyset.paginate(query, sort, Booking.created_at, Booking.id, sort.startswith("-"), after, limit)
+
+        result = await self.db.execute(query)
+        bookings, next_cursor = Keyset.page(result.scalars().all(), sort, limit,
+                                            key=lambda booking: (booking.created_at, booking.id))
+
+        log.service("list_bookings_admin completed", count=len(bookings))
+        return bookings, next_cursor
+
+    async def count_bookings_admin(self, filters: BookingAdminFilters) -> int:
+        """Number of bookings matching the admin filters"""
+        query = self._admin_filter(select(func.count(Booking.id)).join(Booking.listing), filters)
+        return (await self.db.execute(query)).scalar_one()
+
+    async def stream_bookings_admin(self, filters: BookingAdminFilters,
+                                    batch_size: int = BOOKINGS_EXPORT_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Every booking matching the filters as a flat row (`EXPORT_COLUMNS`), oldest first. Rows are read
+        through a server-side cursor ``batch_size`` at a time and no ORM objects are built, so memory
+        stays flat however many bookings there are.
+        """
+        log.service("stream_bookings_admin called", filters=filters.model_dump(exclude_none=True))
+
+        query = self._admin_filter(
+            select(*self.EXPORT_COLUMNS).join(Booking.listing).join(Booking.user),
+            filters
+        ).order_by(Booking.created_at, Booking.id).execution_options(yield_per=batch_size)
+
+        count = 0
+        result = await self.db.stream(query)
+        async for row in result.mappings():
+            count += 1
+            yield row
+
+        log.service("stream_bookings_admin completed", count=count)
+
+    @staticmethod
+    def _admin_filter(query, filters: BookingAdminFilters):
+        """Apply the admin filters; ``query`` must already join `Listing`"""
+        if filters.statuses:
+            query = query.where(Booking.status.in_(filters.statuses))
+        if filters.payment_statuses:
+            query = query.where(Booking.payment_status.in_([PaymentStatus(s.value) for s in filters.payment_statuses]))
+        if filters.created_from:
+            query = query.where(Booking.created_at >= filters.created_from)
+        if filters.created_to:
+            query = query.where(Booking.created_at < filters.created_to)
+        if filters.listing_type:
+            query = query.where(Listing.type == filters.listing_type)
+        return query
+
+    async def get_booking(self, booking_id: int, reload: bool = False) -> Optional[Booking]:
+        """
+        Get a single booking by ID with user and listing details.
+        ``reload`` refreshes an instance already in the session (e.g. after a write): expired
+        attributes and relationships can't be lazy-loaded while the response is serialized.
+        """
         query = select(Booking).options(
             joinedload(Booking.user),
             joinedload(Booking.listing)
         ).where(Booking.id == booking_id)
+        if reload:
+            query = query.execution_options(populate_existing=True)
         
-        result = self.db.execute(query)
+        result = await self.db.execute(query)
         return result.scalars().first()
 
-    def create_booking(self, data: BookingCreate, user_id: int, payment_id: Optional[str] = None, payment_screenshot: Optional[str] = None) -> Booking:
+    async def create_booking(self, data: BookingCreate, user_id: int, payment_id: Optional[str] = None, payment_screenshot: Optional[str] = None) -> Booking:
         """Create a new booking with quantity and payment proof"""
         log.service("create_booking called", user_id=user_id, listing_id=data.listing_id, quantity=data.quantity)
         
         # Get listing to calculate amount based on quantity
         from apps.listings.services import ListingService
         listing_service = ListingService(self.db)
-        listing = listing_service.get_listing(data.listing_id)
+        listing = await listing_service.get_listing(data.listing_id)
         
         if not listing:
-            log.error("Listing not found", listing_id=data.listing_id)
+            log.error("Listing not found", category="SERVICE", listing_id=data.listing_id)
             raise ValueError("Listing not found")
         
         # Calculate amount: listing price * quantity
         calculated_amount = listing.price * data.quantity
-        log.debug("Calculated booking amount", listing_price=float(listing.price), quantity=data.quantity, total=float(calculated_amount))
+        log.debug("Calculated booking amount", category="SERVICE", listing_price=float(listing.price), quantity=data.quantity, total=float(calculated_amount))
+
+        payment_screenshot, screenshot_sha256 = await Blobs.reference(payment_screenshot, PAYMENT_SCREENSHOTS_FOLDER)
         
         booking = Booking(
             user_id=user_id,
@@ -81,59 +205,70 @@ class BookingService:
             status="pending",
             payment_id=payment_id,
             payment_screenshot=payment_screenshot,
+            payment_screenshot_sha256=screenshot_sha256,
             payment_verified=False,
         )
         self.db.add(booking)
-        self.db.commit()
-        self.db.refresh(booking)
+        await MetricsRollup.add_booking(self.db, booking, owner_id=listing.owner_id)
+        await self.db.commit()
+        await AnalyticsCache.invalidate_bookings(owner_id=listing.owner_id)
+        booking = await self.get_booking(booking.id, reload=True)
         
         log.service("create_booking completed", booking_id=booking.id, amount=float(booking.amount))
         return booking
 
-    def update_booking(self, booking_id: int, data: BookingUpdate) -> Optional[Booking]:
+    async def update_booking(self, booking_id: int, data: BookingUpdate) -> Optional[Booking]:
         """Update an existing booking"""
-        booking = self.get_booking(booking_id)
+        booking = await self.get_booking(booking_id)
         if not booking:
             return None
 
+        old_status, old_amount = booking.status, booking.amount
         for field, value in data.model_dump(exclude_unset=True).items():
             setattr(booking, field, value)
 
-        self.db.commit()
-        self.db.refresh(booking)
-        return booking
+        owner_id = booking.listing.owner_id
+        await MetricsRollup.move_booking(self.db, booking, owner_id, old_status, old_amount)
+        await self.db.commit()
+        await AnalyticsCache.invalidate_bookings(owner_id=owner_id)
+        return await self.get_booking(booking_id, reload=True)
 
-    def delete_booking(self, booking_id: int) -> bool:
+    async def delete_booking(self, booking_id: int) -> bool:
         """Delete a booking"""
-        booking = self.get_booking(booking_id)
+        booking = await self.get_booking(booking_id)
         if not booking:
             return False
 
-        self.db.delete(booking)
-        self.db.commit()
+        owner_id = booking.listing.owner_id
+        await MetricsRollup.add_booking(self.db, booking, owner_id, sign=-1)
+        await self.db.delete(booking)
+        await self.db.commit()
+        await AnalyticsCache.invalidate_bookings(owner_id=owner_id)
         return True
 
-    def upload_payment_proof(self, booking_id: int, payment_id: str, payment_screenshot: str) -> Optional[Booking]:
+    async def upload_payment_proof(self, booking_id: int, payment_id: str, payment_screenshot: str) -> Optional[Booking]:
         """Upload payment proof for a booking"""
-        booking = self.get_booking(booking_id)
+        booking = await self.get_booking(booking_id)
         if not booking:
             return None
         
         booking.payment_id = payment_id
-        booking.payment_screenshot = payment_screenshot
+        booking.payment_screenshot, booking.payment_screenshot_sha256 = await Blobs.reference(
+            payment_screenshot, PAYMENT_SCREENSHOTS_FOLDER
+        )
         booking.updated_at = datetime.utcnow()
         
-        self.db.commit()
+        await self.db.commit()
         # Re-fetch with relationships
-        return self.get_booking(booking_id)
+        return await self.get_booking(booking_id, reload=True)
 
-    def update_booking_status(self, booking_id: int, status: str) -> Optional[Booking]:
+    async def update_booking_status(self, booking_id: int, status: str) -> Optional[Booking]:
         """Update booking status (accept/reject/waitlist by lister). Allows any status transition."""
         log.service("update_booking_status called", booking_id=booking_id, new_status=status)
         
-        booking = self.get_booking(booking_id)
+        booking = await self.get_booking(booking_id)
         if not booking:
-            log.warn("Booking not found for status update", booking_id=booking_id)
+            log.warn("Booking not found for status update", category="SERVICE", booking_id=booking_id)
             return None
         
         old_status = booking.status
@@ -142,19 +277,24 @@ class BookingService:
         
         log.db("Updating booking status in database", booking_id=booking_id, old_status=old_status, new_status=status)
         
-        self.db.commit()
+        owner_id = booking.listing.owner_id
+        await MetricsRollup.move_booking(self.db, booking, owner_id, old_status, booking.amount)
+        await self.db.commit()
+        await AnalyticsCache.invalidate_bookings(owner_id=owner_id)
         # Re-fetch with relationships to ensure frontend gets complete data
-        updated = self.get_booking(booking_id)
+        updated = await self.get_booking(booking_id, reload=True)
         
         log.service("update_booking_status completed", booking_id=booking_id, status=status)
         return updated
 
-    def verify_payment(self, booking_id: int, payment_status: str) -> Optional[Booking]:
+    async def verify_payment(self, booking_id: int, payment_status: str) -> Optional[Booking]:
         """Admin verifies payment for a booking. If marked as fake, cancels the booking."""
-        booking = self.get_booking(booking_id)
+        booking = await self.get_booking(booking_id)
         if not booking:
             return None
         
+        old_status = booking.status
+
         # Update payment_status enum
         booking.payment_status = PaymentStatus(payment_status)
         
@@ -175,43 +315,49 @@ class BookingService:
         
         booking.updated_at = datetime.utcnow()
         
-        self.db.commit()
+        owner_id = booking.listing.owner_id
+        await MetricsRollup.move_booking(self.db, booking, owner_id, old_status, booking.amount)
+        await self.db.commit()
+        await AnalyticsCache.invalidate_bookings(owner_id=owner_id)
         # Re-fetch with relationships
-        return self.get_booking(booking_id)
+        return await self.get_booking(booking_id, reload=True)
 
 
 class AdminSettingsService:
     """Service for managing admin payment settings"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def get_settings(self) -> Optional[AdminSettings]:
+    async def get_settings(self) -> Optional[AdminSettings]:
         """Get the admin settings (there should only be one row)"""
-        result = self.db.execute(select(AdminSettings))
+        result = await self.db.execute(select(AdminSettings))
         return result.scalars().first()
     
-    def update_settings(self, data: AdminSettingsUpdate, admin_id: int) -> AdminSettings:
+    async def update_settings(self, data: AdminSettingsUpdate, admin_id: int) -> AdminSettings:
         """Update or create admin settings"""
-        settings = self.get_settings()
+        settings = await self.get_settings()
+        qr_code, qr_code_sha256 = await Blobs.reference(data.payment_qr_code, PAYMENT_QR_CODES_FOLDER)
         
         if not settings:
             # Create new settings
             settings = AdminSettings(
-                payment_qr_code=data.payment_qr_code,
+                payment_qr_code=qr_code,
+                payment_qr_code_sha256=qr_code_sha256,
                 payment_upi_id=data.payment_upi_id,
                 updated_by=admin_id,
+                updated_at=datetime.utcnow(),
             )
             self.db.add(settings)
         else:
             # Update existing settings
             if data.payment_qr_code is not None:
-                settings.payment_qr_code = data.payment_qr_code
+                settings.payment_qr_code, settings.payment_qr_code_sha256 = qr_code, qr_code_sha256
             if data.payment_upi_id is not None:
                 settings.payment_upi_id = data.payment_upi_id
             settings.updated_by = admin_id
             settings.updated_at = datetime.utcnow()
         
-        self.db.commit()
-        self.db.refresh(settings)
+        await self.db.commit()
+        await self.db.refresh(settings)
         return settings
@@ -1,23 +1,228 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, case, and_
+from datetime import date, datetime
 from typing import Dict, List, Any
 
 from apps.accounts.models import User
 from apps.bookings.models import Booking
 from apps.listings.models import Listing
 from apps.accounts.services.authenticate import AccountService
-from config.database import get_db
+from apps.accounts.services.token import Principal
+from apps.core.cache import AnalyticsCache
+from apps.core.models import DailyMetric, DailySignup
+from apps.core.query_budget import query_budget
+from apps.core.query_stats import QueryStats
+from apps.core.trends import TrendEngine
+from config.database import get_async_db
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
 
+class AnalyticsService:
+    """
+    Aggregate queries behind the analytics endpoints.
+
+    Booking counters, revenue and trends are read from the ``daily_metrics`` /
+    ``daily_signups`` rollups (see ``apps.core.rollups``), so their cost depends on
+    the number of days in the window rather than the size of ``bookings``. Each
+    report costs a small, fixed number of queries regardless of the period.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def dashboard(self, period: str) -> Dict[str, Any]:
+        """Platform-wide overview, breakdowns and trends for the admin dashboard"""
+        now = datetime.now()
+        start_day = TrendEngine.period_start(period, now).date()
+
+        bookings_by_status = await self._status_totals(start_day)
+        status_breakdown = {row.status: row.bookings for row in bookings_by_status}
+        accepted = next((row for row in bookings_by_status if row.status == 'accepted'), None)
+
+        # User counters plus users with a booking in a single round trip. The semi-join probes
+        # ix_bookings_user_id_created_at_id per user instead of reading every booking.
+        active_users = (
+            select(func.count())
+            .select_from(User)
+            .where(select(Booking.id).where(Booking.user_id == User.id).exists())
+            .correlate(None)
+            .scalar_subquery()
+        )
+        users = (await self.db.execute(
+            select(
+                func.count(User.id).label('total_users'),
+                func.sum(case((and_(
+                    User.role.in_(['hostel', 'coaching', 'library', 'tiffin']),
+                    User.is_approved_lister == False,
+                ), 1), else_=0)).label('pending_listers'),
+                active_users.label('active_users'),
+            ).select_from(User)
+        )).one()
+
+        # Listings by type
+        listings_by_type = (await self.db.execute(
+            select(Listing.type, func.count(Listing.id).label('count')).group_by(Listing.type)
+        )).all()
+        type_breakdown = {ltype: count for ltype, count in listings_by_type}
+
+        # Trends: bookings and revenue share one bucketed query, users another
+        booking_trends = await TrendEngine.series(self.db, period, DailyMetric.day, self._trend_metrics(), now=now)
+        user_trends = await TrendEngine.series(
+            self.db, period, DailySignup.day,
+            {"users": func.sum(DailySignup.users)},
+            now=now,
+        )
+
+        return {
+            "overview": {
+                "total_users": users.total_users,
+                "total_listings": sum(type_breakdown.values()),
+                "total_bookings": sum(status_breakdown.values()),
+                "active_users": users.active_users,
+                "total_revenue": TrendEngine.number(accepted.amount if accepted else None, True),
+                "period_revenue": TrendEngine.number(accepted.period_amount if accepted else None, True),
+                "pending_listers": TrendEngine.number(users.pending_listers),
+                "pending_bookings": status_breakdown.get('pending', 0),
+            },
+            "bookings_by_status": status_breakdown,
+            "listings_by_type": type_breakdown,
+            "trends": {
+                "bookings": booking_trends["bookings"],
+                "users": user_trends["users"],
+                "revenue": booking_trends["revenue"],
+            },
+            "period": period,
+        }
+
+    async def owner(self, owner_id: int, period: str, include_listings: bool = False) -> Dict[str, Any]:
+        """
+        Analytics for a single listing owner.
+
+        Rollup rows carry ``owner_id`` directly; the live query for distinct
+        customers joins ``listings`` on ``owner_id`` instead of sending the owner's
+        listing IDs back to the database as an IN list.
+        """
+        now = datetime.now()
+        start_day = TrendEngine.period_start(period, now).date()
+        owns_row = DailyMetric.owner_id == owner_id
+
+        bookings_by_status = await self._status_totals(start_day, owns_row)
+        status_breakdown = {row.status: row.bookings for row in bookings_by_status}
+        accepted = next((row for row in bookings_by_status if row.status == 'accepted'), None)
+
+        # Listing count plus distinct customers in a single round trip
+        unique_customers = (
+            select(func.count(func.distinct(Booking.user_id)))
+            .join(Listing, Booking.listing_id == Listing.id)
+            .where(Listing.owner_id == owner_id)
+            .scalar_subquery()
+        )
+        listings = (await self.db.execute(
+            select(
+                func.count(Listing.id).label('total_listings'),
+                unique_customers.label('unique_customers'),
+            ).where(Listing.owner_id == owner_id)
+        )).one()
+
+        trends = await TrendEngine.series(self.db, period, DailyMetric.day, self._trend_metrics(), owns_row, now=now)
+
+        total_bookings = sum(status_breakdown.values())
+        total_revenue = TrendEngine.number(accepted.amount if accepted else None, True)
+        avg_booking_value = (total_revenue / total_bookings) if total_bookings > 0 else 0.0
+
+        result = {
+            "overview": {
+                "total_listings": listings.total_listings,
+                "active_listings": listings.total_listings,  # Listings are active by default
+                "total_bookings": total_bookings,
+                "period_bookings": sum(TrendEngine.number(row.period_bookings) for row in bookings_by_status),
+                "unique_customers": listings.unique_customers or 0,
+                "total_revenue": total_revenue,
+                "period_revenue": TrendEngine.number(accepted.period_amount if accepted else None, True),
+                "pending_bookings": status_breakdown.get('pending', 0),
+                "avg_booking_value": float(avg_booking_value),
+            },
+            "bookings_by_status": status_breakdown,
+            "trends": {
+                "bookings": trends["bookings"],
+                "revenue": trends["revenue"],
+            },
+            "period": period,
+        }
+
+        if include_listings:
+            result["listings"] = await self.owner_listings_breakdown(owner_id, start_day)
+
+        return result
+
+    async def owner_listings_breakdown(self, owner_id: int, start_day: date) -> List[Dict[str, Any]]:
+        """Per-listing booking and revenue totals for one owner, in a single grouped query"""
+        is_accepted = DailyMetric.status == 'accepted'
+        in_period = DailyMetric.day >= start_day
+
+        rows = (await self.db.execute(
+            select(
+                Listing.id,
+                Listing.name,
+                Listing.type,
+                func.sum(DailyMetric.bookings).label('total_bookings'),
+                func.sum(case((in_period, DailyMetric.bookings), else_=0)).label('period_bookings'),
+                func.sum(case((DailyMetric.status == 'pending', DailyMetric.bookings), else_=0)).label('pending_bookings'),
+                func.sum(case((is_accepted, DailyMetric.amount), else_=0)).label('total_revenue'),
+                func.sum(case((and_(is_accepted, in_period), DailyMetric.amount), else_=0)).label('period_revenue'),
+            )
+            .outerjoin(DailyMetric, DailyMetric.listing_id == Listing.id)
+            .where(Listing.owner_id == owner_id)
+            .group_by(Listing.id, Listing.name, Listing.type)
+            .order_by(Listing.id)
+        )).all()
+
+        return [
+            {
+                "listing_id": row.id,
+                "name": row.name,
+                "type": row.type,
+                "total_bookings": TrendEngine.number(row.total_bookings),
+                "period_bookings": TrendEngine.number(row.period_bookings),
+                "pending_bookings": TrendEngine.number(row.pending_bookings),
+                "total_revenue": TrendEngine.number(row.total_revenue, True),
+                "period_revenue": TrendEngine.number(row.period_revenue, True),
+            }
+            for row in rows
+        ]
+
+    async def _status_totals(self, start_day: date, *criteria: Any):
+        """Booking count and revenue per status from the rollup, all-time and since ``start_day``"""
+        in_period = DailyMetric.day >= start_day
+        return (await self.db.execute(
+            select(
+                DailyMetric.status,
+                func.sum(DailyMetric.bookings).label('bookings'),
+                func.sum(case((in_period, DailyMetric.bookings), else_=0)).label('period_bookings'),
+                func.sum(DailyMetric.amount).label('amount'),
+                func.sum(case((in_period, DailyMetric.amount), else_=0)).label('period_amount'),
+            )
+            .where(*criteria)
+            .group_by(DailyMetric.status)
+            .having(func.sum(DailyMetric.bookings) != 0)
+        )).all()
+
+    @staticmethod
+    def _trend_metrics() -> Dict[str, Any]:
+        return {
+            "bookings": func.sum(DailyMetric.bookings),
+            "revenue": func.sum(case((DailyMetric.status == 'accepted', DailyMetric.amount), else_=0)),
+        }
+
+
 @router.get("/dashboard")
+@query_budget(10)
 async def get_dashboard_analytics(
     period: str = Query("month", regex="^(week|month|year)$"),
-    current_user: User = Depends(AccountService.current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(AccountService.current_principal),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Dict[str, Any]:
     """Get comprehensive analytics for admin dashboard"""
     if current_user.role != "admin":
@@ -25,252 +230,17 @@ async def get_dashboard_analytics(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
         )
-    
-    # Calculate date range based on period
-    now = datetime.now()
-    if period == "week":
-        start_date = now - timedelta(days=7)
-    elif period == "month":
-        start_date = now - timedelta(days=30)
-    else:  # year
-        start_date = now - timedelta(days=365)
-    
-    # Total counts
-    total_users = db.query(func.count(User.id)).scalar()
-    total_listings = db.query(func.count(Listing.id)).scalar()
-    total_bookings = db.query(func.count(Booking.id)).scalar()
-    
-    # Active users (users who have made bookings)
-    active_users = db.query(func.count(func.distinct(Booking.user_id))).scalar()
-    
-    # Bookings in period
-    period_bookings = db.query(func.count(Booking.id))\
-        .filter(Booking.created_at >= start_date)\
-        .scalar()
-    
-    # Revenue statistics
-    total_revenue = db.query(func.sum(Booking.amount))\
-        .filter(Booking.status == 'accepted')\
-        .scalar() or 0.0
-    
-    period_revenue = db.query(func.sum(Booking.amount))\
-        .filter(Booking.status == 'accepted', Booking.created_at >= start_date)\
-        .scalar() or 0.0
-    
-    # Pending approvals
-    pending_listers = db.query(func.count(User.id))\
-        .filter(
-            User.role.in_(['hostel', 'coaching', 'library', 'tiffin']),
-            User.is_approved_lister == False
-        )\
-        .scalar()
-    
-    pending_bookings = db.query(func.count(Booking.id))\
-        .filter(Booking.status == 'pending')\
-        .scalar()
-    
-    # Bookings by status
-    bookings_by_status = db.query(
-        Booking.status,
-        func.count(Booking.id).label('count')
-    ).group_by(Booking.status).all()
-    
-    status_breakdown = {status: count for status, count in bookings_by_status}
-    
-    # Monthly bookings trend (last 12 months for month/year view, last 7 days for week)
-    if period == "week":
-        # Daily bookings for the last 7 days
-        bookings_trend = []
-        for i in range(7):
-            date = now - timedelta(days=6-i)
-            day_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day_start + timedelta(days=1)
-            
-            count = db.query(func.count(Booking.id))\
-                .filter(Booking.created_at >= day_start, Booking.created_at < day_end)\
-                .scalar()
-            
-            bookings_trend.append({
-                "label": date.strftime("%a"),
-                "value": count
-            })
-    elif period == "month":
-        # Weekly bookings for the last 4 weeks
-        bookings_trend = []
-        for i in range(4):
-            week_start = now - timedelta(days=(3-i)*7 + now.weekday())
-            week_end = week_start + timedelta(days=7)
-            
-            count = db.query(func.count(Booking.id))\
-                .filter(Booking.created_at >= week_start, Booking.created_at < week_end)\
-                .scalar()
-            
-            bookings_trend.append({
-                "label": f"Week {i+1}",
-                "value": count
-            })
-    else:  # year
-        # Monthly bookings for the last 12 months
-        bookings_trend = []
-        for i in range(12):
-            month_date = now - timedelta(days=30*(11-i))
-            month = month_date.month
-            year = month_date.year
-            
-            count = db.query(func.count(Booking.id))\
-                .filter(
-                    extract('month', Booking.created_at) == month,
-                    extract('year', Booking.created_at) == year
-                )\
-                .scalar()
-            
-            bookings_trend.append({
-                "label": month_date.strftime("%b %y"),
-                "value": count
-            })
-    
-    # User growth trend (similar logic)
-    if period == "week":
-        user_growth = []
-        for i in range(7):
-            date = now - timedelta(days=6-i)
-            day_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day_start + timedelta(days=1)
-            
-            count = db.query(func.count(User.id))\
-                .filter(User.date_joined >= day_start, User.date_joined < day_end)\
-                .scalar()
-            
-            user_growth.append({
-                "label": date.strftime("%a"),
-                "value": count
-            })
-    elif period == "month":
-        user_growth = []
-        for i in range(4):
-            week_start = now - timedelta(days=(3-i)*7 + now.weekday())
-            week_end = week_start + timedelta(days=7)
-            
-            count = db.query(func.count(User.id))\
-                .filter(User.date_joined >= week_start, User.date_joined < week_end)\
-                .scalar()
-            
-            user_growth.append({
-                "label": f"Week {i+1}",
-                "value": count
-            })
-    else:  # year
-        user_growth = []
-        for i in range(12):
-            month_date = now - timedelta(days=30*(11-i))
-            month = month_date.month
-            year = month_date.year
-            
-            count = db.query(func.count(User.id))\
-                .filter(
-                    extract('month', User.date_joined) == month,
-                    extract('year', User.date_joined) == year
-                )\
-                .scalar()
-            
-            user_growth.append({
-                "label": month_date.strftime("%b %y"),
-                "value": count
-            })
-    
-    # Revenue trend
-    if period == "week":
-        revenue_trend = []
-        for i in range(7):
-            date = now - timedelta(days=6-i)
-            day_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day_start + timedelta(days=1)
-            
-            revenue = db.query(func.sum(Booking.amount))\
-                .filter(
-                    Booking.status == 'accepted',
-                    Booking.created_at >= day_start,
-                    Booking.created_at < day_end
-                )\
-                .scalar() or 0.0
-            
-            revenue_trend.append({
-                "label": date.strftime("%a"),
-                "value": float(revenue)
-            })
-    elif period == "month":
-        revenue_trend = []
-        for i in range(4):
-            week_start = now - timedelta(days=(3-i)*7 + now.weekday())
-            week_end = week_start + timedelta(days=7)
-            
-            revenue = db.query(func.sum(Booking.amount))\
-                .filter(
-                    Booking.status == 'accepted',
-                    Booking.created_at >= week_start,
-                    Booking.created_at < week_end
-                )\
-                .scalar() or 0.0
-            
-            revenue_trend.append({
-                "label": f"Week {i+1}",
-                "value": float(revenue)
-            })
-    else:  # year
-        revenue_trend = []
-        for i in range(12):
-            month_date = now - timedelta(days=30*(11-i))
-            month = month_date.month
-            year = month_date.year
-            
-            revenue = db.query(func.sum(Booking.amount))\
-                .filter(
-                    Booking.status == 'accepted',
-                    extract('month', Booking.created_at) == month,
-                    extract('year', Booking.created_at) == year
-                )\
-                .scalar() or 0.0
-            
-            revenue_trend.append({
-                "label": month_date.strftime("%b %y"),
-                "value": float(revenue)
-            })
-    
-    # Listings by type
-    listings_by_type = db.query(
-        Listing.type,
-        func.count(Listing.id).label('count')
-    ).group_by(Listing.type).all()
-    
-    type_breakdown = {ltype: count for ltype, count in listings_by_type}
-    
-    return {
-        "overview": {
-            "total_users": total_users,
-            "total_listings": total_listings,
-            "total_bookings": total_bookings,
-            "active_users": active_users,
-            "total_revenue": float(total_revenue),
-            "period_revenue": float(period_revenue),
-            "pending_listers": pending_listers,
-            "pending_bookings": pending_bookings,
-        },
-        "bookings_by_status": status_breakdown,
-        "listings_by_type": type_breakdown,
-        "trends": {
-            "bookings": bookings_trend,
-            "users": user_growth,
-            "revenue": revenue_trend,
-        },
-        "period": period,
-    }
+
+    return await AnalyticsCache.get_or_set("dashboard", period, None, lambda: AnalyticsService(db).dashboard(period))
 
 
 @router.get("/owner")
+@query_budget(8)
 async def get_owner_analytics(
     period: str = Query("month", regex="^(week|month|year)$"),
-    current_user: User = Depends(AccountService.current_user),
-    db: Session = Depends(get_db),
+    include_listings: bool = Query(False, description="Include a per-listing breakdown"),
+    current_user: Principal = Depends(AccountService.current_principal),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Dict[str, Any]:
     """Get comprehensive analytics for listing owners (hostel, coaching, library, tiffin)"""
     if current_user.role not in ['hostel', 'coaching', 'library', 'tiffin']:
@@ -278,216 +248,57 @@ async def get_owner_analytics(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Listing owner access required"
         )
-    
-    # Calculate date range based on period
-    now = datetime.now()
-    if period == "week":
-        start_date = now - timedelta(days=7)
-    elif period == "month":
-        start_date = now - timedelta(days=30)
-    else:  # year
-        start_date = now - timedelta(days=365)
-    
-    # Get owner's listings
-    owner_listings = db.query(Listing).filter(Listing.owner_id == current_user.id).all()
-    listing_ids = [listing.id for listing in owner_listings]
-    
-    # Total counts for this owner
-    total_listings = len(owner_listings)
-    active_listings = len([l for l in owner_listings if l.id])  # Assuming active by default
-    
-    # Bookings for owner's listings
-    total_bookings = db.query(func.count(Booking.id))\
-        .filter(Booking.listing_id.in_(listing_ids) if listing_ids else False)\
-        .scalar() or 0
-    
-    # Period bookings
-    period_bookings = db.query(func.count(Booking.id))\
-        .filter(
-            Booking.listing_id.in_(listing_ids) if listing_ids else False,
-            Booking.created_at >= start_date
-        )\
-        .scalar() or 0
-    
-    # Revenue statistics
-    total_revenue = db.query(func.sum(Booking.amount))\
-        .filter(
-            Booking.status == 'accepted',
-            Booking.listing_id.in_(listing_ids) if listing_ids else False
-        )\
-        .scalar() or 0.0
-    
-    period_revenue = db.query(func.sum(Booking.amount))\
-        .filter(
-            Booking.status == 'accepted',
-            Booking.created_at >= start_date,
-            Booking.listing_id.in_(listing_ids) if listing_ids else False
-        )\
-        .scalar() or 0.0
-    
-    # Pending bookings
-    pending_bookings = db.query(func.count(Booking.id))\
-        .filter(
-            Booking.status == 'pending',
-            Booking.listing_id.in_(listing_ids) if listing_ids else False
-        )\
-        .scalar() or 0
-    
-    # Unique customers
-    unique_customers = db.query(func.count(func.distinct(Booking.user_id)))\
-        .filter(
-            Booking.listing_id.in_(listing_ids) if listing_ids else False
-        )\
-        .scalar() or 0
-    
-    # Bookings by status
-    bookings_by_status = db.query(
-        Booking.status,
-        func.count(Booking.id).label('count')
-    ).filter(
-        Booking.listing_id.in_(listing_ids) if listing_ids else False
-    ).group_by(Booking.status).all()
-    
-    status_breakdown = {status: count for status, count in bookings_by_status}
-    
-    # Bookings trend
-    if period == "week":
-        bookings_trend = []
-        for i in range(7):
-            date = now - timedelta(days=6-i)
-            day_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day_start + timedelta(days=1)
-            
-            count = db.query(func.count(Booking.id))\
-                .filter(
-                    Booking.created_at >= day_start,
-                    Booking.created_at < day_end,
-                    Booking.listing_id.in_(listing_ids) if listing_ids else False
-                )\
-                .scalar() or 0
-            
-            bookings_trend.append({
-                "label": date.strftime("%a"),
-                "value": count
-            })
-    elif period == "month":
-        bookings_trend = []
-        for i in range(4):
-            week_start = now - timedelta(days=(3-i)*7 + now.weekday())
-            week_end = week_start + timedelta(days=7)
-            
-            count = db.query(func.count(Booking.id))\
-                .filter(
-                    Booking.created_at >= week_start,
-                    Booking.created_at < week_end,
-                    Booking.listing_id.in_(listing_ids) if listing_ids else False
-                )\
-                .scalar() or 0
-            
-            bookings_trend.append({
-                "label": f"Week {i+1}",
-                "value": count
-            })
-    else:  # year
-        bookings_trend = []
-        for i in range(12):
-            month_date = now - timedelta(days=30*(11-i))
-            month = month_date.month
-            year = month_date.year
-            
-            count = db.query(func.count(Booking.id))\
-                .filter(
-                    extract('month', Booking.created_at) == month,
-                    extract('year', Booking.created_at) == year,
-                    Booking.listing_id.in_(listing_ids) if listing_ids else False
-                )\
-                .scalar() or 0
-            
-            bookings_trend.append({
-                "label": month_date.strftime("%b %y"),
-                "value": count
-            })
-    
-    # Revenue trend
-    if period == "week":
-        revenue_trend = []
-        for i in range(7):
-            date = now - timedelta(days=6-i)
-            day_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day_start + timedelta(days=1)
-            
-            revenue = db.query(func.sum(Booking.amount))\
-                .filter(
-                    Booking.status == 'accepted',
-                    Booking.created_at >= day_start,
-                    Booking.created_at < day_end,
-                    Booking.listing_id.in_(listing_ids) if listing_ids else False
-                )\
-                .scalar() or 0.0
-            
-            revenue_trend.append({
-                "label": date.strftime("%a"),
-                "value": float(revenue)
-            })
-    elif period == "month":
-        revenue_trend = []
-        for i in range(4):
-            week_start = now - timedelta(days=(3-i)*7 + now.weekday())
-            week_end = week_start + timedelta(days=7)
-            
-            revenue = db.query(func.sum(Booking.amount))\
-                .filter(
-                    Booking.status == 'accepted',
-                    Booking.created_at >= week_start,
-                    Booking.created_at < week_end,
-                    Booking.listing_id.in_(listing_ids) if listing_ids else False
-                )\
-                .scalar() or 0.0
-            
-            revenue_trend.append({
-                "label": f"Week {i+1}",
-                "value": float(revenue)
-            })
-    else:  # year
-        revenue_trend = []
-        for i in range(12):
-            month_date = now - timedelta(days=30*(11-i))
-            month = month_date.month
-            year = month_date.year
-            
-            revenue = db.query(func.sum(Booking.amount))\
-                .filter(
-                    Booking.status == 'accepted',
-                    extract('month', Booking.created_at) == month,
-                    extract('year', Booking.created_at) == year,
-                    Booking.listing_id.in_(listing_ids) if listing_ids else False
-                )\
-                .scalar() or 0.0
-            
-            revenue_trend.append({
-                "label": month_date.strftime("%b %y"),
-                "value": float(revenue)
-            })
-    
-    # Average booking value
-    avg_booking_value = (total_revenue / total_bookings) if total_bookings > 0 else 0.0
-    
-    return {
-        "overview": {
-            "total_listings": total_listings,
-            "active_listings": active_listings,
-            "total_bookings": total_bookings,
-            "period_bookings": period_bookings,
-            "unique_customers": unique_customers,
-            "total_revenue": float(total_revenue),
-            "period_revenue": float(period_revenue),
-            "pending_bookings": pending_bookings,
-            "avg_booking_value": float(avg_booking_value),
-        },
-        "bookings_by_status": status_breakdown,
-        "trends": {
-            "bookings": bookings_trend,
-            "revenue": revenue_trend,
-        },
-        "period": period,
-    }
+
+    return await AnalyticsCache.get_or_set(
+        "owner+listings" if include_listings else "owner",
+        period,
+        current_user.id,
+        lambda: AnalyticsService(db).owner(current_user.id, period, include_listings=include_listings),
+    )
+
+
+@router.get("/cache")
+@query_budget(0)
+async def get_analytics_cache_stats(
+    current_user: Principal = Depends(AccountService.current_principal),
+) -> Dict[str, Any]:
+    """Hit / miss counters of the analytics result cache (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+    return AnalyticsCache.stats()
+
+
+@router.get("/queries")
+@query_budget(0)
+async def get_query_stats(
+    limit: int = Query(20, ge=1, le=200),
+    sort: str = Query("total", regex="^(total|max|mean|count)$"),
+    current_user: Principal = Depends(AccountService.current_principal),
+) -> Dict[str, Any]:
+    """Statement fingerprints of this worker ranked by total, max or mean time, or by count (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+    return QueryStats.report(limit, sort)
+
+
+@router.delete("/queries", status_code=status.HTTP_204_NO_CONTENT)
+@query_budget(0)
+async def reset_query_stats(
+    current_user: Principal = Depends(AccountService.current_principal),
+):
+    """Start the statement timings of this worker afresh, e.g. after a deploy (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+    QueryStats.reset()
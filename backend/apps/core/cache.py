@@ -0,0 +1,363 @@
+"""
+Small result-cache layer with pluggable backends.
+
+The default backend is an in-process, size-bounded LRU with per-entry TTLs. A
+Redis-compatible backend can be used instead by setting ``ANALYTICS_CACHE_URL``
+(any client exposing ``get`` / ``set(ex=...)`` / ``delete`` / ``scan_iter`` works).
+
+Usage:
+    from apps.core.cache import AnalyticsCache
+
+    data = await AnalyticsCache.get_or_set("dashboard", period, None, lambda: service.dashboard(period))
+    await AnalyticsCache.invalidate_bookings(owner_id=listing.owner_id)
+"""
+
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from apps.core.logger import log
+from config.settings import (
+    ANALYTICS_CACHE_MAX_ENTRIES,
+    ANALYTICS_CACHE_URL,
+    ANALYTICS_DASHBOARD_CACHE_TTL,
+    ANALYTICS_OWNER_CACHE_TTL,
+    CACHE_SOCKET_TIMEOUT,
+)
+
+
+# ----------------
+# --- Backends ---
+# ----------------
+
+class CacheBackend:
+    """Interface every cache backend implements."""
+
+    def get(self, key: str) -> Any:
+        """Return the cached value, or ``None`` if missing / expired."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: int):
+        raise NotImplementedError
+
+    def delete(self, *keys: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    # Awaitable variants for async code. In-process backends answer right away; backends doing
+    # network I/O override them so the event loop never waits on it.
+
+    async def aget(self, key: str) -> Any:
+        return self.get(key)
+
+    async def aset(self, key: str, value: Any, ttl: int):
+        self.set(key, value, ttl)
+
+    async def adelete(self, *keys: str):
+        self.delete(*keys)
+
+
+class MemoryCache(CacheBackend):
+    """Thread-safe in-process LRU cache with per-entry TTL."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: int):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisCache(CacheBackend):
+    """
+    Backend for any Redis-compatible client; values are stored as JSON. The client blocks, so
+    the awaitable methods run it on the thread pool, and `from_url` bounds every call with
+    ``CACHE_SOCKET_TIMEOUT``.
+    """
+
+    def __init__(self, client: Any, prefix: str = "sk-mvp:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "sk-mvp:") -> "RedisCache":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("A redis:// cache URL is set but the `redis` package is not installed") from e
+        client = redis.Redis.from_url(url, socket_timeout=CACHE_SOCKET_TIMEOUT,
+                                      socket_connect_timeout=CACHE_SOCKET_TIMEOUT)
+        return cls(client, prefix=prefix)
+
+    def get(self, key: str) -> Any:
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: int):
+        self.client.set(self.prefix + key, json.dumps(value, default=str), ex=ttl)
+
+    def delete(self, *keys: str):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    async def aget(self, key: str) -> Any:
+        return await run_in_threadpool(self.get, key)
+
+    async def aset(self, key: str, value: Any, ttl: int):
+        await run_in_threadpool(self.set, key, value, ttl)
+
+    async def adelete(self, *keys: str):
+        await run_in_threadpool(self.delete, *keys)
+
+
+# --------------------
+# --- Result cache ---
+# --------------------
+
+class ResultCache:
+    """
+    A named cache over a backend with hit / miss / invalidation counters.
+
+    Every invalidation also rewrites a stamp of the key (and `clear` one of the whole cache),
+    kept in the same backend. A value is only kept if the stamps are the same after it was
+    stored as before it was computed, so a result computed from data that changed meanwhile
+    is dropped instead of being served until its TTL runs out.
+    """
+
+    # Seconds a stamp outlives its last invalidation; far longer than any computation
+    STAMP_TTL = 3600
+
+    def __init__(self, name: str, backend: CacheBackend):
+        self.name = name
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.discarded = 0
+
+    def key(self, *parts: Any) -> str:
+        return ":".join([self.name, *("-" if part is None else str(part) for part in parts)])
+
+    def get_or_set(self, key: str, ttl: int, factory: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key`` or compute, store and return it."""
+        value = self._read(key)
+        if value is not None:
+            return value
+        stamp = self._stamp(key)
+        return self._write(key, ttl, factory(), stamp)
+
+    async def aget_or_set(self, key: str, ttl: int, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Same as ``get_or_set`` for a coroutine factory, calling the backend through its awaitable methods."""
+        value = await self._aread(key)
+        if value is not None:
+            return value
+        stamp = await self._astamp(key)
+        return await self._awrite(key, ttl, await factory(), stamp)
+
+    def _read(self, key: str) -> Any:
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            log.error("Cache read failed", category="SERVICE", cache=self.name, error=str(e))
+            value = None
+        return self._count(value)
+
+    async def _aread(self, key: str) -> Any:
+        try:
+            value = await self.backend.aget(key)
+        except Exception as e:
+            log.error("Cache read failed", category="SERVICE", cache=self.name, error=str(e))
+            value = None
+        return self._count(value)
+
+    def _count(self, value: Any) -> Any:
+        if value is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return value
+
+    def _write(self, key: str, ttl: int, value: Any, stamp: Tuple[Any, Any]) -> Any:
+        if ttl > 0 and value is not None:
+            try:
+                self.backend.set(key, value, ttl)
+                # Checked after the write: an invalidation either shows here or deletes the value itself
+                if self._stamp(key) != stamp:
+                    self.backend.delete(key)
+                    self.discarded += 1
+            except Exception as e:
+                log.error("Cache write failed", category="SERVICE", cache=self.name, error=str(e))
+        return value
+
+    async def _awrite(self, key: str, ttl: int, value: Any, stamp: Tuple[Any, Any]) -> Any:
+        if ttl > 0 and value is not None:
+            try:
+                await self.backend.aset(key, value, ttl)
+                if await self._astamp(key) != stamp:
+                    await self.backend.adelete(key)
+                    self.discarded += 1
+            except Exception as e:
+                log.error("Cache write failed", category="SERVICE", cache=self.name, error=str(e))
+        return value
+
+    def _stamp_keys(self, key: str) -> Tuple[str, str]:
+        return f"{self.name}@clear", f"{key}@stamp"
+
+    def _stamp(self, key: str) -> Tuple[Any, Any]:
+        try:
+            return tuple(self.backend.get(stamp_key) for stamp_key in self._stamp_keys(key))
+        except Exception as e:
+            log.error("Cache read failed", category="SERVICE", cache=self.name, error=str(e))
+            return None, None
+
+    async def _astamp(self, key: str) -> Tuple[Any, Any]:
+        try:
+            return tuple([await self.backend.aget(stamp_key) for stamp_key in self._stamp_keys(key)])
+        except Exception as e:
+            log.error("Cache read failed", category="SERVICE", cache=self.name, error=str(e))
+            return None, None
+
+    def invalidate(self, keys: Iterable[str]):
+        keys = list(keys)
+        for key in keys:
+            self.backend.set(self._stamp_keys(key)[1], uuid.uuid4().hex, self.STAMP_TTL)
+        self.backend.delete(*keys)
+        self.invalidations += len(keys)
+
+    async def ainvalidate(self, keys: Iterable[str]):
+        keys = list(keys)
+        for key in keys:
+            await self.backend.aset(self._stamp_keys(key)[1], uuid.uuid4().hex, self.STAMP_TTL)
+        await self.backend.adelete(*keys)
+        self.invalidations += len(keys)
+
+    def clear(self):
+        self.backend.clear()
+        self.backend.set(f"{self.name}@clear", uuid.uuid4().hex, self.STAMP_TTL)
+        self.invalidations += 1
+
+    async def aclear(self):
+        await run_in_threadpool(self.backend.clear)
+        await self.backend.aset(f"{self.name}@clear", uuid.uuid4().hex, self.STAMP_TTL)
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        stats = {
+            "name": self.name,
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "discarded": self.discarded,
+        }
+        if isinstance(self.backend, MemoryCache):
+            stats.update(size=len(self.backend), max_entries=self.backend.max_entries,
+                         evictions=self.backend.evictions)
+        return stats
+
+
+# -----------------------
+# --- Analytics cache ---
+# -----------------------
+
+class AnalyticsCache:
+    """
+    Cache for the outputs of ``apps.core.analytics``, keyed by (endpoint, period, owner_id).
+
+    Booking writes and user registrations call the ``invalidate_*`` hooks after they
+    commit, so cached reports never outlive the data they were computed from, not even
+    a report still being computed when the data changed (see `ResultCache`).
+    """
+
+    PERIODS = ("week", "month", "year")
+    OWNER_ENDPOINTS = ("owner", "owner+listings")
+    TTLS = {
+        "dashboard": ANALYTICS_DASHBOARD_CACHE_TTL,
+        "owner": ANALYTICS_OWNER_CACHE_TTL,
+        "owner+listings": ANALYTICS_OWNER_CACHE_TTL,
+    }
+
+    cache = ResultCache(
+        "analytics",
+        RedisCache.from_url(ANALYTICS_CACHE_URL) if ANALYTICS_CACHE_URL else MemoryCache(ANALYTICS_CACHE_MAX_ENTRIES),
+    )
+
+    @classmethod
+    async def get_or_set(cls, endpoint: str, period: str, owner_id: Optional[int],
+                         factory: Callable[[], Awaitable[Any]]) -> Any:
+        return await cls.cache.aget_or_set(cls.cache.key(endpoint, period, owner_id), cls.TTLS[endpoint], factory)
+
+    @classmethod
+    async def invalidate_bookings(cls, owner_id: Optional[int] = None):
+        """A booking changed: drop the admin dashboard and the listing owner's reports."""
+        keys = [cls.cache.key("dashboard", period, None) for period in cls.PERIODS]
+        if owner_id is not None:
+            keys += [cls.cache.key(endpoint, period, owner_id)
+                     for endpoint in cls.OWNER_ENDPOINTS for period in cls.PERIODS]
+        await cls._safe(cls.cache.ainvalidate(keys))
+
+    @classmethod
+    async def invalidate_users(cls):
+        """A user signed up (or was removed): drop the admin dashboard."""
+        await cls._safe(cls.cache.ainvalidate([cls.cache.key("dashboard", period, None) for period in cls.PERIODS]))
+
+    @classmethod
+    async def invalidate_all(cls):
+        await cls._safe(cls.cache.aclear())
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        return cls.cache.stats()
+
+    @staticmethod
+    async def _safe(action: Awaitable[Any]):
+        # A cache outage must never fail the write that triggered the invalidation
+        try:
+            await action
+        except Exception as e:
+            log.error("Analytics cache invalidation failed", category="SERVICE", error=str(e))
@@ -0,0 +1,164 @@
+"""
+Geocoding of listing locations.
+
+`Listing.location` is free text ("Mukherjee Nagar, Delhi"). Proximity search needs
+coordinates, so locations are resolved to (latitude, longitude) by a pluggable geocoder:
+
+- ``GEOCODER``: dotted path of a `Geocoder` subclass (default: `GazetteerGeocoder`)
+- ``GEOCODER_GAZETTEER_PATH``: CSV file with ``name,latitude,longitude`` rows, used by
+  the default geocoder
+
+The default geocoder works offline: a location is looked up as a whole, then by its
+comma-separated parts from the most specific one ("Mukherjee Nagar" before "Delhi").
+
+Geocode the listings that have a location but no coordinates:
+
+    python -m apps.core.geocoding            # missing coordinates only
+    python -m apps.core.geocoding --all      # every listing with a location
+"""
+
+import csv
+import importlib
+import os
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.core.logger import log
+from apps.listings.models import Listing
+from config.settings import GEOCODER, GEOCODER_GAZETTEER_PATH
+
+Coordinates = Tuple[float, float]
+
+
+class Geocoder:
+    """Resolves a free-text location to (latitude, longitude). Called inline on listing writes, so keep it fast."""
+
+    def geocode(self, location: str) -> Optional[Coordinates]:
+        raise NotImplementedError
+
+
+class GazetteerGeocoder(Geocoder):
+    """Offline geocoder backed by a ``name,latitude,longitude`` CSV file."""
+
+    def __init__(self, path: Optional[str] = GEOCODER_GAZETTEER_PATH):
+        self.places: Dict[str, Coordinates] = {}
+        if not path:
+            return
+        if not os.path.exists(path):
+            log.warn("Gazetteer file not found, locations won't be geocoded", category="SERVICE", path=path)
+            return
+
+        with open(path, newline="", encoding="utf-8") as file:
+            for row in csv.DictReader(file):
+                try:
+                    coordinates = (float(row["latitude"]), float(row["longitude"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if valid_coordinates(*coordinates):
+                    self.places[self.normalize(row.get("name") or "")] = coordinates
+        log.info("Gazetteer loaded", path=path, places=len(self.places))
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        return " ".join(name.lower().replace(".", " ").split())
+
+    def geocode(self, location: str) -> Optional[Coordinates]:
+        if not location or not self.places:
+            return None
+
+        candidates = [location] + [part for part in location.split(",") if part.strip()]
+        for candidate in candidates:
+            coordinates = self.places.get(self.normalize(candidate))
+            if coordinates:
+                return coordinates
+        return None
+
+
+def valid_coordinates(latitude: float, longitude: float) -> bool:
+    return -90 <= latitude <= 90 and -180 <= longitude <= 180
+
+
+class Geocoders:
+
+    _geocoder: Optional[Geocoder] = None
+
+    @classmethod
+    def get(cls) -> Geocoder:
+        """The configured geocoder (``GEOCODER``), created on first use."""
+        if cls._geocoder is None:
+            module, _, name = GEOCODER.rpartition(".")
+            cls._geocoder = getattr(importlib.import_module(module), name)()
+        return cls._geocoder
+
+    @classmethod
+    def locate(cls, location: Optional[str]) -> Tuple[Optional[float], Optional[float]]:
+        """(latitude, longitude) of a location, (None, None) when it can't be geocoded."""
+        if not location:
+            return None, None
+        try:
+            coordinates = cls.get().geocode(location)
+        except Exception as e:
+            log.error("Geocoding failed", category="SERVICE", location=location, error=str(e))
+            return None, None
+        return coordinates or (None, None)
+
+    @classmethod
+    async def geocode_listings(cls, db: AsyncSession, everything: bool = False,
+                               batch_size: int = 500) -> Tuple[int, int]:
+        """
+        Geocode listings with a location (only those without coordinates unless ``everything``),
+        committing per batch. Returns (listings looked at, listings geocoded).
+        """
+        seen = geocoded = 0
+        last_id = 0
+        while True:
+            query = (
+                select(Listing.id, Listing.location)
+                .where(Listing.location.isnot(None), Listing.id > last_id)
+                .order_by(Listing.id)
+                .limit(batch_size)
+            )
+            if not everything:
+                query = query.where(Listing.latitude.is_(None))
+            rows = (await db.execute(query)).all()
+            if not rows:
+                break
+
+            for row in rows:
+                latitude, longitude = cls.locate(row.location)
+                if latitude is not None:
+                    await db.execute(
+                        update(Listing).where(Listing.id == row.id).values(latitude=latitude, longitude=longitude)
+                    )
+                    geocoded += 1
+            await db.commit()
+
+            seen += len(rows)
+            last_id = rows[-1].id
+            log.info("Geocoded listings batch", seen=seen, geocoded=geocoded)
+
+        return seen, geocoded
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    import apps.faculty.models  # noqa: F401  (configures the Listing.faculty relationship)
+    from config.database import async_engine, get_async_session
+
+    parser = argparse.ArgumentParser(description="Geocode listing locations with the configured geocoder.")
+    parser.add_argument("--all", action="store_true", help="re-geocode listings that already have coordinates")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    async def run():
+        async with get_async_session() as session:
+            result = await Geocoders.geocode_listings(session, everything=args.all, batch_size=args.batch_size)
+        await async_engine.dispose()
+        return result
+
+    seen, geocoded = asyncio.run(run())
+    print(f"Geocoded {geocoded} of {seen} listings.")
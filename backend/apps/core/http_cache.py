@@ -0,0 +1,92 @@
+"""
+HTTP conditional requests for endpoints whose data rarely changes.
+
+An endpoint works out a cheap validator of what it would return and asks `HttpCache.check`
+whether the client's copy is still current before loading anything else. For one row that is
+its latest ``updated_at`` (with its children's and their count); for a collection, the write
+counter of its tables (`CatalogVersion`), a single-row read however large the table:
+
+    @router.get("/{listing_id}")
+    async def get_listing(listing_id: int, request: Request, response: Response, ...):
+        changed, rows = await service.listing_version(listing_id)
+        not_modified = HttpCache.check(request, response, HttpCache.etag(changed, rows), changed)
+        if not_modified:
+            return not_modified
+        ...
+
+The ETag is weak (the same data may serialize to different bytes). Last-Modified only moves
+forward with ``updated_at``, and a deleted row leaves no timestamp behind: collections send
+only the ETag. ``If-None-Match`` takes precedence when both are sent.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response, status
+
+from config.settings import CATALOG_CACHE_CONTROL
+
+
+class HttpCache:
+
+    @staticmethod
+    def etag(*parts: Any) -> str:
+        """Weak ETag of the values the representation is derived from"""
+        digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+        return f'W/"{digest}"'
+
+    @staticmethod
+    def http_date(moment: datetime) -> str:
+        """``moment`` (naive means UTC, as the database stores it) as an HTTP date"""
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+    @classmethod
+    def headers(cls, etag: str, last_modified: Optional[datetime] = None,
+                cache_control: str = CATALOG_CACHE_CONTROL) -> Dict[str, str]:
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if last_modified is not None:
+            headers["Last-Modified"] = cls.http_date(last_modified)
+        return headers
+
+    @classmethod
+    def check(cls, request: Request, response: Response, etag: str, last_modified: Optional[datetime] = None,
+              cache_control: str = CATALOG_CACHE_CONTROL) -> Optional[Response]:
+        """
+        Set the validators and ``Cache-Control`` on ``response``; return a 304 response to send
+        instead when the request's ``If-None-Match`` / ``If-Modified-Since`` show the client's copy is current.
+        """
+        headers = cls.headers(etag, last_modified, cache_control)
+        response.headers.update(headers)
+        if cls.is_fresh(request, etag, last_modified):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return None
+
+    @classmethod
+    def is_fresh(cls, request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+        """Whether the client's cached copy matches (RFC 9110 section 13.2.2, GET and HEAD only)"""
+        if request.method not in ("GET", "HEAD"):
+            return False
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            # Weak comparison: W/ prefixes are ignored
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or etag.removeprefix("W/") in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is None or last_modified is None:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # HTTP dates have whole seconds
+        return last_modified.replace(microsecond=0) <= since
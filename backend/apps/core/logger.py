@@ -1,99 +1,214 @@
 """
 Central Logging Utility for Backend
 
-Controlled via .env: ENABLE_LOGS=true
+Controlled via .env: ENABLE_LOGS=true, plus LOG_LEVEL, LOG_LEVELS, LOG_FORMAT and
+LOG_SAMPLE_RATES (see config/settings.py)
 
 Usage:
     from apps.core.logger import log
-    
+
     log.info("User logged in", user_id=123)
     log.api("POST /bookings", booking_id=456)
-    log.error("Database error", error=str(e))
+    log.error("Database error", category="DB", error=str(e))
+
+Records go through the `logging` module, one logger per category (``prephub.api``,
+``prephub.db``, ...). A call only checks the category's level and sample rate and puts
+the record on a queue; a `QueueListener` thread formats it (text or JSON) and writes it
+to stdout, so nothing is formatted for filtered records and no request waits on I/O.
+Every record carries the id of the request it was logged from (`RequestIdMiddleware`).
+``error`` / ``warn`` / ``debug`` take the caller's ``category`` (APP by default), so their
+records are filtered and tagged like the caller's other logs.
 """
 
-import os
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 from typing import Any, Dict, Optional
-from datetime import datetime
+
+from config.settings import LOG_FORMAT, LOG_LEVEL, LOG_LEVELS, LOG_QUEUE_SIZE, LOG_SAMPLE_RATES
+
+CATEGORIES = ("APP", "LIFECYCLE", "API", "DB", "SERVICE", "AUTH", "VALIDATION")
+
+# Id of the request being handled, set by `RequestIdMiddleware`
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+class TextFormatter(logging.Formatter):
+    """``[PrepHub Backend] [2024-01-01 12:00:00] [API] message [req …] | {fields}``"""
+
+    def __init__(self, prefix: str):
+        super().__init__()
+        self.prefix = prefix
+
+    def format(self, record: logging.LogRecord) -> str:
+        timestamp = datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S")
+        parts = [f"{self.prefix} [{timestamp}] [{record.label}] {record.getMessage()}"]
+        if record.request_id:
+            parts.append(f" [req {record.request_id}]")
+        if record.fields:
+            parts.append(f" | {record.fields}")
+        if record.exc_info:
+            parts.append(f"\n{self.formatException(record.exc_info)}")
+        return "".join(parts)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; fields are top-level keys, values that aren't JSON are stringified"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "category": record.category,
+            "message": record.getMessage(),
+        }
+        if record.request_id:
+            entry["request_id"] = record.request_id
+        for key, value in record.fields.items():
+            entry.setdefault(key, value)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Puts records on the queue unformatted (the listener formats them) and drops them if it is full"""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
 
 class Logger:
     """Central logger that can be toggled via environment variable"""
-    
+
     def __init__(self):
-        # Read from .env file
-        self.enabled = os.getenv("ENABLE_LOGS", "false").lower() == "true"
         self.prefix = "[PrepHub Backend]"
-        
-        if self.enabled:
-            print(f"{self.prefix} Logging ENABLED")
-    
-    def _format_message(self, level: str, message: str, **kwargs) -> str:
-        """Format log message with timestamp and kwargs"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        parts = [f"{self.prefix} [{timestamp}] [{level}] {message}"]
-        
-        if kwargs:
-            parts.append(f" | {kwargs}")
-        
-        return "".join(parts)
-    
+        self.sample_rates = {category.upper(): rate for category, rate in LOG_SAMPLE_RATES.items()}
+
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter(self.prefix))
+        self.handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        self.listener = QueueListener(self.handler.queue, output)
+
+        root = logging.getLogger("prephub")
+        root.handlers = [self.handler]
+        root.propagate = False
+        levels = {category.upper(): level.upper() for category, level in LOG_LEVELS.items()}
+        self.loggers = {}
+        for category in CATEGORIES:
+            logger = logging.getLogger(f"prephub.{category.lower()}")
+            logger.setLevel(levels.get(category, LOG_LEVEL))
+            self.loggers[category] = logger
+
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    @property
+    def dropped(self) -> int:
+        """Records dropped because the writer thread fell behind"""
+        return self.handler.dropped
+
+    def _log(self, category: str, level: int, label: str, message: str, fields: Dict[str, Any]):
+        category = category.upper() if category.upper() in self.loggers else "APP"
+        logger = self.loggers[category]
+        if not logger.isEnabledFor(level):
+            return
+        rate = self.sample_rates.get(category)
+        if rate is not None and level < logging.WARNING and random.random() >= rate:
+            return
+        # The record is formatted later, on the writer thread: snapshot the values the caller may still change
+        fields = {key: value.copy() if isinstance(value, (dict, list, set)) else value for key, value in fields.items()}
+        logger.log(level, message, extra={
+            "category": category, "label": label, "fields": fields, "request_id": request_id.get(),
+        })
+
     def info(self, message: str, **kwargs):
         """General info log"""
-        if not self.enabled:
-            return
-        print(self._format_message("INFO", message, **kwargs))
-    
+        self._log("APP", logging.INFO, "INFO", message, kwargs)
+
     def lifecycle(self, component: str, event: str, **kwargs):
         """Lifecycle event log"""
-        if not self.enabled:
-            return
-        print(self._format_message("LIFECYCLE", f"{component}: {event}", **kwargs))
-    
+        self._log("LIFECYCLE", logging.INFO, "LIFECYCLE", f"{component}: {event}", kwargs)
+
     def api(self, message: str, **kwargs):
         """API endpoint log"""
-        if not self.enabled:
-            return
-        print(self._format_message("API", message, **kwargs))
-    
+        self._log("API", logging.INFO, "API", message, kwargs)
+
     def db(self, message: str, **kwargs):
         """Database operation log"""
-        if not self.enabled:
-            return
-        print(self._format_message("DB", message, **kwargs))
-    
+        self._log("DB", logging.INFO, "DB", message, kwargs)
+
     def service(self, message: str, **kwargs):
         """Service layer log"""
-        if not self.enabled:
-            return
-        print(self._format_message("SERVICE", message, **kwargs))
-    
+        self._log("SERVICE", logging.INFO, "SERVICE", message, kwargs)
+
     def auth(self, message: str, **kwargs):
         """Authentication log"""
-        if not self.enabled:
-            return
-        print(self._format_message("AUTH", message, **kwargs))
-    
-    def error(self, message: str, **kwargs):
-        """Error log (always shown)"""
-        print(self._format_message("ERROR", message, **kwargs))
-    
-    def warn(self, message: str, **kwargs):
+        self._log("AUTH", logging.INFO, "AUTH", message, kwargs)
+
+    def error(self, message: str, category: str = "APP", **kwargs):
+        """Error log (shown unless the category's level is above ERROR)"""
+        self._log(category, logging.ERROR, "ERROR", message, kwargs)
+
+    def warn(self, message: str, category: str = "APP", **kwargs):
         """Warning log"""
-        if not self.enabled:
-            return
-        print(self._format_message("WARN", message, **kwargs))
-    
-    def debug(self, message: str, **kwargs):
+        self._log(category, logging.WARNING, "WARN", message, kwargs)
+
+    def debug(self, message: str, category: str = "APP", **kwargs):
         """Debug log"""
-        if not self.enabled:
-            return
-        print(self._format_message("DEBUG", message, **kwargs))
-    
+        self._log(category, logging.DEBUG, "DEBUG", message, kwargs)
+
     def validation(self, message: str, **kwargs):
         """Validation log"""
-        if not self.enabled:
+        self._log("VALIDATION", logging.INFO, "VALIDATION", message, kwargs)
+
+
+class RequestIdMiddleware:
+    """
+    Pure ASGI middleware tagging each HTTP request with an id: the caller's ``X-Request-ID``
+    when it is a plausible id, else a new one. It is set on `request_id` for the logs and
+    returned in the response's ``X-Request-ID`` header.
+    """
+
+    VALID_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
             return
-        print(self._format_message("VALIDATION", message, **kwargs))
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        current = incoming if self.VALID_ID.fullmatch(incoming) else uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", current.encode())]
+            await send(message)
+
+        token = request_id.set(current)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
 
 
 # Create singleton instance
@@ -0,0 +1,257 @@
+"""
+Process metrics in the Prometheus text exposition format, served at ``/metrics``.
+
+`MetricsMiddleware` records every HTTP request (latency histogram, status codes, requests
+in flight) under its route template, e.g. ``/bookings/{booking_id}``, so the label set stays
+bounded. The engine listeners in `config.database` add the database queries each route ran,
+their time, and how long requests waited for a pooled connection.
+
+Recording is lock-free: every thread updates its own shard of a metric, and the shards are
+only summed when ``/metrics`` is scraped. A lock is taken once per metric per thread, when
+that thread records its first value.
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; the Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+# Label of work done outside of a request (workers, scripts) and of requests no route matched
+NO_ROUTE = ""
+UNMATCHED_ROUTE = "unmatched"
+
+Labels = Tuple[str, ...]
+
+
+class Metric:
+    """A family of samples keyed by label values, recorded into per-thread shards."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._lock = threading.Lock()
+        Metrics.register(self)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _merged(self) -> Dict[Labels, object]:
+        raise NotImplementedError
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        """(sample name, labels, value) of every series"""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _merged(self) -> Dict[Labels, float]:
+        merged: Dict[Labels, float] = {}
+        for shard in list(self._shards):
+            for labels, value in list(shard.items()):
+                merged[labels] = merged.get(labels, 0) + value
+        return merged
+
+    def samples(self):
+        for labels, value in sorted(self._merged().items()):
+            yield self.name, dict(zip(self.labels, labels)), value
+
+
+class Gauge(Counter):
+    """Up/down value; with ``collect`` it is read from a callback ({label values: value}) at scrape time instead"""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 collect: Optional[Callable[[], Dict[Labels, float]]] = None):
+        super().__init__(name, documentation, labels)
+        self.collect = collect
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def _merged(self) -> Dict[Labels, float]:
+        return self.collect() if self.collect is not None else super()._merged()
+
+
+class Histogram(Metric):
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # One count per bucket (not cumulative), then sum and count
+            series = shard[labels] = [0] * (len(self.buckets) + 2)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def _merged(self) -> Dict[Labels, List[float]]:
+        merged: Dict[Labels, List[float]] = {}
+        for shard in list(self._shards):
+            for labels, series in list(shard.items()):
+                total = merged.setdefault(labels, [0] * len(series))
+                for index, value in enumerate(list(series)):
+                    total[index] += value
+        return merged
+
+    def samples(self):
+        for labels, series in sorted(self._merged().items()):
+            base = dict(zip(self.labels, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket", {**base, "le": f"{bound:g}"}, cumulative
+            yield f"{self.name}_bucket", {**base, "le": "+Inf"}, series[-1]
+            yield f"{self.name}_sum", base, series[-2]
+            yield f"{self.name}_count", base, series[-1]
+
+
+class RequestStats:
+    """Database work of the request being handled, added up by the engine listeners"""
+
+    __slots__ = ("route", "queries", "query_seconds")
+
+    def __init__(self):
+        self.route = NO_ROUTE
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+# Set by `MetricsMiddleware` for the duration of a request
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class Metrics:
+
+    registry: List[Metric] = []
+
+    @classmethod
+    def register(cls, metric: Metric):
+        cls.registry.append(metric)
+
+    @staticmethod
+    def _escape(value: str) -> str:
+        return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+    @staticmethod
+    def _number(value: float) -> str:
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+    @classmethod
+    def render(cls) -> str:
+        """Every registered metric in the text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in cls.registry:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    rendered = ",".join(f'{key}="{cls._escape(label)}"' for key, label in labels.items())
+                    name = f"{name}{{{rendered}}}"
+                lines.append(f"{name} {cls._number(value)}")
+        return "\n".join(lines) + "\n"
+
+    # ----------------
+    # --- Database ---
+    # ----------------
+
+    @classmethod
+    def record_query(cls, seconds: float):
+        """One statement executed; attributed to the current request's route, if any"""
+        stats = request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += seconds
+        else:
+            db_queries.inc(NO_ROUTE)
+            db_query_seconds.inc(NO_ROUTE, amount=seconds)
+
+    @classmethod
+    def record_checkout(cls, pool: str, seconds: float):
+        db_pool_checkout_wait.observe(seconds, pool)
+
+
+http_requests = Counter("http_requests_total", "HTTP requests by route and status code.",
+                        ("method", "route", "status"))
+http_request_duration = Histogram("http_request_duration_seconds", "HTTP request latency by route.",
+                                  ("method", "route"))
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being handled.")
+db_queries = Counter("db_queries_total", "Database statements executed, by route.", ("route",))
+db_query_seconds = Counter("db_query_seconds_total", "Time spent executing database statements, by route.",
+                           ("route",))
+db_queries_per_request = Histogram("db_queries_per_request", "Database statements executed per request, by route.",
+                                   ("route",), buckets=QUERY_COUNT_BUCKETS)
+db_pool_checkout_wait = Histogram("db_pool_checkout_wait_seconds",
+                                  "Time spent waiting for a pooled database connection.", ("pool",))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and database work of every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        token = request_stats.set(stats)
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            request_stats.reset(token)
+
+            route = scope.get("route")
+            stats.route = getattr(route, "path_format", None) or getattr(route, "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+            http_requests.inc(method, stats.route, str(status_code))
+            http_request_duration.observe(elapsed, method, stats.route)
+            db_queries_per_request.observe(stats.queries, stats.route)
+            if stats.queries:
+                db_queries.inc(stats.route, amount=stats.queries)
+                db_query_seconds.inc(stats.route, amount=stats.query_seconds)
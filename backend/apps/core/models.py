@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, ForeignKey, Numeric, Index, func, text
 from sqlalchemy.orm import relationship
 
 from config.database import FastModel
@@ -8,9 +8,79 @@ class AdminSettings(FastModel):
     __tablename__ = "admin_settings"
 
     id = Column(Integer, primary_key=True, index=True)
-    payment_qr_code = Column(Text, nullable=True)  # Base64 or URL
+    # Image reference (URL) and, when the server stored the bytes, their sha256 (see apps/core/services/blobs.py)
+    payment_qr_code = Column(Text, nullable=True)
+    payment_qr_code_sha256 = Column(String(64), nullable=True)
     payment_upi_id = Column(String(255), nullable=True)
     updated_at = Column(DateTime, nullable=True)
     updated_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     
     updater = relationship("User", foreign_keys=[updated_by])
+
+
+class DailyMetric(FastModel):
+    """
+    Daily booking rollup used by the analytics endpoints.
+
+    One row per (day, listing, owner, status) holding the number of bookings created
+    that day and their summed amount. Rows are kept current by ``MetricsRollup`` from
+    the booking write paths and can be rebuilt with ``python -m apps.core.rollups``.
+    """
+
+    __tablename__ = "daily_metrics"
+
+    day = Column(Date, primary_key=True)
+    listing_id = Column(Integer, ForeignKey("listings.id", ondelete="CASCADE"), primary_key=True)
+    owner_id = Column(Integer, primary_key=True)
+    status = Column(String(50), primary_key=True)
+
+    bookings = Column(Integer, nullable=False, default=0)
+    amount = Column(Numeric(14, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_daily_metrics_owner_id_day", "owner_id", "day"),
+        Index("ix_daily_metrics_listing_id", "listing_id"),
+    )
+
+
+class DailySignup(FastModel):
+    """Number of users who joined on a given day (rollup of ``users.date_joined``)."""
+
+    __tablename__ = "daily_signups"
+
+    day = Column(Date, primary_key=True)
+    users = Column(Integer, nullable=False, default=0)
+
+
+class OutboxEmail(FastModel):
+    """
+    Transactional email waiting to be (or already) delivered.
+
+    Requests only insert a row; the outbox worker (``apps.core.services.email_outbox``)
+    delivers due rows, retrying failures with exponential backoff. ``dedup_key`` is
+    unique, so enqueueing the same message twice (e.g. the same OTP) is a no-op while the
+    first one is pending or sent; once it has failed for good, enqueueing it again requeues it.
+    """
+
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    to_address = Column(String(256), nullable=False)
+    subject = Column(String(255), nullable=False)
+    html = Column(Text, nullable=False)
+    dedup_key = Column(String(255), nullable=True)
+
+    status = Column(String(20), nullable=False, default="pending", server_default="pending")  # pending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # When the row is next due; a worker that claims it pushes it forward by a lease
+    next_attempt_at = Column(DateTime, nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_dedup_key", "dedup_key", unique=True),
+        Index("ix_email_outbox_due", "next_attempt_at", "id", postgresql_where=text("status = 'pending'")),
+        Index("ix_email_outbox_sent_at", "sent_at", postgresql_where=text("status = 'sent'")),
+    )
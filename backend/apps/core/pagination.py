@@ -0,0 +1,97 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are ordered by a sort column plus a unique tiebreaker (the primary key), and the
+next page starts strictly after the last row of the previous one:
+
+    WHERE (price, id) > (:last_price, :last_id) ORDER BY price, id LIMIT :limit + 1
+
+Unlike OFFSET, the cost of a page doesn't depend on how deep it is, and rows inserted
+or deleted meanwhile don't shift the pages. The cursor handed to clients is an opaque
+url-safe token holding the sort key and the last row's values.
+"""
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, tuple_
+
+
+class Keyset:
+
+    invalid_cursor = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+
+    @staticmethod
+    def encode(*values: Any) -> str:
+        payload = [
+            value.isoformat() if isinstance(value, (datetime, date))
+            else str(value) if isinstance(value, Decimal)
+            else value
+            for value in values
+        ]
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode())
+        return token.decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, cursor: str) -> List[Any]:
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        except (ValueError, binascii.Error):
+            raise cls.invalid_cursor
+        if not isinstance(values, list):
+            raise cls.invalid_cursor
+        return values
+
+    @classmethod
+    def paginate(cls, query: Select, sort: str, column, tiebreaker, descending: bool,
+                 after: Optional[str], limit: int) -> Select:
+        """
+        Order ``query`` by (column, tiebreaker) and keep the rows after the ``after`` cursor.
+        One extra row is fetched so `page` can tell whether there is a next page.
+        """
+        if descending:
+            query = query.order_by(column.desc(), tiebreaker.desc())
+        else:
+            query = query.order_by(column.asc(), tiebreaker.asc())
+
+        if after:
+            values = cls.decode(after)
+            # A cursor is only valid for the sort it was issued for
+            if len(values) != 3 or values[0] != sort or values[1] is None:
+                raise cls.invalid_cursor
+            last = (cls._load(column, values[1]), cls._load(tiebreaker, values[2]))
+            key = tuple_(column, tiebreaker)
+            query = query.where(key < tuple_(*last) if descending else key > tuple_(*last))
+
+        return query.limit(limit + 1)
+
+    @classmethod
+    def page(cls, rows: Sequence[Any], sort: str, limit: int,
+             key: Callable[[Any], Tuple[Any, Any]]) -> Tuple[List[Any], Optional[str]]:
+        """
+        Split the rows fetched by `paginate` into the page and the cursor of the next one (None on
+        the last page). ``key`` returns a row's (column, tiebreaker) values.
+        """
+        rows = list(rows)
+        if len(rows) <= limit:
+            return rows, None
+
+        rows = rows[:limit]
+        return rows, cls.encode(sort, *key(rows[-1]))
+
+    @classmethod
+    def _load(cls, column, raw: Any) -> Any:
+        python_type = column.type.python_type
+        try:
+            if python_type is datetime:
+                return datetime.fromisoformat(raw)
+            if python_type is Decimal:
+                return Decimal(raw)
+            return python_type(raw)
+        except (TypeError, ValueError, InvalidOperation):
+            raise cls.invalid_cursor
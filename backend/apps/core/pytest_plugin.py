@@ -0,0 +1,24 @@
+"""
+Pytest fixtures for query budgets (see `apps.core.query_budget`). Enable them in a conftest.py:
+
+    pytest_plugins = ["apps.core.pytest_plugin"]
+"""
+
+import pytest
+
+from apps.core.query_budget import QueryBudget
+
+
+@pytest.fixture
+def query_budget():
+    """
+    ``with query_budget(3): client.get("/listings/1")`` fails the test if the block runs more than
+    three statements, whichever thread runs them. While the fixture is in use, routes going over
+    their declared budget raise `QueryBudgetExceeded` as well.
+    """
+    mode = QueryBudget.mode
+    QueryBudget.mode = "raise"
+    try:
+        yield lambda limit, label="query_budget": QueryBudget(limit, label, mode="raise", process_wide=True)
+    finally:
+        QueryBudget.mode = mode
@@ -0,0 +1,197 @@
+"""
+Query budgets: a ceiling on the database statements a route or a block of code may run.
+
+Routes declare theirs with `query_budget`; `QueryBudgetMiddleware` counts the statements of
+every request (dependencies and streamed bodies included) and, past the route's budget,
+logs a warning or, with ``QUERY_BUDGETS=raise`` (tests, development), raises
+`QueryBudgetExceeded`. A statement count that grows with the data is how N+1 queries show:
+
+    @router.get("/{listing_id}")
+    @query_budget(3)
+    async def get_listing(...): ...
+
+Blocks and functions are checked with `QueryBudget`, as a context manager or decorator:
+
+    async with QueryBudget(2, "owner inbox"):
+        await service.owner_inbox(owner_id)
+
+With ``QUERY_REPEAT_THRESHOLD`` set (development), the middleware also logs every statement
+fingerprint a single request ran at least that many times: the loop behind an N+1.
+
+The pytest fixture in `apps.core.pytest_plugin` applies the same checks in tests.
+"""
+
+import functools
+import inspect
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, List, Optional, Tuple
+
+from apps.core.logger import log
+from apps.core.query_stats import fingerprint
+from config.settings import QUERY_BUDGETS, QUERY_REPEAT_THRESHOLD
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    """Statements run while it is active; with ``track_repeats``, also how often each fingerprint ran"""
+
+    __slots__ = ("count", "fingerprints")
+
+    def __init__(self, track_repeats: bool = False):
+        self.count = 0
+        self.fingerprints: Optional[Counter] = Counter() if track_repeats else None
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """(normalized statement, times) of the fingerprints run at least ``threshold`` times"""
+        if self.fingerprints is None:
+            return []
+        return [(statement, times) for statement, times in self.fingerprints.most_common() if times >= threshold]
+
+
+# Counters of the enclosing budgets in this context, and process-wide ones (tests driving the app from
+# another thread, e.g. through TestClient)
+_counters: ContextVar[Tuple[QueryCounter, ...]] = ContextVar("query_counters", default=())
+_global_counters: List[QueryCounter] = []
+_global_lock = threading.Lock()
+
+
+def record_statement(statement: str):
+    """Count a statement in every active budget (called by the engine listeners)"""
+    counters = _counters.get()
+    if _global_counters:
+        counters = (*counters, *_global_counters)
+    for counter in counters:
+        counter.count += 1
+        if counter.fingerprints is not None:
+            counter.fingerprints[fingerprint(statement)[1]] += 1
+
+
+class QueryBudget:
+    """
+    Allows at most ``limit`` statements in a block or call. ``mode`` is ``raise``, ``warn`` or
+    ``off`` (default: ``QUERY_BUDGETS``). ``process_wide`` counts the statements of every thread
+    and task, not only the current context's.
+    """
+
+    mode = QUERY_BUDGETS
+
+    def __init__(self, limit: int, label: str = "", mode: Optional[str] = None, process_wide: bool = False):
+        self.limit = limit
+        self.label = label
+        self._mode = mode
+        self.process_wide = process_wide
+        self.counter: Optional[QueryCounter] = None
+        self._token = None
+
+    def __enter__(self) -> QueryCounter:
+        self.counter = QueryCounter(track_repeats=True)
+        if self.process_wide:
+            with _global_lock:
+                _global_counters.append(self.counter)
+        else:
+            self._token = _counters.set((*_counters.get(), self.counter))
+        return self.counter
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.process_wide:
+            with _global_lock:
+                _global_counters.remove(self.counter)
+        else:
+            _counters.reset(self._token)
+        if exc_type is None:
+            self.check(self.label, self.limit, self.counter, self._mode)
+
+    async def __aenter__(self) -> QueryCounter:
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.__exit__(exc_type, exc, tb)
+
+    def __call__(self, func: Callable) -> Callable:
+        label = self.label or func.__qualname__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                async with QueryBudget(self.limit, label, self._mode, self.process_wide):
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with QueryBudget(self.limit, label, self._mode, self.process_wide):
+                    return func(*args, **kwargs)
+        return wrapper
+
+    @classmethod
+    def check(cls, label: str, limit: int, counter: QueryCounter, mode: Optional[str] = None):
+        """Report ``counter`` if it went over ``limit``, as ``mode`` (default: the class-wide mode) says"""
+        mode = mode or cls.mode
+        if mode == "off" or counter.count <= limit:
+            return
+
+        repeated = counter.repeated(2)
+        if mode == "raise":
+            details = "".join(f"\n  {times}x {statement}" for statement, times in repeated)
+            raise QueryBudgetExceeded(f"{label}: {counter.count} statements, budget {limit}{details}")
+        log.warn("Query budget exceeded", category="DB", label=label, statements=counter.count, budget=limit,
+                 repeated=[f"{times}x {statement}" for statement, times in repeated[:3]])
+
+
+def query_budget(limit: int) -> Callable[[Callable], Callable]:
+    """Declare the most statements a route may run per request (checked by `QueryBudgetMiddleware`)"""
+    def declare(endpoint: Callable) -> Callable:
+        endpoint.query_budget = limit
+        return endpoint
+    return declare
+
+
+class QueryBudgetMiddleware:
+    """
+    Pure ASGI middleware counting the statements of each HTTP request against its route's declared
+    `query_budget`, and with ``QUERY_REPEAT_THRESHOLD`` logging statements repeated within a request.
+
+    The check runs before the last body message is passed on, so with ``QUERY_BUDGETS=raise`` an
+    exceeded budget fails the request itself rather than surfacing after the client has its response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (QueryBudget.mode == "off" and not QUERY_REPEAT_THRESHOLD):
+            await self.app(scope, receive, send)
+            return
+
+        counter = QueryCounter(track_repeats=bool(QUERY_REPEAT_THRESHOLD))
+        checked = False
+
+        async def send_checked(message):
+            nonlocal checked
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                checked = True
+                self.check(scope, counter)
+            await send(message)
+
+        token = _counters.set((*_counters.get(), counter))
+        try:
+            await self.app(scope, receive, send_checked)
+        finally:
+            _counters.reset(token)
+
+        if not checked:
+            self.check(scope, counter)
+
+    @staticmethod
+    def check(scope, counter: QueryCounter):
+        route = scope.get("route")
+        label = f"{scope['method']} {getattr(route, 'path_format', scope['path'])}"
+        for statement, times in counter.repeated(QUERY_REPEAT_THRESHOLD) if QUERY_REPEAT_THRESHOLD else []:
+            log.warn("Repeated query in request", category="DB", route=label, times=times, statement=statement)
+
+        limit = getattr(getattr(route, "endpoint", None), "query_budget", None)
+        if limit is not None:
+            QueryBudget.check(label, limit, counter)
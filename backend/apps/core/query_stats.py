@@ -0,0 +1,127 @@
+"""
+Per-statement timings and the slow-query log.
+
+The engine listeners in `config.database` pass every statement here. It is reduced to
+a fingerprint: literals and bind markers become ``?`` and bind / IN / VALUES lists
+collapse to one entry, so the same query with different values, or a different number
+of ids, has a single entry. Count, total and max time are kept per fingerprint in a
+bounded in-process table (least recently seen fingerprints are evicted first) and
+served to admins by ``GET /analytics/queries``.
+
+Statements slower than ``SLOW_QUERY_MS`` are logged with their fingerprint and the
+shape of their parameters (types and lengths, never the values).
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+from apps.core.logger import log
+from config.settings import QUERY_STATS_MAX_ENTRIES, SLOW_QUERY_MS
+
+# Applied in order
+NORMALIZE = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),                                  # string literals
+    (re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):(?!:)\w+\b"), "?"),             # bind markers of every paramstyle
+    (re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?\b"), "?"),                    # numeric literals
+    (re.compile(r"\s+"), " "),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)"), "(?, ...)"),               # IN (?, ?, ?) / VALUES (?, ?)
+    (re.compile(r"(\(\?, \.\.\.\))(?:\s*,\s*\(\?, \.\.\.\))+"), r"\1, ..."),  # multi-row VALUES
+]
+
+# Longest normalized statement kept in the table and the logs
+MAX_STATEMENT_LENGTH = 2000
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> Tuple[str, str]:
+    """(fingerprint id, normalized statement) of a SQL statement"""
+    normalized = statement.strip()
+    for pattern, replacement in NORMALIZE:
+        normalized = pattern.sub(replacement, normalized)
+    normalized = normalized[:MAX_STATEMENT_LENGTH]
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+
+def bind_shape(parameters: Any, executemany: bool = False) -> Any:
+    """Types (and lengths of sequences) of the bound parameters, without their values"""
+    if executemany and isinstance(parameters, (list, tuple)):
+        return {"rows": len(parameters), "row": bind_shape(parameters[0]) if parameters else None}
+    if isinstance(parameters, dict):
+        return {key: bind_shape(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [bind_shape(value) for value in parameters]
+    if isinstance(parameters, (str, bytes)):
+        return f"{type(parameters).__name__}[{len(parameters)}]"
+    return type(parameters).__name__
+
+
+class QueryStats:
+
+    _table: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    _lock = threading.Lock()
+    since = time.time()
+    evictions = 0
+
+    @classmethod
+    def record(cls, statement: str, parameters: Any, seconds: float, executemany: bool = False):
+        """Add one execution to its fingerprint's entry; log it when it is slow"""
+        key, normalized = fingerprint(statement)
+        with cls._lock:
+            entry = cls._table.get(key)
+            if entry is None:
+                entry = cls._table[key] = {"fingerprint": key, "statement": normalized,
+                                           "count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+                while len(cls._table) > QUERY_STATS_MAX_ENTRIES:
+                    cls._table.popitem(last=False)
+                    cls.evictions += 1
+            else:
+                cls._table.move_to_end(key)
+            entry["count"] += 1
+            entry["total_seconds"] += seconds
+            if seconds > entry["max_seconds"]:
+                entry["max_seconds"] = seconds
+
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            log.warn("Slow query", category="DB", duration_ms=round(seconds * 1000, 1), fingerprint=key,
+                     statement=normalized, params=bind_shape(parameters, executemany))
+
+    @classmethod
+    def top(cls, limit: int = 20, sort: str = "total") -> List[Dict[str, Any]]:
+        """The ``limit`` fingerprints with the highest ``sort`` (total, max, mean or count), times in ms"""
+        with cls._lock:
+            entries = [dict(entry) for entry in cls._table.values()]
+
+        rows = [{
+            "fingerprint": entry["fingerprint"],
+            "statement": entry["statement"],
+            "count": entry["count"],
+            "total_ms": round(entry["total_seconds"] * 1000, 2),
+            "mean_ms": round(entry["total_seconds"] * 1000 / entry["count"], 2),
+            "max_ms": round(entry["max_seconds"] * 1000, 2),
+        } for entry in entries]
+        key = {"total": "total_ms", "max": "max_ms", "mean": "mean_ms", "count": "count"}[sort]
+        return sorted(rows, key=lambda row: row[key], reverse=True)[:limit]
+
+    @classmethod
+    def report(cls, limit: int = 20, sort: str = "total") -> Dict[str, Any]:
+        with cls._lock:
+            fingerprints = len(cls._table)
+        return {
+            "since": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(cls.since)),
+            "slow_query_ms": SLOW_QUERY_MS,
+            "fingerprints": fingerprints,
+            "evictions": cls.evictions,
+            "queries": cls.top(limit, sort),
+        }
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._table.clear()
+            cls.evictions = 0
+            cls.since = time.time()
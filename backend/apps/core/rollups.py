@@ -0,0 +1,207 @@
+"""
+Incremental maintenance of the analytics rollup tables.
+
+``daily_metrics`` and ``daily_signups`` are updated in the same transaction as the
+booking / user write that changes them, so the analytics endpoints can read
+pre-aggregated rows instead of rescanning ``bookings`` and ``users``.
+
+Rebuild the rollups from the source tables (e.g. after a manual data fix):
+
+    python -m apps.core.rollups --rebuild
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional, Union
+
+from sqlalchemy import Date, cast, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.accounts.models import User
+from apps.bookings.models import Booking
+from apps.core.logger import log
+from apps.core.models import DailyMetric, DailySignup
+from apps.listings.models import Listing
+
+# Bookings without a status are rolled up under this key (primary key columns can't be NULL)
+UNKNOWN_STATUS = "unknown"
+
+
+class MetricsRollup:
+    """Applies booking and signup deltas to the rollup tables."""
+
+    # --------------------
+    # --- Booking rows ---
+    # --------------------
+
+    @classmethod
+    async def add_booking(cls, db: AsyncSession, booking: Booking, owner_id: int, sign: int = 1):
+        """
+        Count a booking (``sign=1``) or remove it from the rollup (``sign=-1``).
+        Must be called before the caller commits so both writes share a transaction.
+        """
+        await cls._upsert_metric(
+            db,
+            day=cls._day(booking.created_at),
+            listing_id=booking.listing_id,
+            owner_id=owner_id,
+            status=booking.status,
+            bookings=sign,
+            amount=sign * Decimal(booking.amount or 0),
+        )
+
+    @classmethod
+    async def move_booking(
+        cls,
+        db: AsyncSession,
+        booking: Booking,
+        owner_id: int,
+        old_status: Optional[str],
+        old_amount: Union[Decimal, float, None],
+    ):
+        """Move a booking between status buckets (and/or re-amount it) after an update."""
+        if old_status == booking.status and Decimal(old_amount or 0) == Decimal(booking.amount or 0):
+            return
+
+        day = cls._day(booking.created_at)
+        await cls._upsert_metric(db, day=day, listing_id=booking.listing_id, owner_id=owner_id,
+                                 status=old_status, bookings=-1, amount=-Decimal(old_amount or 0))
+        await cls._upsert_metric(db, day=day, listing_id=booking.listing_id, owner_id=owner_id,
+                                 status=booking.status, bookings=1, amount=Decimal(booking.amount or 0))
+
+    @classmethod
+    async def forget_user_bookings(cls, db: AsyncSession, user_id: int):
+        """Subtract every booking made by a user, e.g. before the user (and their bookings) is deleted."""
+        rows = (await db.execute(
+            select(
+                cast(Booking.created_at, Date).label("day"),
+                Booking.listing_id,
+                Listing.owner_id,
+                Booking.status,
+                func.count(Booking.id).label("bookings"),
+                func.coalesce(func.sum(Booking.amount), 0).label("amount"),
+            )
+            .join(Listing, Booking.listing_id == Listing.id)
+            .where(Booking.user_id == user_id)
+            .group_by(cast(Booking.created_at, Date), Booking.listing_id, Listing.owner_id, Booking.status)
+        )).all()
+
+        for row in rows:
+            await cls._upsert_metric(db, day=row.day, listing_id=row.listing_id, owner_id=row.owner_id,
+                                     status=row.status, bookings=-row.bookings, amount=-row.amount)
+
+    # -------------------
+    # --- Signup rows ---
+    # -------------------
+
+    @classmethod
+    async def add_signup(cls, db: AsyncSession, joined_at: Optional[datetime] = None, sign: int = 1):
+        """Count (or with ``sign=-1`` uncount) a user joining on ``joined_at`` (defaults to today)."""
+        stmt = insert(DailySignup).values(day=cls._day(joined_at), users=sign)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DailySignup.day],
+            set_={"users": DailySignup.users + stmt.excluded.users},
+        )
+        await db.execute(stmt)
+
+    # ---------------
+    # --- Rebuild ---
+    # ---------------
+
+    @classmethod
+    async def rebuild(cls, db: AsyncSession):
+        """Recompute both rollup tables from ``bookings`` and ``users`` and commit."""
+        log.service("Rebuilding analytics rollups")
+
+        await db.execute(delete(DailyMetric))
+        day = cast(Booking.created_at, Date)
+        status = func.coalesce(Booking.status, UNKNOWN_STATUS)
+        await db.execute(
+            insert(DailyMetric).from_select(
+                ["day", "listing_id", "owner_id", "status", "bookings", "amount"],
+                select(
+                    day,
+                    Booking.listing_id,
+                    Listing.owner_id,
+                    status,
+                    func.count(Booking.id),
+                    func.coalesce(func.sum(Booking.amount), 0),
+                )
+                .join(Listing, Booking.listing_id == Listing.id)
+                .where(Booking.created_at.isnot(None))
+                .group_by(day, Booking.listing_id, Listing.owner_id, status),
+            )
+        )
+
+        await db.execute(delete(DailySignup))
+        joined = cast(User.date_joined, Date)
+        await db.execute(
+            insert(DailySignup).from_select(
+                ["day", "users"],
+                select(joined, func.count(User.id))
+                .where(User.date_joined.isnot(None))
+                .group_by(joined),
+            )
+        )
+
+        await db.commit()
+        log.service("Analytics rollups rebuilt")
+
+    # ---------------
+    # --- Helpers ---
+    # ---------------
+
+    @classmethod
+    async def _upsert_metric(cls, db: AsyncSession, day, listing_id: int, owner_id: int, status: Optional[str],
+                             bookings: int, amount):
+        stmt = insert(DailyMetric).values(
+            day=day,
+            listing_id=listing_id,
+            owner_id=owner_id,
+            status=status or UNKNOWN_STATUS,
+            bookings=bookings,
+            amount=amount,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DailyMetric.day, DailyMetric.listing_id, DailyMetric.owner_id, DailyMetric.status],
+            set_={
+                "bookings": DailyMetric.bookings + stmt.excluded.bookings,
+                "amount": DailyMetric.amount + stmt.excluded.amount,
+            },
+        )
+        await db.execute(stmt)
+
+    @staticmethod
+    def _day(value: Optional[datetime]):
+        """Rollup day of a timestamp; rows not flushed yet fall back to the database's current date."""
+        if value is None:
+            return func.current_date()
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return func.current_date()
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    import apps.faculty.models  # noqa: F401  (configures the Listing.faculty relationship)
+    from config.database import async_engine, get_async_session
+
+    parser = argparse.ArgumentParser(description="Maintain the analytics rollup tables.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute daily_metrics and daily_signups")
+    args = parser.parse_args()
+
+    async def rebuild():
+        async with get_async_session() as session:
+            await MetricsRollup.rebuild(session)
+        await async_engine.dispose()
+
+    if not args.rebuild:
+        parser.print_help()
+    else:
+        asyncio.run(rebuild())
+        print("Analytics rollups rebuilt.")
@@ -0,0 +1,154 @@
+"""
+Content-addressed image blobs.
+
+Payment screenshots and the payment QR code used to be accepted, and stored, as base64
+data inline in their rows. They now go to the upload backend (``UPLOADS_BACKEND``) under
+``<folder>/<sha256>`` and the rows keep only the URL and the hash. Clients may still send
+base64 (``data:image/...;base64,`` or bare): `Blobs.reference` stores it and returns the
+reference; URLs, e.g. from the upload endpoints, are kept as they are.
+
+Rows written before that still hold base64; move them once, with ``UPLOADS_BACKEND`` set:
+
+    python -m apps.core.services.blobs
+
+Values that are neither a URL nor a decodable image are left as they are and logged.
+"""
+
+import base64
+import binascii
+import hashlib
+import re
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import not_, or_, select, update
+
+from apps.core.logger import log
+from apps.core.services.uploads import UploadService, sniff_image
+from config.database import get_async_session
+from config.settings import MAX_FILE_SIZE_MB, UPLOADS_LOCAL_URL
+
+DATA_URL = re.compile(r"^data:[\w/.+-]*;base64,", re.IGNORECASE)
+
+# Longest image URL accepted as a reference
+MAX_REFERENCE_LENGTH = 500
+
+MOVE_BATCH_SIZE = 100
+
+
+class Blobs:
+
+    @staticmethod
+    def decode(value: str) -> Optional[bytes]:
+        """
+        Bytes of an inline base64 image, None if ``value`` is a reference (an http(s) or local
+        upload URL). Raises ValueError if it is neither.
+        """
+        if value.startswith(("https://", "http://", f"{UPLOADS_LOCAL_URL.rstrip('/')}/")):
+            return None
+        try:
+            return base64.b64decode("".join(DATA_URL.sub("", value, count=1).split()), validate=True)
+        except (binascii.Error, ValueError):
+            raise ValueError("neither a URL nor base64 data")
+
+    @staticmethod
+    async def put(data: bytes, folder: str) -> Tuple[str, str]:
+        """Store image bytes under their content hash (kept if already stored); returns (url, sha256)."""
+        image_format = sniff_image(data[:16])
+        if image_format is None:
+            raise ValueError("not a JPEG, PNG, GIF, WebP or AVIF image")
+        digest = hashlib.sha256(data).hexdigest()
+        url = await UploadService.store(data, f"{folder.strip('/')}/{digest}", image_format)
+        return url, digest
+
+    @classmethod
+    async def reference(cls, value: Optional[str], folder: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        (url, sha256) to store for a client-supplied image: inline base64 is moved to the upload
+        backend, URLs are kept (hash unknown, None).
+        """
+        if not value:
+            return None, None
+
+        try:
+            data = cls.decode(value)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid image: {e}")
+
+        if data is None:
+            if len(value) > MAX_REFERENCE_LENGTH:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Image URL is too long")
+            return value, None
+
+        if len(data) > MAX_FILE_SIZE_MB * 1024 * 1024:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File size must be less than {MAX_FILE_SIZE_MB}MB"
+            )
+        try:
+            url, digest = await cls.put(data, folder)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid image: {e}")
+        except Exception as e:
+            log.error("Inline image upload failed", category="SERVICE", folder=folder, error=str(e))
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Failed to upload image")
+
+        log.service("Inline image stored", folder=folder, sha256=digest, size=len(data))
+        return url, digest
+
+    @classmethod
+    async def move_inline(cls, model, column: str, folder: str) -> Tuple[int, int]:
+        """
+        Move the base64 values of ``model.column`` to the upload backend, filling ``<column>_sha256``,
+        a batch per transaction. Returns (moved, skipped); skipped values are kept and logged.
+        """
+        value, digest_column = getattr(model, column), getattr(model, f"{column}_sha256")
+        inline = select(model.id, value).where(
+            value.isnot(None),
+            not_(or_(value.startswith("http://"), value.startswith("https://"), value.startswith("/"))),
+        ).order_by(model.id).limit(MOVE_BATCH_SIZE)
+
+        moved = skipped = last_id = 0
+        while True:
+            async with get_async_session() as db:
+                batch = (await db.execute(inline.where(model.id > last_id))).all()
+                if not batch:
+                    break
+                for row_id, data in batch:
+                    try:
+                        url, digest = await cls.put(cls.decode(data), folder)
+                    except (TypeError, ValueError) as e:
+                        log.warn("Inline image left in place", category="SERVICE", table=model.__tablename__,
+                                 column=column, id=row_id, reason=str(e))
+                        skipped += 1
+                        continue
+                    await db.execute(
+                        update(model).where(model.id == row_id).values({column: url, digest_column.key: digest})
+                    )
+                    moved += 1
+                await db.commit()
+            last_id = batch[-1][0]
+
+        log.service("Inline images moved", table=model.__tablename__, column=column, moved=moved, skipped=skipped)
+        return moved, skipped
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    import apps.faculty.models  # noqa: F401  (configures the Listing.faculty relationship)
+    from apps.bookings.models import Booking
+    from apps.bookings.services import PAYMENT_QR_CODES_FOLDER, PAYMENT_SCREENSHOTS_FOLDER
+    from apps.core.models import AdminSettings
+    from config.database import async_engine
+
+    async def main():
+        try:
+            for model, column, folder in ((Booking, "payment_screenshot", PAYMENT_SCREENSHOTS_FOLDER),
+                                          (AdminSettings, "payment_qr_code", PAYMENT_QR_CODES_FOLDER)):
+                moved, skipped = await Blobs.move_inline(model, column, folder)
+                print(f"{model.__tablename__}.{column}: {moved} moved, {skipped} left in place (ENABLE_LOGS=true lists them)")
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(main())
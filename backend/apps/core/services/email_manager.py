@@ -1,39 +1,26 @@
-import resend
+from typing import Optional
+
 from apps.accounts.services.token import TokenService
-from config.settings import AppConfig
+from apps.core.services.email_outbox import EmailOutbox
+
 
 class EmailService:
     """
-    Handles all OTP and transactional emails using Resend API.
+    OTP and transactional emails. Messages are queued in the email outbox and delivered by its
+    worker, so these return as soon as the message is stored.
     """
 
-    app = AppConfig.get_config()
-
-    if not app.resend_api_key:
-        raise RuntimeError("RESEND_API_KEY is not set")
-
-    if not app.resend_from_email:
-        raise RuntimeError("RESEND_FROM_EMAIL is not set")
-
-    resend.api_key = app.resend_api_key
-
     @classmethod
-    def send(cls, subject: str, html: str, to: str):
-        if not cls.app.resend_api_key or not cls.app.resend_from_email:
-            raise RuntimeError("Email service is not configured")
+    async def send(cls, subject: str, html: str, to: str, dedup_key: Optional[str] = None) -> bool:
+        return await EmailOutbox.enqueue(to, subject, html, dedup_key=dedup_key)
 
-        try:
-            resend.Emails.send({
-                "from": f"{cls.app.project_name} <{cls.app.resend_from_email}>",
-                "to": [to],
-                "subject": subject,
-                "html": html,
-            })
-        except Exception as e:
-            raise RuntimeError("Failed to send email via Resend") from e
+    @classmethod
+    async def send_otp(cls, purpose: str, subject: str, html: str, to: str, otp: str) -> bool:
+        # The OTP only changes once per window: asking again within it would send the same code
+        return await cls.send(subject, html, to, dedup_key=f"otp:{purpose}:{to.lower()}:{otp}")
 
     @classmethod
-    def register_send_verification_email(cls, to_address: str):
+    async def register_send_verification_email(cls, to_address: str):
         otp = TokenService.create_otp_token()
         subject = "Email Verification"
         html = f"""
@@ -41,24 +28,24 @@ class EmailService:
         <p>Your OTP: <strong>{otp}</strong></p>
         <p>This code expires in 5 minutes.</p>
         """
-        cls.send(subject, html, to_address)
+        await cls.send_otp("register", subject, html, to_address, otp)
 
     @classmethod
-    def reset_password_send_verification_email(cls, to_address: str):
+    async def reset_password_send_verification_email(cls, to_address: str):
         otp = TokenService.create_otp_token()
         subject = "Password Reset Verification"
         html = f"""
         <p>Use the OTP below to reset your password:</p>
         <p><strong>{otp}</strong></p>
         """
-        cls.send(subject, html, to_address)
+        await cls.send_otp("reset-password", subject, html, to_address, otp)
 
     @classmethod
-    def change_email_send_verification_email(cls, new_email: str):
+    async def change_email_send_verification_email(cls, new_email: str):
         otp = TokenService.create_otp_token()
         subject = "Email Change Verification"
         html = f"""
         <p>Use the OTP below to verify your new email address:</p>
         <p><strong>{otp}</strong></p>
         """
-        cls.send(subject, html, new_email)
+        await cls.send_otp("change-email", subject, html, new_email, otp)
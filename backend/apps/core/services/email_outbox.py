@@ -0,0 +1,270 @@
+"""
+Transactional email outbox.
+
+Requests don't talk to the email provider: `EmailOutbox.enqueue` inserts a row in
+``email_outbox`` and returns. A worker claims due rows (``FOR UPDATE SKIP LOCKED``,
+so several processes can run one), hands them to the configured transport off the
+event loop, and on failure retries them with exponential backoff until
+``EMAIL_OUTBOX_MAX_ATTEMPTS``. A claimed row is leased rather than locked for the
+delivery, so a worker that dies mid-send only delays the message.
+
+The worker runs inside each API process (``EMAIL_OUTBOX_WORKER``) or on its own:
+
+    python -m apps.core.services.email_outbox
+"""
+
+import asyncio
+import importlib
+import random
+from collections import deque
+from datetime import timedelta
+from typing import Any, Deque, Dict, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from starlette.concurrency import run_in_threadpool
+
+from apps.core.logger import log
+from apps.core.models import OutboxEmail
+from config.database import get_async_session
+from config.settings import (
+    AppConfig, EMAIL_OUTBOX_BATCH_SIZE, EMAIL_OUTBOX_MAX_ATTEMPTS, EMAIL_OUTBOX_POLL_SECONDS,
+    EMAIL_OUTBOX_RETENTION_HOURS, EMAIL_OUTBOX_RETRY_BASE_SECONDS, EMAIL_OUTBOX_RETRY_MAX_SECONDS, EMAIL_TRANSPORT,
+)
+
+# How long a claimed message is hidden from other workers while it is being delivered
+LEASE_SECONDS = 120
+
+
+class EmailTransport:
+    """Delivers one message. Called from a worker thread, so it may block; raise to have it retried."""
+
+    def send(self, to: str, subject: str, html: str):
+        raise NotImplementedError
+
+
+class ResendTransport(EmailTransport):
+
+    def __init__(self):
+        import resend
+
+        app = AppConfig.get_config()
+        if not app.resend_api_key:
+            raise RuntimeError("RESEND_API_KEY is not set")
+        if not app.resend_from_email:
+            raise RuntimeError("RESEND_FROM_EMAIL is not set")
+
+        resend.api_key = app.resend_api_key
+        self.resend = resend
+        self.sender = f"{app.project_name} <{app.resend_from_email}>"
+
+    def send(self, to: str, subject: str, html: str):
+        self.resend.Emails.send({
+            "from": self.sender,
+            "to": [to],
+            "subject": subject,
+            "html": html,
+        })
+
+
+class LocalTransport(EmailTransport):
+    """Stand-in for development and tests: keeps the latest messages in `sent` and logs them instead of sending."""
+
+    # Bounded: this is also the transport of a long-running worker when no provider is configured
+    KEEP = 100
+    sent: Deque[Dict[str, str]] = deque(maxlen=KEEP)
+
+    def send(self, to: str, subject: str, html: str):
+        self.sent.append({"to": to, "subject": subject, "html": html})
+        log.info("Email delivered locally", to=to, subject=subject)
+
+
+class EmailOutbox:
+
+    _transport: Optional[EmailTransport] = None
+    _wake: Optional[asyncio.Event] = None
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def transport(cls) -> EmailTransport:
+        """The configured transport (``EMAIL_TRANSPORT``), created on first use."""
+        if cls._transport is None:
+            module, _, name = EMAIL_TRANSPORT.rpartition(".")
+            cls._transport = getattr(importlib.import_module(module), name)()
+        return cls._transport
+
+    # ---------------
+    # --- Enqueue ---
+    # ---------------
+
+    @classmethod
+    async def enqueue(cls, to: str, subject: str, html: str, dedup_key: Optional[str] = None) -> bool:
+        """
+        Queue a message for delivery and commit. Returns False when a message with the same
+        ``dedup_key`` is already pending or sent, in which case nothing is added; one that
+        failed for good is queued again with a fresh set of attempts.
+        """
+        stmt = insert(OutboxEmail).values(to_address=to, subject=subject, html=html, dedup_key=dedup_key)
+        if dedup_key:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[OutboxEmail.dedup_key],
+                set_={"to_address": stmt.excluded.to_address, "subject": stmt.excluded.subject,
+                      "html": stmt.excluded.html, "status": "pending", "attempts": 0,
+                      "next_attempt_at": func.now(), "last_error": None},
+                where=OutboxEmail.status == "failed",
+            )
+
+        async with get_async_session() as db:
+            queued = (await db.execute(stmt.returning(OutboxEmail.id))).scalar_one_or_none()
+            await db.commit()
+
+        if queued is None:
+            log.service("Email already queued", to=to, dedup_key=dedup_key)
+            return False
+
+        log.service("Email queued", to=to, subject=subject, outbox_id=queued)
+        if cls._wake is not None:
+            cls._wake.set()
+        return True
+
+    # --------------
+    # --- Worker ---
+    # --------------
+
+    @classmethod
+    async def deliver_due(cls, batch_size: int = EMAIL_OUTBOX_BATCH_SIZE) -> int:
+        """Claim up to ``batch_size`` due messages, deliver them and record the outcome. Returns the number claimed."""
+        async with get_async_session() as db:
+            due = (
+                select(OutboxEmail.id)
+                .where(OutboxEmail.status == "pending", OutboxEmail.next_attempt_at <= func.now())
+                .order_by(OutboxEmail.next_attempt_at, OutboxEmail.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            claimed = (await db.execute(
+                update(OutboxEmail)
+                .where(OutboxEmail.id.in_(due.scalar_subquery()))
+                .values(attempts=OutboxEmail.attempts + 1,
+                        next_attempt_at=func.now() + timedelta(seconds=LEASE_SECONDS))
+                .returning(OutboxEmail.id, OutboxEmail.to_address, OutboxEmail.subject, OutboxEmail.html,
+                           OutboxEmail.attempts)
+                .execution_options(synchronize_session=False)
+            )).all()
+            await db.commit()
+
+        if not claimed:
+            return 0
+
+        errors = await asyncio.gather(*(cls._send(message) for message in claimed))
+
+        async with get_async_session() as db:
+            for message, error in zip(claimed, errors):
+                await db.execute(
+                    update(OutboxEmail).where(OutboxEmail.id == message.id).values(**cls._outcome(message, error))
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+
+        return len(claimed)
+
+    @classmethod
+    async def _send(cls, message) -> Optional[str]:
+        try:
+            await run_in_threadpool(cls.transport().send, message.to_address, message.subject, message.html)
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+        return None
+
+    @classmethod
+    def _outcome(cls, message, error: Optional[str]) -> Dict[str, Any]:
+        if error is None:
+            log.service("Email sent", to=message.to_address, outbox_id=message.id, attempts=message.attempts)
+            return {"status": "sent", "sent_at": func.now(), "last_error": None}
+
+        if message.attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+            log.error("Email delivery failed, giving up", category="SERVICE", to=message.to_address,
+                      outbox_id=message.id, attempts=message.attempts, error=error)
+            return {"status": "failed", "last_error": error}
+
+        delay = cls.backoff(message.attempts)
+        log.warn("Email delivery failed, will retry", category="SERVICE", to=message.to_address, outbox_id=message.id,
+                 attempts=message.attempts, retry_in=round(delay, 1), error=error)
+        return {"next_attempt_at": func.now() + timedelta(seconds=delay), "last_error": error}
+
+    @staticmethod
+    def backoff(attempts: int) -> float:
+        """Seconds before the next try after ``attempts`` failures: exponential, capped, with jitter."""
+        delay = min(EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), EMAIL_OUTBOX_RETRY_MAX_SECONDS)
+        return delay * random.uniform(0.8, 1.2)
+
+    @classmethod
+    async def purge(cls) -> int:
+        """Delete sent messages older than ``EMAIL_OUTBOX_RETENTION_HOURS``"""
+        async with get_async_session() as db:
+            result = await db.execute(
+                delete(OutboxEmail)
+                .where(OutboxEmail.status == "sent",
+                       OutboxEmail.sent_at < func.now() - timedelta(hours=EMAIL_OUTBOX_RETENTION_HOURS))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        return result.rowcount
+
+    @classmethod
+    async def run(cls):
+        """Deliver messages until cancelled: right after an enqueue in this process, else every poll interval."""
+        cls._wake = asyncio.Event()
+        log.lifecycle("EmailOutbox", "worker started", transport=EMAIL_TRANSPORT)
+        loop = asyncio.get_running_loop()
+        purged_at = 0.0
+
+        while True:
+            cls._wake.clear()
+            try:
+                claimed = await cls.deliver_due()
+                if loop.time() - purged_at > 3600:
+                    await cls.purge()
+                    purged_at = loop.time()
+            except Exception as e:
+                log.error("Email outbox worker error", category="SERVICE", error=str(e))
+                claimed = 0
+
+            if claimed >= EMAIL_OUTBOX_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(cls._wake.wait(), EMAIL_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    @classmethod
+    def start(cls):
+        if cls._task is None:
+            cls._task = asyncio.get_running_loop().create_task(cls.run())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is None:
+            return
+        cls._task.cancel()
+        try:
+            await cls._task
+        except asyncio.CancelledError:
+            pass
+        cls._task = cls._wake = None
+        log.lifecycle("EmailOutbox", "worker stopped")
+
+
+if __name__ == "__main__":
+    from config.database import async_engine
+
+    async def main():
+        try:
+            await EmailOutbox.run()
+        finally:
+            await async_engine.dispose()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
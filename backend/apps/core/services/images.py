@@ -0,0 +1,75 @@
+"""
+Responsive image derivatives.
+
+Listing, faculty and profile images are re-encoded at upload time into smaller copies
+(``IMAGE_DERIVATIVE_WIDTHS``, never upscaled) in WebP, plus AVIF when Pillow has an
+AVIF encoder (the ``pillow-avif-plugin`` package). Each derivative is stored under a
+key derived from its content hash, so an unchanged image is stored once and its URLs
+can be cached forever. The stored variants are returned to clients as ``srcset``
+strings per format, for ``<picture>`` / ``<img srcset>``.
+"""
+
+import hashlib
+import io
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from PIL import Image, ImageOps
+
+from config.settings import IMAGE_DERIVATIVE_QUALITY, IMAGE_DERIVATIVE_WIDTHS
+
+try:
+    import pillow_avif  # noqa: F401  (registers the AVIF encoder)
+except ImportError:
+    pass
+Image.init()
+
+
+class ImageDerivatives:
+
+    widths: List[int] = sorted(IMAGE_DERIVATIVE_WIDTHS)
+    # Best compression first: clients take the first <source> type they support
+    formats: List[str] = [f for f in ("avif", "webp") if f.upper() in Image.SAVE]
+
+    @classmethod
+    def render(cls, source: BinaryIO) -> List[Dict[str, Any]]:
+        """
+        Resized copies of an image, one per width (up to the image's own width) and format:
+        ``{"width", "format", "data", "key"}`` where ``key`` is the content-addressed storage key.
+        CPU bound: run it off the event loop.
+        """
+        derivatives = []
+        with Image.open(source) as original:
+            image = ImageOps.exif_transpose(original)
+            if image.mode not in ("RGB", "RGBA"):
+                has_alpha = "A" in image.getbands() or "transparency" in image.info
+                image = image.convert("RGBA" if has_alpha else "RGB")
+
+            for width in cls.widths:
+                width = min(width, image.width)
+                height = max(1, round(image.height * width / image.width))
+                resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+
+                for image_format in cls.formats:
+                    buffer = io.BytesIO()
+                    resized.save(buffer, image_format.upper(), quality=IMAGE_DERIVATIVE_QUALITY)
+                    data = buffer.getvalue()
+                    derivatives.append({
+                        "width": width,
+                        "format": image_format,
+                        "data": data,
+                        "key": f"derivatives/{hashlib.sha256(data).hexdigest()}",
+                    })
+
+                if width == image.width:
+                    break
+        return derivatives
+
+    @staticmethod
+    def srcset(variants: Optional[List[Dict[str, Any]]]) -> Optional[Dict[str, str]]:
+        """``{"webp": "<url> 320w, <url> 640w", ...}`` for stored variants, None without any"""
+        if not variants:
+            return None
+        by_format: Dict[str, List[str]] = {}
+        for variant in sorted(variants, key=lambda v: v["width"]):
+            by_format.setdefault(variant["format"], []).append(f"{variant['url']} {variant['width']}w")
+        return {image_format: ", ".join(candidates) for image_format, candidates in by_format.items()}
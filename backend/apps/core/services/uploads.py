@@ -0,0 +1,304 @@
+"""
+Image uploads.
+
+`UploadLimitMiddleware` rejects (413) a multipart request as soon as its body, as it streams
+in, passes the size limit, so an oversized upload is never received in full. Every upload
+endpoint then goes through `UploadService`, which
+
+- reads the spooled file in chunks to check its own size, without ever holding it in memory;
+- checks the file's magic bytes, not the client-supplied ``content_type``;
+- stores it with the configured backend on a bounded thread pool, so the blocking
+  SDK calls never run on the event loop;
+- optionally stores resized WebP / AVIF derivatives next to it (see `apps.core.services.images`).
+
+``UPLOADS_BACKEND`` is the dotted path of an `UploadBackend`: `CloudinaryBackend` by
+default, or `LocalBackend`, which writes under ``UPLOADS_LOCAL_ROOT`` (development and tests).
+"""
+
+import asyncio
+import importlib
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+
+from apps.core.logger import log
+from apps.core.services.images import ImageDerivatives
+from config.settings import (
+    CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET, CLOUDINARY_CLOUD_NAME, MAX_FILE_SIZE_MB,
+    UPLOADS_BACKEND, UPLOADS_LOCAL_ROOT, UPLOADS_LOCAL_URL, UPLOADS_WORKERS,
+)
+
+CHUNK_SIZE = 64 * 1024
+
+
+def sniff_image(header: bytes) -> Optional[str]:
+    """Image format from the first bytes of a file, None if it isn't a supported image"""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    if header[4:8] == b"ftyp" and header[8:12] in (b"avif", b"avis"):
+        return "avif"
+    return None
+
+
+class UploadBackend:
+    """Stores an image. Called on the upload pool, so implementations may block."""
+
+    def upload(self, file: BinaryIO, folder: str, image_format: str,
+               max_dimension: Optional[int] = None) -> Dict[str, Any]:
+        """Store the image; returns at least ``url`` and ``public_id``"""
+        raise NotImplementedError
+
+    def store(self, data: bytes, key: str, image_format: str) -> str:
+        """Store an encoded image under a fixed key (kept if it already exists); returns its URL"""
+        raise NotImplementedError
+
+    def delete(self, public_id: str) -> bool:
+        raise NotImplementedError
+
+
+class CloudinaryBackend(UploadBackend):
+
+    def __init__(self):
+        import cloudinary
+        import cloudinary.uploader
+
+        cloudinary.config(
+            cloud_name=CLOUDINARY_CLOUD_NAME,
+            api_key=CLOUDINARY_API_KEY,
+            api_secret=CLOUDINARY_API_SECRET,
+            secure=True,
+        )
+        self.uploader = cloudinary.uploader
+
+    def upload(self, file: BinaryIO, folder: str, image_format: str,
+               max_dimension: Optional[int] = None) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"folder": folder, "resource_type": "image"}
+        if max_dimension:
+            options["transformation"] = [
+                {"width": max_dimension, "height": max_dimension, "crop": "limit"},
+                {"quality": "auto"},
+                {"fetch_format": "auto"},
+            ]
+        result = self.uploader.upload(file, **options)
+        return {
+            "url": result.get("secure_url"),
+            "public_id": result.get("public_id"),
+            "width": result.get("width"),
+            "height": result.get("height"),
+            "format": result.get("format"),
+        }
+
+    def store(self, data: bytes, key: str, image_format: str) -> str:
+        result = self.uploader.upload(data, public_id=f"prephub/{key}", resource_type="image", format=image_format,
+                                      overwrite=False, unique_filename=False)
+        return result.get("secure_url")
+
+    def delete(self, public_id: str) -> bool:
+        return self.uploader.destroy(public_id).get("result") == "ok"
+
+
+class LocalBackend(UploadBackend):
+    """Writes images under ``UPLOADS_LOCAL_ROOT`` and serves them from ``UPLOADS_LOCAL_URL``. No resizing."""
+
+    def __init__(self, root: str = UPLOADS_LOCAL_ROOT, base_url: str = UPLOADS_LOCAL_URL):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def upload(self, file: BinaryIO, folder: str, image_format: str,
+               max_dimension: Optional[int] = None) -> Dict[str, Any]:
+        public_id = f"{folder.strip('/')}/{uuid.uuid4().hex}"
+        path = os.path.join(self.root, f"{public_id}.{image_format}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as out:
+            while chunk := file.read(CHUNK_SIZE):
+                out.write(chunk)
+        return {
+            "url": f"{self.base_url}/{public_id}.{image_format}",
+            "public_id": public_id,
+            "width": None,
+            "height": None,
+            "format": image_format,
+        }
+
+    def store(self, data: bytes, key: str, image_format: str) -> str:
+        path = os.path.join(self.root, f"{key}.{image_format}")
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial = f"{path}.{uuid.uuid4().hex}.part"
+            with open(partial, "wb") as out:
+                out.write(data)
+            os.replace(partial, path)
+        return f"{self.base_url}/{key}.{image_format}"
+
+    def delete(self, public_id: str) -> bool:
+        directory, name = os.path.split(os.path.join(self.root, public_id))
+        if not os.path.isdir(directory):
+            return False
+        deleted = False
+        for entry in os.listdir(directory):
+            if os.path.splitext(entry)[0] == name:
+                os.remove(os.path.join(directory, entry))
+                deleted = True
+        return deleted
+
+
+class UploadService:
+
+    executor = ThreadPoolExecutor(max_workers=UPLOADS_WORKERS, thread_name_prefix="uploads")
+    _backend: Optional[UploadBackend] = None
+
+    @classmethod
+    def backend(cls) -> UploadBackend:
+        """The configured backend (``UPLOADS_BACKEND``), created on first use."""
+        if cls._backend is None:
+            module, _, name = UPLOADS_BACKEND.rpartition(".")
+            cls._backend = getattr(importlib.import_module(module), name)()
+        return cls._backend
+
+    @classmethod
+    async def upload_image(cls, file: UploadFile, folder: str, max_size_mb: int = MAX_FILE_SIZE_MB,
+                           max_dimension: Optional[int] = None, derivatives: bool = False) -> Dict[str, Any]:
+        """
+        Validate and store an uploaded image. ``max_dimension`` bounds the stored width and height
+        (where the backend can resize). Returns url, public_id, width, height and format, and with
+        ``derivatives`` the stored resized copies as ``variants`` ([{url, width, format}]).
+        """
+        image_format = await cls.validate(file, max_size_mb)
+        rendered = await cls._render(file) if derivatives else []
+
+        try:
+            result = await cls._run(cls.backend().upload, file.file, folder, image_format, max_dimension)
+            if derivatives:
+                result["variants"] = await cls._store_derivatives(rendered)
+        except Exception as e:
+            log.error("Image upload failed", category="SERVICE", folder=folder, filename=file.filename, error=str(e))
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Failed to upload image")
+
+        log.service("Image uploaded", folder=folder, public_id=result.get("public_id"), format=image_format,
+                    variants=len(rendered))
+        return result
+
+    @classmethod
+    async def store(cls, data: bytes, key: str, image_format: str) -> str:
+        """Store encoded image bytes under a fixed key (kept if it already exists); returns its URL"""
+        return await cls._run(cls.backend().store, data, key, image_format)
+
+    @classmethod
+    async def delete_image(cls, public_id: str) -> bool:
+        try:
+            return await cls._run(cls.backend().delete, public_id)
+        except Exception as e:
+            log.error("Image delete failed", category="SERVICE", public_id=public_id, error=str(e))
+            return False
+
+    @classmethod
+    async def validate(cls, file: UploadFile, max_size_mb: int = MAX_FILE_SIZE_MB) -> str:
+        """
+        Check the upload is a supported image no larger than ``max_size_mb``, reading it a chunk at a
+        time, and rewind it. Returns the image format.
+        """
+        max_bytes = max_size_mb * 1024 * 1024
+        too_large = HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File size must be less than {max_size_mb}MB"
+        )
+        if file.size is not None and file.size > max_bytes:
+            raise too_large
+
+        await file.seek(0)
+        header = await file.read(CHUNK_SIZE)
+        image_format = sniff_image(header)
+        if image_format is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File must be a JPEG, PNG, GIF, WebP or AVIF image"
+            )
+
+        size = len(header)
+        while size <= max_bytes and (chunk := await file.read(CHUNK_SIZE)):
+            size += len(chunk)
+        if size > max_bytes:
+            raise too_large
+
+        await file.seek(0)
+        return image_format
+
+    @classmethod
+    async def _render(cls, file: UploadFile) -> List[Dict[str, Any]]:
+        try:
+            rendered = await cls._run(ImageDerivatives.render, file.file)
+        except Exception as e:
+            log.warn("Image could not be decoded", category="SERVICE", filename=file.filename, error=str(e))
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Image could not be processed")
+        finally:
+            await file.seek(0)
+        return rendered
+
+    @classmethod
+    async def _store_derivatives(cls, rendered: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        urls = await asyncio.gather(*(
+            cls.store(derivative["data"], derivative["key"], derivative["format"]) for derivative in rendered
+        ))
+        return [
+            {"url": url, "width": derivative["width"], "format": derivative["format"]}
+            for url, derivative in zip(urls, rendered)
+        ]
+
+    @classmethod
+    async def _run(cls, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(cls.executor, func, *args)
+
+
+class UploadLimitMiddleware:
+    """
+    Pure ASGI middleware enforcing the upload size limit on multipart request bodies as they stream in.
+
+    A declared ``Content-Length`` over the limit is rejected before any of the body is read; otherwise the
+    bytes are counted as the form parser pulls them, and the request fails with a 413 as soon as the count
+    passes the limit, instead of after the whole body has been spooled to disk.
+    """
+
+    # Part headers, boundaries and the other form fields around the file
+    MULTIPART_OVERHEAD = 64 * 1024
+
+    def __init__(self, app, max_bytes: int = MAX_FILE_SIZE_MB * 1024 * 1024 + MULTIPART_OVERHEAD):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        headers = Headers(scope=scope) if scope["type"] == "http" else None
+        if headers is None or not headers.get("content-type", "").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"File size must be less than {MAX_FILE_SIZE_MB}MB"
+        content_length = headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse({"detail": detail}, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside the form parsing, so the app's HTTPException handler answers it
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+            return message
+
+        await self.app(scope, receive_limited, send)
@@ -0,0 +1,161 @@
+"""
+Bucketed time-series helpers for the analytics endpoints.
+
+Every trend is computed with a single ``GROUP BY date_trunc(...)`` query; buckets
+that have no rows are filled with zeros in Python so the response always carries
+a fixed number of points for the selected period.
+
+Usage:
+    from apps.core.trends import TrendEngine
+
+    trends = await TrendEngine.series(
+        db, "month", Booking.created_at,
+        {"bookings": func.count(Booking.id)},
+    )
+    trends["bookings"]  # [{"label": "Week 1", "value": 3}, ...]
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Float, Numeric, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@dataclass(frozen=True)
+class Bucket:
+    start: datetime
+    label: str
+
+
+class TrendEngine:
+    """Builds fixed-size, gap-filled trends for the week / month / year periods."""
+
+    # period -> (date_trunc unit, number of buckets)
+    PERIODS: Dict[str, Tuple[str, int]] = {
+        "week": ("day", 7),
+        "month": ("week", 4),
+        "year": ("month", 12),
+    }
+
+    # period -> look-back window used by the "period_*" overview counters
+    WINDOWS: Dict[str, timedelta] = {
+        "week": timedelta(days=7),
+        "month": timedelta(days=30),
+        "year": timedelta(days=365),
+    }
+
+    @classmethod
+    def period_start(cls, period: str, now: Optional[datetime] = None) -> datetime:
+        """Start of the rolling window for the period counters (e.g. last 30 days)."""
+        now = now or datetime.now()
+        return now - cls.WINDOWS[period]
+
+    @classmethod
+    def buckets(cls, period: str, now: Optional[datetime] = None) -> List[Bucket]:
+        """
+        Return the ordered buckets for a period, oldest first.
+
+        week  -> the last 7 days, labelled by weekday ("Mon")
+        month -> the last 4 ISO weeks (Monday based), labelled "Week 1".."Week 4"
+        year  -> the last 12 calendar months, labelled "Jan 25"
+        """
+        now = now or datetime.now()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        unit, size = cls.PERIODS[period]
+
+        if unit == "day":
+            starts = [today - timedelta(days=size - 1 - i) for i in range(size)]
+            return [Bucket(start, start.strftime("%a")) for start in starts]
+
+        if unit == "week":
+            monday = today - timedelta(days=today.weekday())
+            starts = [monday - timedelta(weeks=size - 1 - i) for i in range(size)]
+            return [Bucket(start, f"Week {i + 1}") for i, start in enumerate(starts)]
+
+        # month
+        first = today.replace(day=1)
+        starts = []
+        for i in range(size):
+            offset = first.year * 12 + first.month - 1 - (size - 1 - i)
+            starts.append(first.replace(year=offset // 12, month=offset % 12 + 1))
+        return [Bucket(start, start.strftime("%b %y")) for start in starts]
+
+    @classmethod
+    def bucket_end(cls, period: str, last: datetime) -> datetime:
+        """Exclusive upper bound of the last bucket."""
+        unit, _ = cls.PERIODS[period]
+        if unit == "day":
+            return last + timedelta(days=1)
+        if unit == "week":
+            return last + timedelta(weeks=1)
+        offset = last.year * 12 + last.month
+        return last.replace(year=offset // 12, month=offset % 12 + 1)
+
+    @classmethod
+    async def series(
+        cls,
+        db: AsyncSession,
+        period: str,
+        timestamp: Any,
+        metrics: Dict[str, Any],
+        *criteria: Any,
+        joins: Sequence[Tuple[Any, Any]] = (),
+        now: Optional[datetime] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Compute every bucket of one or more metrics in a single grouped query.
+
+        Args:
+            db: Database session.
+            period: One of "week", "month" or "year".
+            timestamp: Column (or expression) the rows are bucketed on.
+            metrics: Mapping of metric name -> aggregate expression, e.g.
+                     ``{"bookings": func.count(Booking.id)}``.
+            criteria: Extra WHERE clauses applied to every bucket.
+            joins: ``(target, onclause)`` pairs joined onto the query.
+            now: Reference time, defaults to ``datetime.now()``.
+
+        Returns:
+            dict: metric name -> list of ``{"label", "value"}`` points, oldest first.
+        """
+        unit, _ = cls.PERIODS[period]
+        buckets = cls.buckets(period, now)
+        start, end = buckets[0].start, cls.bucket_end(period, buckets[-1].start)
+
+        # The unit is rendered inline so SELECT and GROUP BY compare as the same expression
+        bucket_col = func.date_trunc(literal_column(f"'{unit}'"), timestamp).label("bucket")
+        query = select(bucket_col, *[expr.label(name) for name, expr in metrics.items()])
+        for target, onclause in joins:
+            query = query.join(target, onclause)
+        query = query.where(timestamp >= start, timestamp < end, *criteria).group_by(bucket_col)
+
+        rows = {cls._as_datetime(row.bucket): row for row in await db.execute(query)}
+
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        for name, expr in metrics.items():
+            as_float = isinstance(expr.type, (Numeric, Float))
+            points = []
+            for bucket in buckets:
+                row = rows.get(bucket.start)
+                value = row._mapping[name] if row else None
+                points.append({"label": bucket.label, "value": cls.number(value, as_float)})
+            result[name] = points
+        return result
+
+    @staticmethod
+    def _as_datetime(value: Any) -> datetime:
+        if isinstance(value, datetime):
+            return value.replace(tzinfo=None)
+        return datetime(value.year, value.month, value.day)
+
+    @staticmethod
+    def number(value: Any, as_float: bool = False) -> Any:
+        """Normalise an aggregate result: NULL -> 0, Decimal -> float."""
+        if value is None:
+            value = 0
+        if as_float or isinstance(value, Decimal):
+            return float(value)
+        return value
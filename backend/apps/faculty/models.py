@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
 from config.database import FastModel
@@ -8,10 +9,14 @@ class Faculty(FastModel):
     __tablename__ = "faculty"
 
     id = Column(Integer, primary_key=True, index=True)
-    listing_id = Column(Integer, ForeignKey("listings.id", ondelete="CASCADE"), nullable=False)
+    listing_id = Column(Integer, ForeignKey("listings.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(255), nullable=False)
     subject = Column(String(255), nullable=True)
     image_url = Column(Text, nullable=True)
+    # Resized copies of the image: [{"url", "width", "format"}] (see apps/core/services/images.py)
+    image_variants = Column(JSONB, nullable=True)
+    # Validator of the listing and faculty endpoints' ETags (apps/core/http_cache.py)
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
 
     # Relationships
     listing = relationship("Listing", back_populates="faculty")
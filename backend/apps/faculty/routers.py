@@ -1,11 +1,14 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query, UploadFile, File
 from sqlalchemy.orm import Session
 
 from apps.faculty.schemas import FacultyCreate, FacultyUpdate, FacultyOut, FacultyListOut
 from apps.faculty.services import FacultyService
 from apps.accounts.services.authenticate import AccountService
-from apps.core.services.cloudinary_service import CloudinaryService
+from apps.accounts.services.token import Principal
+from apps.core.http_cache import HttpCache
+from apps.core.services.images import ImageDerivatives
+from apps.core.services.uploads import UploadService
 from config.database import get_db
 
 router = APIRouter(prefix="/faculty", tags=["Faculty"])
@@ -17,10 +20,17 @@ def get_faculty_service(db: Session = Depends(get_db)) -> FacultyService:
 
 @router.get("/", response_model=FacultyListOut)
 def list_faculty(
+    request: Request,
+    response: Response,
     listing_id: int = Query(None),
     service: FacultyService = Depends(get_faculty_service),
 ):
-    """List all faculty members, optionally filtered by listing"""
+    """List all faculty members, optionally filtered by listing (answers conditional requests)"""
+    # No Last-Modified: deletions don't leave a timestamp behind, the version counter covers them
+    not_modified = HttpCache.check(request, response, HttpCache.etag(*service.version(), listing_id))
+    if not_modified:
+        return not_modified
+
     faculty = service.list_faculty(listing_id=listing_id)
     return {"faculty": faculty, "total": len(faculty)}
 
@@ -40,7 +50,7 @@ def get_faculty(
 @router.post("/", response_model=FacultyOut, status_code=status.HTTP_201_CREATED)
 def create_faculty(
     data: FacultyCreate,
-    current_user: dict = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: FacultyService = Depends(get_faculty_service),
 ):
     """Create a new faculty member"""
@@ -50,7 +60,7 @@ def create_faculty(
 @router.post("/bulk", response_model=List[FacultyOut], status_code=status.HTTP_201_CREATED)
 def create_bulk_faculty(
     data: List[FacultyCreate],
-    current_user: dict = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: FacultyService = Depends(get_faculty_service),
 ):
     """Create multiple faculty members at once"""
@@ -61,7 +71,7 @@ def create_bulk_faculty(
 def update_faculty(
     faculty_id: int,
     data: FacultyUpdate,
-    current_user: dict = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: FacultyService = Depends(get_faculty_service),
 ):
     """Update an existing faculty member"""
@@ -74,7 +84,7 @@ def update_faculty(
 @router.delete("/{faculty_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_faculty(
     faculty_id: int,
-    current_user: dict = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: FacultyService = Depends(get_faculty_service),
 ):
     """Delete a faculty member"""
@@ -88,7 +98,7 @@ def delete_faculty(
 async def upload_faculty_image(
     faculty_id: int,
     file: UploadFile = File(...),
-    current_user: dict = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: FacultyService = Depends(get_faculty_service),
 ):
     """Upload an image for a faculty member"""
@@ -96,14 +106,11 @@ async def upload_faculty_image(
     if not faculty:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Faculty not found")
     
-    # Upload to Cloudinary (synchronous call)
-    result = CloudinaryService.upload_image(
-        file=file, 
-        folder=f"prephub/faculty/{faculty.listing_id}/{faculty_id}"
-    )
+    result = await UploadService.upload_image(file, folder=f"prephub/faculty/{faculty.listing_id}/{faculty_id}",
+                                              derivatives=True)
     image_url = result["url"]
     
-    # Update faculty with image URL
-    service.update_faculty(faculty_id, FacultyUpdate(image_url=image_url))
+    # Update faculty with image URL and its resized copies
+    service.set_image(faculty_id, image_url, result["variants"])
     
-    return {"image_url": image_url}
+    return {"image_url": image_url, "image_srcset": ImageDerivatives.srcset(result["variants"])}
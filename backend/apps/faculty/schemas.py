@@ -1,5 +1,7 @@
-from typing import List, Optional
-from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field, computed_field
+
+from apps.core.services.images import ImageDerivatives
 
 
 class FacultyBase(BaseModel):
@@ -21,6 +23,13 @@ class FacultyUpdate(BaseModel):
 class FacultyOut(FacultyBase):
     id: int
     listing_id: int
+    image_variants: Optional[List[Dict[str, Any]]] = Field(None, exclude=True)
+
+    @computed_field
+    @property
+    def image_srcset(self) -> Optional[Dict[str, str]]:
+        """`srcset` of the resized copies of `image_url`, per format (avif, webp)"""
+        return ImageDerivatives.srcset(self.image_variants)
     
     model_config = ConfigDict(from_attributes=True)
 
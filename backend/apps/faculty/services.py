@@ -1,8 +1,10 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 
 from apps.faculty.models import Faculty
+from apps.listings.models import CatalogVersion
 from apps.faculty.schemas import FacultyCreate, FacultyUpdate
 
 
@@ -20,6 +22,12 @@ class FacultyService:
         result = self.db.execute(query)
         return list(result.scalars().all())
 
+    def version(self) -> Tuple[int, Optional[datetime]]:
+        """Write counter of the catalog and its last change, the ETag validator of `list_faculty` (one row read)"""
+        query = select(CatalogVersion.version, CatalogVersion.changed_at).where(CatalogVersion.id == 1)
+        row = self.db.execute(query).one_or_none()
+        return tuple(row) if row else (0, None)
+
     def get_faculty(self, faculty_id: int) -> Optional[Faculty]:
         """Get a single faculty member by ID"""
         return self.db.get(Faculty, faculty_id)
@@ -60,9 +68,25 @@ class FacultyService:
         if not faculty:
             return None
 
-        for field, value in data.model_dump(exclude_unset=True).items():
+        changes = data.model_dump(exclude_unset=True)
+        for field, value in changes.items():
             setattr(faculty, field, value)
+        if "image_url" in changes:
+            # Resized copies of the previous image
+            faculty.image_variants = None
+
+        self.db.commit()
+        self.db.refresh(faculty)
+        return faculty
+
+    def set_image(self, faculty_id: int, image_url: str, variants: Optional[List[dict]] = None) -> Optional[Faculty]:
+        """Replace a faculty member's image and its resized copies"""
+        faculty = self.get_faculty(faculty_id)
+        if not faculty:
+            return None
 
+        faculty.image_url = image_url
+        faculty.image_variants = variants
         self.db.commit()
         self.db.refresh(faculty)
         return faculty
@@ -1,5 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, func, ForeignKey, Numeric, ARRAY
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    BigInteger, Column, Integer, String, Text, DateTime, Float, func, ForeignKey, Numeric, ARRAY, Index,
+    CheckConstraint, text
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 
 from config.database import FastModel
 
@@ -14,8 +18,16 @@ class Listing(FastModel):
     description = Column(Text, nullable=True)
     price = Column(Numeric(10, 2), nullable=False)
     location = Column(String(255), nullable=True)
+    # Coordinates of `location` for proximity search (set by the owner or the geocoder)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
     features = Column(ARRAY(String), nullable=True)
     image_url = Column(Text, nullable=True)
+    # Resized copies of the image: [{"url", "width", "format"}] (see apps/core/services/images.py)
+    image_variants = Column(JSONB, nullable=True)
+    # Weighted document for full-text search (name, location, features, description), kept current by
+    # ListingService on create / update. Deferred: only the search query reads it.
+    search_vector = deferred(Column(TSVECTOR, nullable=False, server_default=text("''::tsvector")))
     
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, nullable=True, onupdate=func.now())
@@ -24,3 +36,36 @@ class Listing(FastModel):
     owner = relationship("User", foreign_keys=[owner_id])
     faculty = relationship("Faculty", back_populates="listing", cascade="all, delete-orphan")
     bookings = relationship("Booking", back_populates="listing", cascade="all, delete-orphan")
+
+    # Keyset pagination of GET /listings/: one (sort column, id) index per sort key, alone and
+    # behind the equality filters (type, owner), plus GIN indexes for the feature / location filters
+    __table_args__ = (
+        Index("ix_listings_created_at_id", "created_at", "id"),
+        Index("ix_listings_price_id", "price", "id"),
+        Index("ix_listings_type_created_at_id", "type", "created_at", "id"),
+        Index("ix_listings_type_price_id", "type", "price", "id"),
+        Index("ix_listings_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_listings_features", "features", postgresql_using="gin"),
+        Index("ix_listings_location_trgm", "location", postgresql_using="gin",
+              postgresql_ops={"location": "gin_trgm_ops"}),
+        # GET /listings/search: full-text matches, and typo-tolerant (trigram) matches on the name
+        Index("ix_listings_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_listings_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        # Bounding-box prefilter of `near=` queries
+        Index("ix_listings_latitude_longitude", "latitude", "longitude"),
+        CheckConstraint("price >= 0", name="ck_listings_price_not_negative"),
+    )
+
+
+class CatalogVersion(FastModel):
+    """
+    Write counter of the catalog (the listings and faculty tables, and the owner cards the listings embed):
+    the ETag validator of the endpoints returning collections of them. A single row (id 1), bumped once per
+    statement by a trigger on both tables (migration a6d2f8c1e4b7), so every write path counts, deletions and
+    cascades included, and by one on users when a listing owner's name or profile image changes (c9e4a7b2d5f1).
+    """
+    __tablename__ = "catalog_versions"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, server_default="0")
+    changed_at = Column(DateTime, nullable=False, server_default=func.now())
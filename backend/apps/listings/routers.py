@@ -1,55 +1,142 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
-from sqlalchemy.orm import Session
+from typing import List, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from apps.listings.schemas import (
-    ListingCreate, ListingUpdate, ListingOut, ListingListOut,
+    ListingCreate, ListingUpdate, ListingOut, ListingListOut, ListingSearchOut,
     AdminListingsOut, AdminListingItem, ListingDetailOut,
     OwnerInfo, BookingStats, EnrolledUserInfo, FacultyOut
 )
 from apps.listings.services import ListingService
 from apps.accounts.services.authenticate import AccountService
-from apps.accounts.models import User
-from apps.core.services.cloudinary_service import CloudinaryService
-from config.database import get_db
+from apps.accounts.services.token import Principal
+from apps.core.geocoding import valid_coordinates
+from apps.core.http_cache import HttpCache
+from apps.core.query_budget import query_budget
+from apps.core.services.images import ImageDerivatives
+from apps.core.services.uploads import UploadService
+from config.database import get_async_db
+from config.settings import (
+    LISTINGS_DEFAULT_RADIUS_KM, LISTINGS_MAX_PAGE_LIMIT, LISTINGS_MAX_RADIUS_KM, LISTINGS_PAGE_LIMIT
+)
 
 router = APIRouter(prefix="/listings", tags=["Listings"])
 
 
-def get_listing_service(db: Session = Depends(get_db)) -> ListingService:
+def get_listing_service(db: AsyncSession = Depends(get_async_db)) -> ListingService:
     return ListingService(db)
 
 
-def get_account_service(db: Session = Depends(get_db)) -> AccountService:
+def get_account_service(db: AsyncSession = Depends(get_async_db)) -> AccountService:
     return AccountService(db)
 
 
 @router.get("/", response_model=ListingListOut)
-def list_listings(
+@query_budget(6)
+async def list_listings(
+    request: Request,
+    response: Response,
     listing_type: str = Query(None, alias="type"),
     owner_id: int = Query(None),
+    min_price: float = Query(None, ge=0),
+    max_price: float = Query(None, ge=0),
+    location: str = Query(None, max_length=255, description="Case-insensitive substring of the location"),
+    features: List[str] = Query(None, description="Listings having all of these features (repeat the parameter)"),
+    sort: str = Query("-created_at", pattern="^-?(created_at|price)$",
+                      description="`created_at` or `price`, prefixed with `-` for descending order"),
+    after: str = Query(None, description="`next_cursor` of the previous page"),
+    limit: int = Query(LISTINGS_PAGE_LIMIT, ge=1, le=LISTINGS_MAX_PAGE_LIMIT),
+    include_total: bool = Query(False, description="Also count every matching listing"),
+    near: str = Query(None, description="`lat,lng`: only listings within `radius_km`, closest first (overrides `sort`)"),
+    radius_km: float = Query(LISTINGS_DEFAULT_RADIUS_KM, gt=0, le=LISTINGS_MAX_RADIUS_KM),
+    service: ListingService = Depends(get_listing_service),
+):
+    """List listings page by page (keyset pagination), with optional filters and sorting"""
+    # No Last-Modified: deletions don't leave a timestamp behind, the version counter covers them
+    version = await service.catalog_version()
+    not_modified = HttpCache.check(request, response, HttpCache.etag(*version, str(request.query_params)))
+    if not_modified:
+        return not_modified
+
+    filters = dict(listing_type=listing_type, owner_id=owner_id, min_price=min_price, max_price=max_price,
+                   location=location, features=features)
+    if near:
+        point = parse_point(near)
+        results, next_cursor = await service.nearby_listings(*point, radius_km, after=after, limit=limit, **filters)
+        listings = [{**ListingOut.model_validate(listing).model_dump(), "distance_km": distance}
+                    for listing, distance in results]
+        total = await service.count_listings(near=point, radius_km=radius_km, **filters) if include_total else None
+    else:
+        listings, next_cursor = await service.list_listings(sort=sort, after=after, limit=limit, **filters)
+        total = await service.count_listings(**filters) if include_total else None
+    return {"listings": listings, "next_cursor": next_cursor, "total": total}
+
+
+def parse_point(value: str) -> Tuple[float, float]:
+    """Parse a `lat,lng` query parameter"""
+    try:
+        latitude, longitude = (float(part) for part in value.split(","))
+    except ValueError:
+        latitude = longitude = None
+    if latitude is None or not valid_coordinates(latitude, longitude):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="`near` must be `latitude,longitude` in decimal degrees"
+        )
+    return latitude, longitude
+
+
+@router.get("/search", response_model=ListingSearchOut)
+@query_budget(4)
+async def search_listings(
+    q: str = Query(..., min_length=2, max_length=200,
+                   description='Words to look for; supports "quoted phrases", `or` and `-excluded` words'),
+    listing_type: str = Query(None, alias="type"),
+    min_price: float = Query(None, ge=0),
+    max_price: float = Query(None, ge=0),
+    location: str = Query(None, max_length=255),
+    features: List[str] = Query(None),
+    after: str = Query(None, description="`next_cursor` of the previous page"),
+    limit: int = Query(LISTINGS_PAGE_LIMIT, ge=1, le=LISTINGS_MAX_PAGE_LIMIT),
     service: ListingService = Depends(get_listing_service),
 ):
-    """List all listings, optionally filtered by type or owner"""
-    listings = service.list_listings(listing_type=listing_type, owner_id=owner_id)
-    return {"listings": listings, "total": len(listings)}
+    """Search listings by name, description, location and features, best matches first"""
+    results, next_cursor = await service.search_listings(
+        q, listing_type=listing_type, min_price=min_price, max_price=max_price, location=location,
+        features=features, after=after, limit=limit,
+    )
+    listings = [{**ListingOut.model_validate(listing).model_dump(), "rank": rank} for listing, rank in results]
+    return {"listings": listings, "next_cursor": next_cursor}
 
 
 @router.get("/{listing_id}", response_model=ListingOut)
-def get_listing(
+@query_budget(4)
+async def get_listing(
     listing_id: int,
+    request: Request,
+    response: Response,
     service: ListingService = Depends(get_listing_service),
 ):
-    """Get a single listing by ID"""
-    listing = service.get_listing(listing_id)
+    """Get a single listing by ID; answers conditional requests"""
+    changed, rows = await service.listing_version(listing_id)
+    if changed is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Listing not found")
+    not_modified = HttpCache.check(request, response, HttpCache.etag(changed, rows), changed)
+    if not_modified:
+        return not_modified
+
+    listing = await service.get_listing(listing_id)
     if not listing:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Listing not found")
     return listing
 
 
 @router.post("/", response_model=ListingOut, status_code=status.HTTP_201_CREATED)
-def create_listing(
+@query_budget(6)
+async def create_listing(
     data: ListingCreate,
-    current_user: dict = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: ListingService = Depends(get_listing_service),
 ):
     """Create a new listing (approved listing owners only)"""
@@ -67,114 +154,109 @@ def create_listing(
             detail="Your account must be approved by admin before creating listings"
         )
     
-    return service.create_listing(data, owner_id=current_user.id)
+    return await service.create_listing(data, owner_id=current_user.id)
 
 
 @router.put("/{listing_id}", response_model=ListingOut)
-def update_listing(
+@query_budget(10)
+async def update_listing(
     listing_id: int,
     data: ListingUpdate,
-    current_user: dict = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: ListingService = Depends(get_listing_service),
 ):
     """Update an existing listing (owner only)"""
-    listing = service.get_listing(listing_id)
+    listing = await service.get_listing(listing_id)
     if not listing:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Listing not found")
     
     if listing.owner_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this listing")
     
-    updated_listing = service.update_listing(listing_id, data)
+    updated_listing = await service.update_listing(listing_id, data)
     return updated_listing
 
 
 @router.delete("/{listing_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_listing(
+@query_budget(12)
+async def delete_listing(
     listing_id: int,
-    current_user: dict = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: ListingService = Depends(get_listing_service),
 ):
     """Delete a listing (owner only)"""
-    listing = service.get_listing(listing_id)
+    listing = await service.get_listing(listing_id)
     if not listing:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Listing not found")
     
     if listing.owner_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this listing")
     
-    service.delete_listing(listing_id)
+    await service.delete_listing(listing_id)
     return None
 
 
 @router.post("/{listing_id}/media", response_model=dict, status_code=status.HTTP_201_CREATED)
+@query_budget(10)
 async def upload_listing_image(
     listing_id: int,
     file: UploadFile = File(...),
-    current_user: dict = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: ListingService = Depends(get_listing_service),
 ):
     """Upload an image for a listing"""
-    listing = service.get_listing(listing_id)
+    listing = await service.get_listing(listing_id)
     if not listing:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Listing not found")
     
     if listing.owner_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to upload media for this listing")
     
-    # Upload to Cloudinary (synchronous call)
-    result = CloudinaryService.upload_image(
-        file=file, 
-        folder=f"prephub/listings/{listing_id}"
-    )
+    result = await UploadService.upload_image(file, folder=f"prephub/listings/{listing_id}", derivatives=True)
     image_url = result["url"]
     
-    # Update listing with image URL
-    service.update_listing(listing_id, ListingUpdate(image_url=image_url))
+    # Update listing with image URL and its resized copies
+    await service.set_image(listing_id, image_url, result["variants"])
     
-    return {"image_url": image_url}
+    return {"image_url": image_url, "image_srcset": ImageDerivatives.srcset(result["variants"])}
 
 
 # Admin endpoints
 @router.get("/admin/all", response_model=AdminListingsOut)
-def admin_get_all_listings(
-    current_user: User = Depends(AccountService.current_user),
+@query_budget(2)
+async def admin_get_all_listings(
+    current_user: Principal = Depends(AccountService.current_principal),
     service: ListingService = Depends(get_listing_service),
 ):
     """Admin: Get all listings with booking stats"""
     # Check admin role
-    if not isinstance(current_user, User):
-        current_user = User(**current_user)
-    
     if current_user.role != 'admin':
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
             detail="Admin access required"
         )
     
-    listings_data = service.get_all_listings_admin()
+    listings_data = await service.get_all_listings_admin()
     listings = [AdminListingItem(**data) for data in listings_data]
     return AdminListingsOut(listings=listings, total=len(listings))
 
 
 @router.get("/admin/{listing_id}/details", response_model=ListingDetailOut)
-def admin_get_listing_details(
+@query_budget(4)
+async def admin_get_listing_details(
     listing_id: int,
-    current_user: User = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: ListingService = Depends(get_listing_service),
 ):
     """Admin: Get detailed listing information including enrolled users"""
     # Check admin role
-    if not isinstance(current_user, User):
-        current_user = User(**current_user)
-    
     if current_user.role != 'admin':
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
             detail="Admin access required"
         )
     
-    detail_data = service.get_listing_detail_admin(listing_id)
+    detail_data = await service.get_listing_detail_admin(listing_id)
     if not detail_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
@@ -192,6 +274,8 @@ def admin_get_listing_details(
         description=listing.description,
         price=float(listing.price),
         location=listing.location,
+        latitude=listing.latitude,
+        longitude=listing.longitude,
         features=listing.features,
         image_url=listing.image_url,
         created_at=listing.created_at,
@@ -212,57 +296,53 @@ def admin_get_listing_details(
 
 
 @router.put("/admin/{listing_id}", response_model=ListingOut)
-def admin_update_listing(
+@query_budget(10)
+async def admin_update_listing(
     listing_id: int,
     data: ListingUpdate,
-    current_user: User = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: ListingService = Depends(get_listing_service),
 ):
     """Admin: Update any listing"""
     # Check admin role
-    if not isinstance(current_user, User):
-        current_user = User(**current_user)
-    
     if current_user.role != 'admin':
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
             detail="Admin access required"
         )
     
-    listing = service.get_listing(listing_id)
+    listing = await service.get_listing(listing_id)
     if not listing:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="Listing not found"
         )
     
-    updated_listing = service.update_listing(listing_id, data)
+    updated_listing = await service.update_listing(listing_id, data)
     return updated_listing
 
 
 @router.delete("/admin/{listing_id}", status_code=status.HTTP_204_NO_CONTENT)
-def admin_delete_listing(
+@query_budget(12)
+async def admin_delete_listing(
     listing_id: int,
-    current_user: User = Depends(AccountService.current_user),
+    current_user: Principal = Depends(AccountService.current_principal),
     service: ListingService = Depends(get_listing_service),
 ):
     """Admin: Delete any listing"""
     # Check admin role
-    if not isinstance(current_user, User):
-        current_user = User(**current_user)
-    
     if current_user.role != 'admin':
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
             detail="Admin access required"
         )
     
-    listing = service.get_listing(listing_id)
+    listing = await service.get_listing(listing_id)
     if not listing:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="Listing not found"
         )
     
-    service.delete_listing(listing_id)
+    await service.delete_listing(listing_id)
     return None
@@ -1,6 +1,8 @@
 from datetime import datetime
-from typing import List, Optional
-from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field, computed_field
+
+from apps.core.services.images import ImageDerivatives
 
 
 class FacultyBase(BaseModel):
@@ -12,6 +14,13 @@ class FacultyBase(BaseModel):
 class FacultyOut(FacultyBase):
     id: int
     listing_id: int
+    image_variants: Optional[List[Dict[str, Any]]] = Field(None, exclude=True)
+
+    @computed_field
+    @property
+    def image_srcset(self) -> Optional[Dict[str, str]]:
+        """`srcset` of the resized copies of `image_url`, per format (avif, webp)"""
+        return ImageDerivatives.srcset(self.image_variants)
     
     model_config = ConfigDict(from_attributes=True)
 
@@ -21,6 +30,9 @@ class ListingBase(BaseModel):
     description: Optional[str] = None
     price: float
     location: Optional[str] = None
+    # Geocoded from `location` when not given
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
     features: Optional[List[str]] = None
     type: str
 
@@ -34,6 +46,8 @@ class ListingUpdate(BaseModel):
     description: Optional[str] = None
     price: Optional[float] = None
     location: Optional[str] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
     features: Optional[List[str]] = None
     image_url: Optional[str] = None
 
@@ -44,6 +58,13 @@ class ListingOwnerInfo(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
     profile_image: Optional[str] = None
+    profile_image_variants: Optional[List[Dict[str, Any]]] = Field(None, exclude=True)
+
+    @computed_field
+    @property
+    def profile_image_srcset(self) -> Optional[Dict[str, str]]:
+        """`srcset` of the resized copies of `profile_image`, per format (avif, webp)"""
+        return ImageDerivatives.srcset(self.profile_image_variants)
     
     model_config = ConfigDict(from_attributes=True)
 
@@ -52,21 +73,43 @@ class ListingOut(ListingBase):
     id: int
     owner_id: int
     image_url: Optional[str] = None
+    image_variants: Optional[List[Dict[str, Any]]] = Field(None, exclude=True)
     created_at: datetime
     updated_at: Optional[datetime] = None
     faculty: List[FacultyOut] = []
     owner: Optional[ListingOwnerInfo] = None
+    # Only set by `near=` queries
+    distance_km: Optional[float] = None
+
+    @computed_field
+    @property
+    def image_srcset(self) -> Optional[Dict[str, str]]:
+        """`srcset` of the resized copies of `image_url`, per format (avif, webp)"""
+        return ImageDerivatives.srcset(self.image_variants)
     
     model_config = ConfigDict(from_attributes=True)
 
 
 class ListingListOut(BaseModel):
     listings: List[ListingOut]
-    total: int
+    # Cursor to pass as `after` for the next page; None on the last page
+    next_cursor: Optional[str] = None
+    # Only computed when requested with `include_total=true`
+    total: Optional[int] = None
     
     model_config = ConfigDict(from_attributes=True)
 
 
+class ListingSearchHit(ListingOut):
+    # Relevance: full-text rank plus trigram similarity of the name / location
+    rank: float
+
+
+class ListingSearchOut(BaseModel):
+    listings: List[ListingSearchHit]
+    next_cursor: Optional[str] = None
+
+
 # Admin schemas
 class OwnerInfo(BaseModel):
     id: int
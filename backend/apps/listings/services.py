@@ -1,42 +1,268 @@
-from typing import List, Optional, Dict
-from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import select, func, case
+import math
+from datetime import datetime
+from typing import List, Optional, Dict, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import ARRAY, Float, Select, String, cast, literal_column, select, func, case, or_
+from sqlalchemy.dialects.postgresql import REGCONFIG, TSVECTOR
 
-from apps.listings.models import Listing
+from apps.listings.models import CatalogVersion, Listing
 from apps.listings.schemas import ListingCreate, ListingUpdate
 from apps.bookings.models import Booking
 from apps.accounts.models import User
+from apps.core.models import DailyMetric
+from apps.faculty.models import Faculty
+from apps.core.geocoding import Geocoders
+from apps.core.pagination import Keyset
+from config.settings import LISTINGS_PAGE_LIMIT
 
 
 class ListingService:
-    def __init__(self, db: Session):
+    # sort key -> (column, descending); each one is backed by a (sort column, id) index, with and
+    # without a leading `type` / `owner_id` (see Listing.__table_args__)
+    SORTS = {
+        "created_at": (Listing.created_at, False),
+        "-created_at": (Listing.created_at, True),
+        "price": (Listing.price, False),
+        "-price": (Listing.price, True),
+    }
+
+    # Text search configuration of `listings.search_vector` and of search queries
+    SEARCH_CONFIG = "english"
+    # Fields that make up the search document
+    SEARCH_FIELDS = {"name", "description", "location", "features"}
+
+    EARTH_RADIUS_KM = 6371.0088
+    KM_PER_DEGREE_LATITUDE = 111.045
+
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def list_listings(self, listing_type: Optional[str] = None, owner_id: Optional[int] = None) -> List[Listing]:
-        """List all listings, optionally filtered by type or owner"""
+    async def list_listings(
+        self,
+        listing_type: Optional[str] = None,
+        owner_id: Optional[int] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        location: Optional[str] = None,
+        features: Optional[List[str]] = None,
+        sort: str = "-created_at",
+        after: Optional[str] = None,
+        limit: int = LISTINGS_PAGE_LIMIT,
+    ) -> Tuple[List[Listing], Optional[str]]:
+        """
+        List one page of listings matching the filters, ordered by ``sort``.
+        Returns the page and the cursor of the next one (None on the last page).
+        """
+        column, descending = self.SORTS[sort]
         query = select(Listing).options(
             selectinload(Listing.faculty),
             selectinload(Listing.owner)
         )
-        
+        query = self._filter(query, listing_type, owner_id, min_price, max_price, location, features)
+        query = Keyset.paginate(query, sort, column, Listing.id, descending, after, limit)
+
+        result = await self.db.execute(query)
+        return Keyset.page(result.scalars().all(), sort, limit, key=lambda listing: (getattr(listing, column.key), listing.id))
+
+    async def nearby_listings(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        listing_type: Optional[str] = None,
+        owner_id: Optional[int] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        location: Optional[str] = None,
+        features: Optional[List[str]] = None,
+        after: Optional[str] = None,
+        limit: int = LISTINGS_PAGE_LIMIT,
+    ) -> Tuple[List[Tuple[Listing, float]], Optional[str]]:
+        """
+        One page of the listings within ``radius_km`` of the point, closest first.
+        Returns (listing, distance in km) pairs and the next page's cursor.
+        """
+        distance = self._distance_km(latitude, longitude).label("distance_km")
+        query = select(Listing, distance).options(
+            selectinload(Listing.faculty),
+            selectinload(Listing.owner)
+        )
+        query = self._filter(query, listing_type, owner_id, min_price, max_price, location, features)
+        query = self._within(query, latitude, longitude, radius_km)
+        # Distances only compare for the same point: the cursor is tied to it
+        sort = f"distance:{latitude},{longitude}"
+        query = Keyset.paginate(query, sort, distance, Listing.id, False, after, limit)
+
+        result = await self.db.execute(query)
+        rows, next_cursor = Keyset.page(result.all(), sort, limit, key=lambda row: (row.distance_km, row.Listing.id))
+        return [(row.Listing, row.distance_km) for row in rows], next_cursor
+
+    async def count_listings(
+        self,
+        listing_type: Optional[str] = None,
+        owner_id: Optional[int] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        location: Optional[str] = None,
+        features: Optional[List[str]] = None,
+        near: Optional[Tuple[float, float]] = None,
+        radius_km: Optional[float] = None,
+    ) -> int:
+        """Number of listings matching the filters (a separate, opt-in query: it scans every match)"""
+        query = select(func.count(Listing.id))
+        query = self._filter(query, listing_type, owner_id, min_price, max_price, location, features)
+        if near:
+            query = self._within(query, near[0], near[1], radius_km)
+        return (await self.db.execute(query)).scalar_one()
+
+    async def catalog_version(self) -> Tuple[int, Optional[datetime]]:
+        """
+        Write counter of the catalog (listings, faculty and the owners' cards) and its last change, the ETag
+        validator of `list_listings`. One primary-key read, however large the catalog.
+        """
+        query = select(CatalogVersion.version, CatalogVersion.changed_at).where(CatalogVersion.id == 1)
+        row = (await self.db.execute(query)).one_or_none()
+        return tuple(row) if row else (0, None)
+
+    async def listing_version(self, listing_id: int) -> Tuple[Optional[datetime], int]:
+        """
+        Latest change of a listing, its faculty and its owner (whose card it embeds), and the number of
+        those faculty members: the validator of `get_listing`. The change is None when there is no such listing.
+        """
+        faculty = (
+            select(func.max(Faculty.updated_at).label("changed"), func.count(Faculty.id).label("rows"))
+            .where(Faculty.listing_id == listing_id)
+            .subquery()
+        )
+        query = (
+            select(
+                func.greatest(func.coalesce(Listing.updated_at, Listing.created_at), faculty.c.changed,
+                              User.updated_at),
+                faculty.c.rows,
+            )
+            .join(User, User.id == Listing.owner_id)
+            .where(Listing.id == listing_id)
+        )
+        row = (await self.db.execute(query)).one_or_none()
+        return tuple(row) if row else (None, 0)
+
+    @classmethod
+    def _distance_km(cls, latitude: float, longitude: float):
+        """Great-circle (haversine) distance in km from each listing to the point"""
+        half_dlat = func.radians(Listing.latitude - latitude) * 0.5
+        half_dlng = func.radians(Listing.longitude - longitude) * 0.5
+        a = (
+            func.power(func.sin(half_dlat), 2)
+            + math.cos(math.radians(latitude)) * func.cos(func.radians(Listing.latitude))
+            * func.power(func.sin(half_dlng), 2)
+        )
+        return cast(2 * cls.EARTH_RADIUS_KM * func.asin(func.sqrt(func.least(a, 1.0))), Float)
+
+    @classmethod
+    def _within(cls, query: Select, latitude: float, longitude: float, radius_km: float) -> Select:
+        """Listings within ``radius_km``: a bounding box the (latitude, longitude) index can serve, then the exact distance"""
+        dlat = radius_km / cls.KM_PER_DEGREE_LATITUDE
+        # Longitude degrees shrink towards the poles (boxes crossing the antimeridian aren't handled)
+        dlng = radius_km / (cls.KM_PER_DEGREE_LATITUDE * max(math.cos(math.radians(latitude)), 0.01))
+        return query.where(
+            Listing.latitude.between(latitude - dlat, latitude + dlat),
+            Listing.longitude.between(longitude - dlng, longitude + dlng),
+            cls._distance_km(latitude, longitude) <= radius_km,
+        )
+
+    async def search_listings(
+        self,
+        q: str,
+        listing_type: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        location: Optional[str] = None,
+        features: Optional[List[str]] = None,
+        after: Optional[str] = None,
+        limit: int = LISTINGS_PAGE_LIMIT,
+    ) -> Tuple[List[Tuple[Listing, float]], Optional[str]]:
+        """
+        Ranked search. A listing matches when its search document matches the query words (stemmed,
+        web-search syntax: "quoted phrase", or, -word), or when its name or location is trigram-similar
+        to the query (typos). Returns (listing, rank) pairs, best first, and the next page's cursor.
+        """
+        tsquery = func.websearch_to_tsquery(self._search_config(), q)
+        rank = cast(
+            func.ts_rank_cd(Listing.search_vector, tsquery)
+            + func.greatest(func.similarity(Listing.name, q), func.similarity(func.coalesce(Listing.location, ""), q)),
+            Float,
+        ).label("rank")
+
+        query = select(Listing, rank).options(
+            selectinload(Listing.faculty),
+            selectinload(Listing.owner)
+        ).where(or_(
+            Listing.search_vector.op("@@")(tsquery),
+            Listing.name.op("%")(q),
+            Listing.location.op("%")(q),
+        ))
+        query = self._filter(query, listing_type, None, min_price, max_price, location, features)
+        # Ranks only compare within one query: the cursor is tied to it
+        sort = f"rank:{q}"
+        query = Keyset.paginate(query, sort, rank, Listing.id, True, after, limit)
+
+        result = await self.db.execute(query)
+        rows, next_cursor = Keyset.page(result.all(), sort, limit, key=lambda row: (row.rank, row.Listing.id))
+        return [(row.Listing, row.rank) for row in rows], next_cursor
+
+    @classmethod
+    def search_document(cls, listing: Listing):
+        """The listing's search_vector: name (weight A), location (B), features (C), description (D)"""
+        config = cls._search_config()
+        document = None
+        for text, weight in (
+            (listing.name, "A"),
+            (listing.location, "B"),
+            (" ".join(listing.features or []), "C"),
+            (listing.description, "D"),
+        ):
+            vector = func.setweight(func.to_tsvector(config, text or ""), literal_column(f"'{weight}'"), type_=TSVECTOR)
+            document = vector if document is None else document.op("||", return_type=TSVECTOR)(vector)
+        return document
+
+    @classmethod
+    def _search_config(cls):
+        # Rendered inline: regconfig (like setweight's "char" weight) has no implicit cast from a text parameter
+        return literal_column(f"'{cls.SEARCH_CONFIG}'::regconfig", REGCONFIG)
+
+    @staticmethod
+    def _filter(query: Select, listing_type: Optional[str], owner_id: Optional[int], min_price: Optional[float],
+                max_price: Optional[float], location: Optional[str], features: Optional[List[str]]) -> Select:
         if listing_type:
             query = query.where(Listing.type == listing_type)
         if owner_id:
             query = query.where(Listing.owner_id == owner_id)
-        
-        result = self.db.execute(query)
-        return list(result.scalars().all())
+        if min_price is not None:
+            query = query.where(Listing.price >= min_price)
+        if max_price is not None:
+            query = query.where(Listing.price <= max_price)
+        if location:
+            # Substring match, served by the trigram index on `location`
+            pattern = location.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = query.where(Listing.location.ilike(f"%{pattern}%", escape="\\"))
+        if features:
+            # Listings having every requested feature (`features @> ARRAY[...]`, GIN index)
+            query = query.where(Listing.features.op("@>")(cast(features, ARRAY(String))))
+        return query
 
-    def get_listing(self, listing_id: int) -> Optional[Listing]:
-        """Get a single listing by ID"""
+    async def get_listing(self, listing_id: int, reload: bool = False) -> Optional[Listing]:
+        """Get a single listing by ID (``reload`` refreshes an instance already in the session, e.g. after a write)"""
         query = select(Listing).options(
             selectinload(Listing.faculty),
             selectinload(Listing.owner)
         ).where(Listing.id == listing_id)
-        result = self.db.execute(query)
+        if reload:
+            query = query.execution_options(populate_existing=True)
+        result = await self.db.execute(query)
         return result.scalar_one_or_none()
 
-    def create_listing(self, data: ListingCreate, owner_id: int) -> Listing:
+    async def create_listing(self, data: ListingCreate, owner_id: int) -> Listing:
         """Create a new listing"""
         listing = Listing(
             owner_id=owner_id,
@@ -46,38 +272,72 @@ class ListingService:
             price=data.price,
             location=data.location,
             features=data.features,
+            latitude=data.latitude,
+            longitude=data.longitude,
         )
+        if data.latitude is None or data.longitude is None:
+            listing.latitude, listing.longitude = Geocoders.locate(listing.location)
+        listing.search_vector = self.search_document(listing)
         self.db.add(listing)
-        self.db.commit()
-        self.db.refresh(listing)
-        return listing
+        await self.db.commit()
+        # Re-fetch with relationships: they can't be lazy-loaded once the response is serialized
+        return await self.get_listing(listing.id, reload=True)
 
-    def update_listing(self, listing_id: int, data: ListingUpdate) -> Optional[Listing]:
+    async def update_listing(self, listing_id: int, data: ListingUpdate) -> Optional[Listing]:
         """Update an existing listing"""
-        listing = self.get_listing(listing_id)
+        listing = await self.get_listing(listing_id)
         if not listing:
             return None
 
-        for field, value in data.model_dump(exclude_unset=True).items():
+        changes = data.model_dump(exclude_unset=True)
+        for field, value in changes.items():
             setattr(listing, field, value)
+        if self.SEARCH_FIELDS & changes.keys():
+            listing.search_vector = self.search_document(listing)
+        if "location" in changes and not {"latitude", "longitude"} & changes.keys():
+            # Coordinates of the previous location would be wrong now
+            listing.latitude, listing.longitude = Geocoders.locate(listing.location)
+        if "image_url" in changes:
+            # Resized copies of the previous image
+            listing.image_variants = None
 
-        self.db.commit()
-        self.db.refresh(listing)
-        return listing
+        await self.db.commit()
+        return await self.get_listing(listing_id, reload=True)
+
+    async def set_image(self, listing_id: int, image_url: str, variants: Optional[List[dict]] = None) -> Optional[Listing]:
+        """Replace a listing's image and its resized copies"""
+        listing = await self.get_listing(listing_id)
+        if not listing:
+            return None
 
-    def delete_listing(self, listing_id: int) -> bool:
+        listing.image_url = image_url
+        listing.image_variants = variants
+        await self.db.commit()
+        return await self.get_listing(listing_id, reload=True)
+
+    async def delete_listing(self, listing_id: int) -> bool:
         """Delete a listing"""
-        listing = self.get_listing(listing_id)
+        listing = await self.get_listing(listing_id)
         if not listing:
             return False
 
-        self.db.delete(listing)
-        self.db.commit()
+        await self.db.delete(listing)
+        await self.db.commit()
         return True
 
     # Admin methods
-    def get_all_listings_admin(self) -> List[Dict]:
+    async def get_all_listings_admin(self) -> List[Dict]:
         """Get all listings with booking stats for admin"""
+        # Booking counts come from the daily_metrics rollup rather than from every booking row
+        stats = (
+            select(
+                DailyMetric.listing_id,
+                func.sum(DailyMetric.bookings).label('total_bookings'),
+                func.sum(case((DailyMetric.status == 'pending', DailyMetric.bookings), else_=0)).label('pending_bookings'),
+            )
+            .group_by(DailyMetric.listing_id)
+            .subquery()
+        )
         query = (
             select(
                 Listing.id,
@@ -88,30 +348,17 @@ class ListingService:
                 Listing.created_at,
                 User.email.label('owner_email'),
                 (User.first_name + ' ' + User.last_name).label('owner_name'),
-                func.count(Booking.id).label('total_bookings'),
-                func.sum(
-                    case((Booking.status == 'pending', 1), else_=0)
-                ).label('pending_bookings')
+                func.coalesce(stats.c.total_bookings, 0).label('total_bookings'),
+                func.coalesce(stats.c.pending_bookings, 0).label('pending_bookings'),
             )
             .join(User, Listing.owner_id == User.id)
-            .outerjoin(Booking, Listing.id == Booking.listing_id)
-            .group_by(
-                Listing.id,
-                Listing.name,
-                Listing.type,
-                Listing.price,
-                Listing.location,
-                Listing.created_at,
-                User.email,
-                User.first_name,
-                User.last_name
-            )
+            .outerjoin(stats, stats.c.listing_id == Listing.id)
         )
         
-        result = self.db.execute(query)
+        result = await self.db.execute(query)
         return [dict(row._mapping) for row in result]
 
-    def get_listing_detail_admin(self, listing_id: int) -> Optional[Dict]:
+    async def get_listing_detail_admin(self, listing_id: int) -> Optional[Dict]:
         """Get detailed listing information for admin including all enrolled users"""
         # Get the listing with owner and faculty
         query = (
@@ -124,7 +371,7 @@ class ListingService:
             .where(Listing.id == listing_id)
         )
         
-        result = self.db.execute(query)
+        result = await self.db.execute(query)
         listing = result.scalar_one_or_none()
         
         if not listing:
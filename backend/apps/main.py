@@ -1,9 +1,19 @@
 # apps/main.py
 import logging
-from fastapi import FastAPI
+import secrets
+from fastapi import FastAPI, Header, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from fastapi.staticfiles import StaticFiles
 
+from apps.core.logger import RequestIdMiddleware
+from apps.core.metrics import Metrics, MetricsMiddleware
+from apps.core.query_budget import QueryBudgetMiddleware
+from apps.core.services.email_outbox import EmailOutbox
+from apps.core.services.uploads import UploadLimitMiddleware
+from config.database import UnitOfWorkMiddleware
 from config.routers import RouterManager
+from config.settings import EMAIL_OUTBOX_WORKER, METRICS_TOKEN, UPLOADS_BACKEND, UPLOADS_LOCAL_ROOT, UPLOADS_LOCAL_URL
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("fastapi_app")
@@ -30,6 +40,25 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Upload size limit, enforced while the multipart body streams in
+app.add_middleware(UploadLimitMiddleware)
+
+# One database unit of work per request: shared session, released when the response is sent
+app.add_middleware(UnitOfWorkMiddleware)
+
+# Statements per request against the route's declared query budget; repeated statements (N+1) in development
+app.add_middleware(QueryBudgetMiddleware)
+
+# Latency, status codes and database work per route, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Outermost: every log record of a request carries its id (X-Request-ID)
+app.add_middleware(RequestIdMiddleware)
+
+# Files stored by the local upload backend (development)
+if UPLOADS_BACKEND.endswith(".LocalBackend"):
+    app.mount(UPLOADS_LOCAL_URL, StaticFiles(directory=UPLOADS_LOCAL_ROOT, check_dir=False), name="media")
+
 @app.on_event("startup")
 def startup_event():
     RouterManager(app).import_routers()
@@ -38,6 +67,21 @@ def startup_event():
     app.include_router(analytics_router)
     logger.info("Routers loaded successfully.")
 
+@app.on_event("startup")
+async def start_email_outbox():
+    if EMAIL_OUTBOX_WORKER:
+        EmailOutbox.start()
+
+@app.on_event("shutdown")
+async def stop_email_outbox():
+    await EmailOutbox.stop()
+
 @app.get("/")
 def health():
     return {"status": "ok"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics(authorization: str = Header("")):
+    if METRICS_TOKEN and not secrets.compare_digest(authorization, f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return PlainTextResponse(Metrics.render(), media_type="text/plain; version=0.0.4")
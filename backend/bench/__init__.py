@@ -0,0 +1,20 @@
+"""
+Load tests and benchmarks, run against a local Postgres.
+
+    python -m bench.seed --scale medium --reset        # 10k users, 2k listings, 500k bookings
+    python -m bench.run --duration 60 --save bench/results/baseline.json
+    python -m bench.run --duration 60 --compare bench/results/baseline.json
+
+`bench.seed` bulk-loads a dataset generated from a fixed seed, so two runs of it produce
+the same rows; `bench.run` drives a weighted traffic mix through the ASGI app in-process
+and reports latency percentiles, throughput and database statements per request.
+"""
+
+# Password of every seeded account
+BENCH_PASSWORD = "bench-password"
+
+# Accounts created by `bench.seed`: admin@bench.local, lister1@bench.local, ..., user1@bench.local, ...
+BENCH_EMAIL_DOMAIN = "bench.local"
+
+# Listing type of each lister role
+LISTER_ROLES = {"hostel": "pg", "coaching": "coaching", "library": "library", "tiffin": "tiffin"}
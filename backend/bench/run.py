@@ -0,0 +1,368 @@
+"""
+Drive a weighted traffic mix through the ASGI app and report how it held up.
+
+    python -m bench.run --duration 60 --concurrency 32 --save bench/results/baseline.json
+    python -m bench.run --duration 60 --compare bench/results/baseline.json
+
+The app runs in-process (startup and shutdown handlers included) against the database of
+``DATABASE_URL``, seeded by `bench.seed`; ``--concurrency`` clients send requests back to back
+through an httpx ASGI transport, so the numbers are the app's and the database's, without a
+server or a network in between. Each client draws its scenarios from its own seeded random
+generator, so a run with the same ``--seed`` issues the same requests.
+
+Per scenario the report has the latency percentiles, throughput, errors, and the database
+statements each request ran. ``--save`` writes it as JSON; ``--compare`` diffs the run against
+such a file and exits with status 1 when a scenario got slower or ran more statements than
+``--tolerance`` allows.
+"""
+
+import os
+
+# Nothing leaves the machine during a benchmark
+os.environ.setdefault("EMAIL_OUTBOX_WORKER", "false")
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import platform  # noqa: E402
+import random  # noqa: E402
+import subprocess  # noqa: E402
+import time  # noqa: E402
+from collections import Counter  # noqa: E402
+from datetime import datetime, timezone  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import Any, Callable, Dict, List, Optional, Tuple  # noqa: E402
+
+import httpx  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from apps.accounts.models import User  # noqa: E402
+from apps.bookings.models import Booking, PaymentStatus  # noqa: E402
+from apps.core.query_budget import QueryBudget  # noqa: E402
+from apps.listings.models import Listing  # noqa: E402
+from apps.main import app  # noqa: E402
+from bench import BENCH_EMAIL_DOMAIN, BENCH_PASSWORD, LISTER_ROLES  # noqa: E402
+from config.database import async_engine, get_async_session  # noqa: E402
+
+# Accounts logged in per actor kind
+ACTORS = {"user": 20, "lister": 10, "admin": 1}
+
+# Pending bookings the admin_verify scenario picks from
+VERIFY_POOL = 5_000
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+
+class Pools:
+    """Ids the scenarios pick from, read from the seeded database"""
+
+    def __init__(self, listings: List[int], pending_bookings: List[int]):
+        self.listings = listings
+        self.pending_bookings = pending_bookings
+
+
+# -----------------
+# --- Scenarios ---
+# -----------------
+
+def browse_listings(rng: random.Random, pools: Pools) -> Request:
+    params = {"limit": 20, "sort": rng.choice(["-created_at", "price", "-price"])}
+    if rng.random() < 0.5:
+        params["type"] = rng.choice(sorted(set(LISTER_ROLES.values())))
+    return "GET", "/listings/", {"params": params}
+
+
+def view_listing(rng: random.Random, pools: Pools) -> Request:
+    return "GET", f"/listings/{rng.choice(pools.listings)}", {}
+
+
+def create_booking(rng: random.Random, pools: Pools) -> Request:
+    return "POST", "/bookings/", {"json": {
+        "listing_id": rng.choice(pools.listings),
+        "quantity": rng.randint(1, 3),
+        "payment_id": f"bench_{rng.randrange(10 ** 12):012d}",
+    }}
+
+
+def lister_inbox(rng: random.Random, pools: Pools) -> Request:
+    return "GET", "/bookings/", {"params": {"status": rng.choice(["pending", "accepted"]), "limit": 20}}
+
+
+def admin_verify(rng: random.Random, pools: Pools) -> Request:
+    return "PATCH", f"/bookings/{rng.choice(pools.pending_bookings)}/verify-payment", {
+        "json": {"payment_status": rng.choice(["verified", "verified", "fake"])},
+    }
+
+
+def dashboard(rng: random.Random, pools: Pools) -> Request:
+    return "GET", "/analytics/dashboard", {"params": {"period": rng.choice(["week", "month", "year"])}}
+
+
+# name: (weight, actor, request builder)
+SCENARIOS: Dict[str, Tuple[int, str, Callable[[random.Random, Pools], Request]]] = {
+    "browse_listings": (35, "user", browse_listings),
+    "view_listing": (25, "user", view_listing),
+    "create_booking": (10, "user", create_booking),
+    "lister_inbox": (15, "lister", lister_inbox),
+    "admin_verify": (5, "admin", admin_verify),
+    "dashboard": (10, "admin", dashboard),
+}
+
+
+# ---------------
+# --- Results ---
+# ---------------
+
+def percentile(ordered: List[float], percent: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+class ScenarioResult:
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.queries: List[int] = []
+        self.statuses: Counter = Counter()
+
+    def add(self, seconds: float, queries: int, status: str):
+        self.latencies.append(seconds)
+        self.queries.append(queries)
+        self.statuses[status] += 1
+
+    def extend(self, other: "ScenarioResult"):
+        self.latencies += other.latencies
+        self.queries += other.queries
+        self.statuses.update(other.statuses)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        ordered = sorted(seconds * 1000 for seconds in self.latencies)
+        requests = len(ordered)
+        errors = sum(count for status, count in self.statuses.items() if not status.startswith(("2", "3")))
+        return {
+            "requests": requests,
+            "errors": errors,
+            "throughput": round(requests / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(ordered, 50), 2),
+            "p95_ms": round(percentile(ordered, 95), 2),
+            "p99_ms": round(percentile(ordered, 99), 2),
+            "mean_ms": round(sum(ordered) / requests, 2) if requests else 0.0,
+            "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+            "queries_per_request": round(sum(self.queries) / requests, 2) if requests else 0.0,
+            "max_queries": max(self.queries, default=0),
+            "statuses": dict(sorted(self.statuses.items())),
+        }
+
+
+# --------------
+# --- Runner ---
+# --------------
+
+async def load_pools() -> Tuple[Pools, Dict[str, List[str]], Dict[str, int]]:
+    """Ids to request, emails of the accounts to log in as, and the size of the dataset"""
+    seeded = User.email.like(f"%@{BENCH_EMAIL_DOMAIN}")
+    async with get_async_session() as session:
+        listings = list((await session.execute(select(Listing.id).order_by(Listing.id))).scalars())
+        pending = list((await session.execute(
+            select(Booking.id).where(Booking.payment_status == PaymentStatus.pending).order_by(Booking.id)
+            .limit(VERIFY_POOL)
+        )).scalars())
+        emails = {}
+        for actor, condition in (("user", User.role == "user"), ("lister", User.role.in_(LISTER_ROLES)),
+                                 ("admin", User.role == "admin")):
+            emails[actor] = list((await session.execute(
+                select(User.email).where(seeded, condition).order_by(User.id).limit(ACTORS[actor])
+            )).scalars())
+        dataset = {}
+        for name, model in (("users", User), ("listings", Listing), ("bookings", Booking)):
+            dataset[name] = (await session.execute(select(func.count()).select_from(model))).scalar_one()
+    return Pools(listings, pending), emails, dataset
+
+
+async def log_in(client: httpx.AsyncClient, emails: Dict[str, List[str]]) -> Dict[str, List[Dict[str, str]]]:
+    """Authorization headers of every actor, by kind"""
+    headers = {}
+    for actor, addresses in emails.items():
+        headers[actor] = []
+        for email in addresses:
+            response = await client.post("/accounts/login", data={"username": email, "password": BENCH_PASSWORD})
+            response.raise_for_status()
+            headers[actor].append({"Authorization": f"Bearer {response.json()['access_token']}"})
+    return headers
+
+
+async def client_loop(client: httpx.AsyncClient, rng: random.Random, pools: Pools,
+                      headers: Dict[str, List[Dict[str, str]]], scenarios: Dict[str, tuple],
+                      measure_from: float, deadline: float) -> Dict[str, ScenarioResult]:
+    """One client: requests back to back until ``deadline``, recorded from ``measure_from`` on"""
+    names = list(scenarios)
+    weights = [scenarios[name][0] for name in names]
+    results = {name: ScenarioResult() for name in names}
+
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        _, actor, build = scenarios[name]
+        method, url, kwargs = build(rng, pools)
+        # mode="off": only counts the statements the request runs
+        with QueryBudget(0, name, mode="off") as counter:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, headers=rng.choice(headers[actor]), **kwargs)
+                status = str(response.status_code)
+            except Exception as exc:  # the app raised instead of answering
+                status = type(exc).__name__
+            elapsed = time.perf_counter() - started
+        if started >= measure_from:
+            results[name].add(elapsed, counter.count, status)
+    return results
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    pools, emails, dataset = await load_pools()
+    if not pools.listings or not all(emails.values()):
+        raise SystemExit("The database has no benchmark dataset; seed it first with python -m bench.seed.")
+
+    scenarios = {name: scenario for name, scenario in SCENARIOS.items() if name not in args.skip}
+    if not pools.pending_bookings:
+        scenarios.pop("admin_verify", None)
+
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            headers = await log_in(client, emails)
+            started = time.perf_counter()
+            measure_from = started + args.warmup
+            deadline = measure_from + args.duration
+            per_client = await asyncio.gather(*(
+                client_loop(client, random.Random(f"{args.seed}:{index}"), pools, headers, scenarios,
+                            measure_from, deadline)
+                for index in range(args.concurrency)
+            ))
+            elapsed = time.perf_counter() - measure_from
+    finally:
+        await app.router.shutdown()
+        await async_engine.dispose()
+
+    combined = {name: ScenarioResult() for name in scenarios}
+    overall = ScenarioResult()
+    for results in per_client:
+        for name, result in results.items():
+            combined[name].extend(result)
+            overall.extend(result)
+
+    return {
+        "meta": {
+            "commit": git_revision(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "seed": args.seed,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "dataset": dataset,
+        },
+        "overall": overall.summary(elapsed),
+        "scenarios": {name: result.summary(elapsed) for name, result in combined.items()},
+    }
+
+
+def git_revision() -> Optional[str]:
+    """Current commit, with ``-dirty`` when the tree has uncommitted changes"""
+    repository = Path(__file__).parent
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repository, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=repository,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+# -----------------
+# --- Reporting ---
+# -----------------
+
+COLUMNS = [("requests", "requests"), ("errors", "errors"), ("throughput", "req/s"), ("p50_ms", "p50 ms"),
+           ("p95_ms", "p95 ms"), ("p99_ms", "p99 ms"), ("queries_per_request", "queries/req")]
+
+
+def print_report(report: Dict[str, Any]):
+    meta = report["meta"]
+    dataset = ", ".join(f"{count} {name}" for name, count in meta["dataset"].items())
+    print(f"\ncommit {meta['commit']}  |  {dataset}  |  {meta['concurrency']} clients, {meta['duration']}s\n")
+    print(f"{'scenario':<18}" + "".join(f"{title:>13}" for _, title in COLUMNS))
+    rows = [*report["scenarios"].items(), ("overall", report["overall"])]
+    for name, summary in rows:
+        print(f"{name:<18}" + "".join(f"{summary[key]:>13}" for key, _ in COLUMNS))
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print the run next to ``baseline``; returns the regressions beyond ``tolerance`` (a fraction)"""
+    regressions = []
+    print(f"\ncompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('date')})\n")
+    print(f"{'scenario':<18}{'p50 ms':>22}{'p95 ms':>22}{'queries/req':>22}{'req/s':>22}")
+
+    rows = [*report["scenarios"].items(), ("overall", report["overall"])]
+    for name, summary in rows:
+        before = baseline["overall"] if name == "overall" else baseline["scenarios"].get(name)
+        if before is None:
+            print(f"{name:<18}{'(not in baseline)':>22}")
+            continue
+
+        cells = []
+        for key, higher_is_worse in (("p50_ms", True), ("p95_ms", True), ("queries_per_request", True),
+                                     ("throughput", False)):
+            old, new = before[key], summary[key]
+            change = (new - old) / old if old else 0.0
+            cells.append(f"{old:>8} → {new:<8}{change:>+5.0%}")
+            worse = change > tolerance if higher_is_worse else change < -tolerance
+            # Throughput is only comparable for the whole mix, per scenario it follows the weights
+            if worse and not (key == "throughput" and name != "overall"):
+                regressions.append(f"{name}: {key} {old} → {new} ({change:+.0%})")
+        print(f"{name:<18}" + "".join(f"{cell:>22}" for cell in cells))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API with a weighted traffic mix.")
+    parser.add_argument("--duration", type=float, default=30, help="seconds measured (default: 30)")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds run before measuring (default: 5)")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients (default: 16)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed of the clients (default: 1)")
+    parser.add_argument("--skip", action="append", default=[], choices=SCENARIOS, metavar="SCENARIO",
+                        help=f"leave a scenario out of the mix (one of: {', '.join(SCENARIOS)})")
+    parser.add_argument("--save", type=Path, help="write the report to this JSON file")
+    parser.add_argument("--compare", type=Path, help="JSON report of an earlier run to diff against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="regression threshold for --compare, as a fraction (default: 0.2)")
+    args = parser.parse_args()
+    if args.concurrency < 1 or args.duration <= 0 or args.warmup < 0:
+        parser.error("--concurrency and --duration must be positive, --warmup not negative")
+
+    # httpx logs every request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nSaved to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            raise SystemExit(1)
+        print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Seed the database of ``DATABASE_URL`` with a reproducible benchmark dataset.
+
+    python -m bench.seed --scale medium --reset
+    python -m bench.seed --users 10000 --listings 2000 --bookings 500000 --reset --seed 7
+
+Every row is derived from ``--seed`` (Faker for names and text, `random.Random` for the rest,
+dates relative to today), so two runs with the same arguments load the same data. Rows are
+streamed in chunks with COPY; search vectors, sequences, the analytics rollups, planner
+statistics and visibility maps (VACUUM ANALYZE, as autovacuum would leave them) are brought
+up to date afterwards.
+
+Accounts (see `bench.BENCH_EMAIL_DOMAIN`, all with `bench.BENCH_PASSWORD`): one admin, one
+lister per ``LISTINGS_PER_LISTER`` listings, and regular users making the bookings. Every account
+has its verification row, as registering leaves one, and coaching listings have faculty.
+
+``--reset`` truncates the tables first; it refuses to run against a non-local host unless
+``--force`` is given too.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Iterator, List, Tuple
+
+from faker import Faker
+
+import apps.faculty.models  # noqa: F401  (configures the Listing.faculty relationship)
+from apps.accounts.services.password import PasswordManager
+from apps.core.rollups import MetricsRollup
+from apps.listings.services import ListingService
+from bench import BENCH_EMAIL_DOMAIN, BENCH_PASSWORD, LISTER_ROLES
+from config.database import async_engine, get_async_session
+
+# users, listings, bookings
+SCALES = {
+    "small": (1_000, 200, 20_000),
+    "medium": (10_000, 2_000, 500_000),
+    "large": (50_000, 10_000, 5_000_000),
+}
+
+LISTINGS_PER_LISTER = 5
+CHUNK_SIZE = 50_000
+LOCAL_HOSTS = {None, "", "localhost", "127.0.0.1", "::1"}
+
+# Tables emptied by --reset (CASCADE takes the rows referencing them too)
+TABLES = ["bookings", "faculty", "listings", "users_verifications", "users", "daily_metrics", "daily_signups",
+          "email_outbox"]
+
+USER_COLUMNS = ["id", "email", "password", "first_name", "last_name", "phone_number", "city", "state",
+                "is_verified_email", "is_active", "is_superuser", "role", "is_approved_lister", "token_version",
+                "date_joined"]
+LISTING_COLUMNS = ["id", "owner_id", "type", "name", "description", "price", "location", "latitude", "longitude",
+                   "features", "created_at"]
+VERIFICATION_COLUMNS = ["id", "user_id", "created_at"]
+FACULTY_COLUMNS = ["id", "listing_id", "name", "subject"]
+BOOKING_COLUMNS = ["id", "listing_id", "user_id", "status", "amount", "quantity", "payment_id", "payment_verified",
+                   "payment_status", "payment_verified_at", "created_at"]
+
+PRICES = {"pg": (4_000, 15_000), "coaching": (5_000, 60_000), "library": (500, 2_500), "tiffin": (1_500, 4_500)}
+FEATURES = {
+    "pg": ["wifi", "ac", "laundry", "meals", "parking", "cctv", "power backup", "attached bathroom"],
+    "coaching": ["jee", "neet", "upsc", "doubt sessions", "test series", "study material", "online classes"],
+    "library": ["wifi", "ac", "lockers", "24x7", "silent zone", "charging points", "water cooler"],
+    "tiffin": ["veg", "non-veg", "jain", "home style", "monthly plan", "delivery"],
+}
+
+SUBJECTS = ["Physics", "Chemistry", "Mathematics", "Biology", "English", "General Studies", "Reasoning", "History"]
+FACULTY_PER_COACHING_LISTING = (1, 4)
+
+# (status, payment status, weight)
+BOOKING_STATES = [
+    ("pending", "pending", 30),
+    ("accepted", "verified", 45),
+    ("rejected", "fake", 5),
+    ("rejected", "pending", 5),
+    ("waitlist", "pending", 5),
+    ("cancelled", "verified", 10),
+]
+
+# India, roughly
+LATITUDES = (8.0, 32.0)
+LONGITUDES = (68.0, 89.0)
+
+
+class BenchDataset:
+    """Generates the rows of one dataset; the same seed and sizes always give the same rows."""
+
+    def __init__(self, users: int, listings: int, bookings: int, seed: int):
+        self.users = users
+        self.listings = listings
+        self.bookings = bookings
+        self.seed = seed
+        self.listers = max(1, -(-listings // LISTINGS_PER_LISTER))
+        self.faker = Faker("en_IN")
+        self.faker.seed_instance(seed)
+        self.today = datetime.combine(date.today(), datetime.min.time())
+        # (type, price) of listing id n at index n - 1, for the bookings
+        self._listings: List[Tuple[str, Decimal]] = []
+
+    def _ago(self, rng: random.Random, max_days: int) -> datetime:
+        return self.today - timedelta(days=rng.randrange(max_days), seconds=rng.randrange(86_400))
+
+    def user_rows(self, password: str) -> Iterator[tuple]:
+        """Admin (id 1), then listers (ids 2 .. listers + 1), then regular users"""
+        rng = random.Random(f"{self.seed}:users")
+        roles = list(LISTER_ROLES)
+        accounts = [("admin", "admin")]
+        accounts += [(f"lister{n}", roles[(n - 1) % len(roles)]) for n in range(1, self.listers + 1)]
+        accounts += [(f"user{n}", "user") for n in range(1, self.users + 1)]
+
+        for user_id, (name, role) in enumerate(accounts, start=1):
+            yield (
+                user_id, f"{name}@{BENCH_EMAIL_DOMAIN}", password, self.faker.first_name(), self.faker.last_name(),
+                f"9{rng.randrange(10 ** 9):09d}", self.faker.city(), self.faker.state(),
+                True, True, role == "admin", role, role in LISTER_ROLES, 0, self._ago(rng, 730),
+            )
+
+    def verification_rows(self) -> Iterator[tuple]:
+        """One per account (ids 1 .. admin + listers + users)"""
+        rng = random.Random(f"{self.seed}:verifications")
+        for user_id in range(1, self.users + self.listers + 2):
+            yield user_id, user_id, self._ago(rng, 730)
+
+    def listing_rows(self) -> Iterator[tuple]:
+        rng = random.Random(f"{self.seed}:listings")
+        roles = list(LISTER_ROLES)
+        for listing_id in range(1, self.listings + 1):
+            lister = (listing_id - 1) % self.listers + 1
+            listing_type = LISTER_ROLES[roles[(lister - 1) % len(roles)]]
+            low, high = PRICES[listing_type]
+            price = Decimal(rng.randrange(low, high, 50))
+            self._listings.append((listing_type, price))
+            yield (
+                listing_id, lister + 1, listing_type, f"{self.faker.company()} {listing_type.title()}",
+                self.faker.paragraph(nb_sentences=5), price, f"{self.faker.street_name()}, {self.faker.city()}",
+                round(rng.uniform(*LATITUDES), 6), round(rng.uniform(*LONGITUDES), 6),
+                rng.sample(FEATURES[listing_type], rng.randint(1, 4)), self._ago(rng, 365),
+            )
+
+    def faculty_rows(self) -> Iterator[tuple]:
+        """Requires `listing_rows` to have been consumed"""
+        rng = random.Random(f"{self.seed}:faculty")
+        faculty_id = 0
+        for listing_id, (listing_type, _) in enumerate(self._listings, start=1):
+            if listing_type != "coaching":
+                continue
+            for _ in range(rng.randint(*FACULTY_PER_COACHING_LISTING)):
+                faculty_id += 1
+                yield faculty_id, listing_id, self.faker.name(), rng.choice(SUBJECTS)
+
+    def booking_chunks(self) -> Iterator[List[tuple]]:
+        """Requires `listing_rows` to have been consumed"""
+        rng = random.Random(f"{self.seed}:bookings")
+        states = [state[:2] for state in BOOKING_STATES]
+        weights = [state[2] for state in BOOKING_STATES]
+        first_user = self.listers + 2
+        chunk = []
+        for booking_id in range(1, self.bookings + 1):
+            listing_id = rng.randrange(len(self._listings)) + 1
+            quantity = rng.choice((1, 1, 1, 2, 3))
+            status, payment_status = rng.choices(states, weights)[0]
+            created_at = self._ago(rng, 365)
+            verified = payment_status == "verified"
+            chunk.append((
+                booking_id, listing_id, first_user + rng.randrange(self.users), status,
+                self._listings[listing_id - 1][1] * quantity, quantity,
+                f"pay_{booking_id:010d}" if rng.random() < 0.8 else None, verified, payment_status,
+                created_at + timedelta(hours=rng.randint(1, 48)) if verified else None, created_at,
+            ))
+            if len(chunk) == CHUNK_SIZE:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+async def seed(dataset: BenchDataset, reset: bool, force: bool):
+    host = async_engine.url.host
+    if reset and host not in LOCAL_HOSTS and not force:
+        raise SystemExit(f"Refusing to truncate the tables on {host}; pass --force to do it anyway.")
+
+    started = time.perf_counter()
+    async with async_engine.connect() as connection:
+        # COPY straight through asyncpg; every statement autocommits
+        raw = (await connection.get_raw_connection()).driver_connection
+
+        if reset:
+            await raw.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+        elif await raw.fetchval("SELECT EXISTS (SELECT 1 FROM users)"):
+            raise SystemExit("The users table is not empty; pass --reset to replace its contents.")
+
+        password = PasswordManager.hash_password(BENCH_PASSWORD)
+        await raw.copy_records_to_table("users", records=list(dataset.user_rows(password)), columns=USER_COLUMNS)
+        await raw.copy_records_to_table("users_verifications", records=list(dataset.verification_rows()),
+                                        columns=VERIFICATION_COLUMNS)
+        await raw.copy_records_to_table("listings", records=list(dataset.listing_rows()), columns=LISTING_COLUMNS)
+        faculty = list(dataset.faculty_rows())
+        await raw.copy_records_to_table("faculty", records=faculty, columns=FACULTY_COLUMNS)
+        print(f"users: {dataset.users + dataset.listers + 1}, listings: {dataset.listings}, faculty: {len(faculty)}")
+
+        loaded = 0
+        for chunk in dataset.booking_chunks():
+            await raw.copy_records_to_table("bookings", records=chunk, columns=BOOKING_COLUMNS)
+            loaded += len(chunk)
+            print(f"bookings: {loaded}/{dataset.bookings}", end="\r", flush=True)
+        print()
+
+        # Same document as ListingService.search_document, computed in bulk
+        config = f"'{ListingService.SEARCH_CONFIG}'::regconfig"
+        await raw.execute(f"""
+            UPDATE listings SET search_vector =
+                setweight(to_tsvector({config}, coalesce(name, '')), 'A')
+                || setweight(to_tsvector({config}, coalesce(location, '')), 'B')
+                || setweight(to_tsvector({config}, coalesce(array_to_string(features, ' '), '')), 'C')
+                || setweight(to_tsvector({config}, coalesce(description, '')), 'D')
+        """)
+        for table in ("users", "users_verifications", "listings", "faculty", "bookings"):
+            await raw.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT coalesce(max(id), 1) FROM {table}))"
+            )
+
+    async with get_async_session() as session:
+        await MetricsRollup.rebuild(session)
+    async with async_engine.connect() as connection:
+        await (await connection.get_raw_connection()).driver_connection.execute("VACUUM ANALYZE")
+    await async_engine.dispose()
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the database with a reproducible benchmark dataset.")
+    parser.add_argument("--scale", choices=SCALES, default="small", help="preset sizes (default: small)")
+    parser.add_argument("--users", type=int, help="regular users (overrides --scale)")
+    parser.add_argument("--listings", type=int, help="listings (overrides --scale)")
+    parser.add_argument("--bookings", type=int, help="bookings (overrides --scale)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default: 1)")
+    parser.add_argument("--reset", action="store_true", help="truncate the tables first")
+    parser.add_argument("--force", action="store_true", help="allow --reset on a non-local database")
+    args = parser.parse_args()
+
+    users, listings, bookings = SCALES[args.scale]
+    dataset = BenchDataset(
+        users=args.users if args.users is not None else users,
+        listings=args.listings if args.listings is not None else listings,
+        bookings=args.bookings if args.bookings is not None else bookings,
+        seed=args.seed,
+    )
+    if min(dataset.users, dataset.listings) < 1 or dataset.bookings < 0:
+        parser.error("--users and --listings must be at least 1, --bookings at least 0")
+    asyncio.run(seed(dataset, args.reset, args.force))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,50 @@
 # config/database.py
 import os
-from contextlib import contextmanager
-from typing import Any
+import threading
+import time
+import traceback
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Optional
 
 from fastapi import HTTPException, status
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, select, update
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base, scoped_session, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+
+from apps.core.logger import log
+from apps.core.metrics import Gauge, Metrics
+from apps.core.query_budget import record_statement
+from apps.core.query_stats import QueryStats
+from config.settings import ASYNC_DATABASE_URL, DATABASE_URL, DB_SESSION_DEBUG
+
+# -----------------------------------------
+# Pools
+# -----------------------------------------
+class TimedCheckout:
+    """Pool mixin recording how long each checkout waited for a connection (``/metrics``)."""
+
+    metrics_name = ""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            Metrics.record_checkout(self.metrics_name, time.perf_counter() - started)
+
+
+class TimedQueuePool(TimedCheckout, QueuePool):
+    metrics_name = "sync"
+
+
+class TimedAsyncQueuePool(TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_name = "async"
 
-from config.settings import DATABASE_URL
 
 # -----------------------------------------
 # Engine + Session
@@ -16,6 +53,7 @@ from config.settings import DATABASE_URL
 # If you're using Neon with sslmode=require, include that in the URL in settings.
 engine = create_engine(
     DATABASE_URL,
+    poolclass=TimedQueuePool,
     pool_pre_ping=True,  # Verify connections before using - CRITICAL for Neon
     pool_recycle=60,  # Recycle connections after 1 minute (Neon closes idle connections)
     pool_size=5,  # Smaller pool size for serverless databases
@@ -30,18 +68,236 @@ engine = create_engine(
     echo=False,  # Set to True for SQL debugging
 )
 
-# Use scoped_session so short-lived sessions returned by helpers won't leak easily.
-SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+# -----------------------------------------
+# Request scope (unit of work)
+# -----------------------------------------
+# Set by `UnitOfWorkMiddleware` for the duration of a request. Every session asked for while it is set
+# (BaseModel helpers, services, UserManager / TokenService) is the request's session, so a request holds
+# at most one pooled connection per engine and gives it back as soon as the response has been sent.
+_unit_of_work: ContextVar[Optional["UnitOfWork"]] = ContextVar("unit_of_work", default=None)
+
+
+def _session_scope() -> Any:
+    """Scope of `SessionLocal`: the current request, or the current thread outside of requests."""
+    unit_of_work = _unit_of_work.get()
+    return unit_of_work if unit_of_work is not None else threading.get_ident()
+
+
+# scoped_session keyed by request: helpers called during a request share one session, closed with the request.
+SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine), scopefunc=_session_scope)
 
 
 @contextmanager
 def get_session() -> Session:
-    """Context manager to yield a DB session and ensure cleanup."""
+    """Context manager to yield a DB session and ensure cleanup (the request's session is closed with the request)."""
     session = SessionLocal()
     try:
         yield session
     finally:
-        session.close()
+        if _unit_of_work.get() is None:
+            session.close()
+
+
+# -----------------------------------------
+# Async engine + Session (asyncpg)
+# -----------------------------------------
+# Used by the request handlers so concurrent requests overlap their DB round trips instead of
+# blocking the event loop. The sync engine above stays for Alembic, scripts and sync services.
+
+# Query parameters asyncpg accepts; libpq-only ones (channel_binding, keepalives, ...) are dropped
+ASYNCPG_QUERY_PARAMS = {"ssl", "prepared_statement_cache_size"}
+
+
+def async_database_url(url: str) -> URL:
+    """
+    Convert a libpq style URL (postgresql://...?sslmode=require&channel_binding=require) to its
+    asyncpg equivalent (postgresql+asyncpg://...?ssl=require).
+    """
+    url = make_url(url)
+    query = dict(url.query)
+    if "sslmode" in query:
+        query.setdefault("ssl", query["sslmode"])
+    query = {key: value for key, value in query.items() if key in ASYNCPG_QUERY_PARAMS}
+    return url.set(drivername="postgresql+asyncpg", query=query)
+
+
+async_engine = create_async_engine(
+    async_database_url(ASYNC_DATABASE_URL or DATABASE_URL),
+    poolclass=TimedAsyncQueuePool,
+    pool_pre_ping=True,
+    pool_recycle=60,
+    pool_size=5,
+    max_overflow=10,
+    connect_args={"timeout": 10},  # Connection timeout in seconds
+    echo=False,
+)
+
+# expire_on_commit=False: attributes stay readable after commit without an implicit (sync) reload
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+
+# -----------------------------------------
+# Metrics
+# -----------------------------------------
+# Statement count and time per route (apps/core/metrics.py) and per statement fingerprint, with the
+# slow-query log (apps/core/query_stats.py), and query budgets (apps/core/query_budget.py), for both engines
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    context.metrics_started = time.perf_counter()
+
+
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.metrics_started
+    Metrics.record_query(elapsed)
+    QueryStats.record(statement, parameters, elapsed, executemany)
+    record_statement(statement)
+
+
+for _engine in (engine, async_engine.sync_engine):
+    event.listen(_engine, "before_cursor_execute", _query_started)
+    event.listen(_engine, "after_cursor_execute", _query_finished)
+
+
+def _pool_connections():
+    connections = {}
+    for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        connections[(name, "checked_out")] = pool.checkedout()
+        connections[(name, "idle")] = pool.checkedin()
+    return connections
+
+
+Gauge("db_pool_connections", "Pooled database connections by state.", ("pool", "state"), collect=_pool_connections)
+
+
+@asynccontextmanager
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """
+    Async context manager to yield a DB session and ensure cleanup.
+    During a request this is the request's session (closed by `UnitOfWorkMiddleware`), otherwise a
+    short-lived session closed on exit.
+    """
+    unit_of_work = _unit_of_work.get()
+    if unit_of_work is not None:
+        yield unit_of_work.session
+        return
+
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+# -----------------------------------------
+# Unit of work
+# -----------------------------------------
+# DB_SESSION_DEBUG: session -> (unit of work, stack) for every session currently holding a connection
+_open_sessions: "weakref.WeakKeyDictionary[Session, tuple]" = weakref.WeakKeyDictionary()
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _application_stack() -> str:
+    """The current call stack, limited to the project's own frames."""
+    frames = [frame for frame in traceback.extract_stack()
+              if frame.filename.startswith(PROJECT_DIR) and frame.filename != __file__
+              and "site-packages" not in frame.filename]
+    return "".join(traceback.format_list(frames))
+
+
+@event.listens_for(Session, "after_begin")
+def _track_session(session: Session, transaction, connection):
+    if DB_SESSION_DEBUG:
+        _open_sessions[session] = (_unit_of_work.get(), _application_stack())
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _untrack_session(session: Session, transaction):
+    if DB_SESSION_DEBUG and transaction.parent is None:
+        _open_sessions.pop(session, None)
+
+
+class UnitOfWork:
+    """
+    The database sessions of one request.
+
+    The async session is created on first use and only checks out a connection when it runs a
+    statement; the sync `SessionLocal` session is scoped to the unit of work as well. Writes made
+    through the `BaseModel` async helpers are only flushed; `commit` is called by the middleware once
+    the request has succeeded. Both sessions are closed (rolling back anything left uncommitted) by `close`.
+    """
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self._session: AsyncSession | None = None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = AsyncSessionLocal()
+        return self._session
+
+    async def commit(self):
+        """Commit the async session's open transaction, if any."""
+        if self._session is not None and self._session.in_transaction():
+            await self._session.commit()
+
+    async def close(self):
+        """Release the request's connections. Must run while this unit of work is the current one."""
+        if DB_SESSION_DEBUG:
+            self.report_leaks()
+
+        if self._session is not None:
+            await self._session.close()
+
+        if SessionLocal.registry.has():
+            session = SessionLocal()
+            SessionLocal.registry.clear()
+            await run_in_threadpool(session.close)
+
+    def report_leaks(self):
+        """Log sessions opened during this request, outside of it, that still hold a connection."""
+        own = set()
+        if self._session is not None:
+            own.add(self._session.sync_session)
+        if SessionLocal.registry.has():
+            own.add(SessionLocal())
+
+        for session, (unit_of_work, stack) in list(_open_sessions.items()):
+            if unit_of_work is self and session not in own:
+                log.warn("Leaked database session", category="DB", path=self.path, opened_at=stack)
+
+
+class UnitOfWorkMiddleware:
+    """
+    Pure ASGI middleware giving each HTTP request its own `UnitOfWork`.
+
+    A successful response (status below 400) commits the unit of work before its headers are sent,
+    so a failed commit still turns into an error response; error responses and exceptions leave it
+    uncommitted. The sessions are closed after the response (and its background tasks) have been sent,
+    so every pooled connection a request used is back in the pool before the next one needs it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        unit_of_work = UnitOfWork(scope.get("path", ""))
+        token = _unit_of_work.set(unit_of_work)
+
+        async def send_committed(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                await unit_of_work.commit()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_committed)
+        finally:
+            try:
+                await unit_of_work.close()
+            finally:
+                _unit_of_work.reset(token)
 
 
 # -----------------------------------------
@@ -84,12 +340,9 @@ class BaseModel:
         """
         Return a Query object filtered by given SQLAlchemy criteria.
         Note: caller should call .first(), .all(), .count(), etc.
-        This returns a query bound to a session - the session must remain open while using the query.
-        We intentionally return a Query from a new session (not closed) to preserve existing code semantics
-        like `User.filter(...).first()` used in your code.
+        During a request the query is bound to the request's session, which is closed when the request
+        ends. Outside of a request it uses the thread's session: call `SessionLocal.remove()` when done.
         """
-        # IMPORTANT: this opens a session that will NOT be closed here because the returned Query relies on it.
-        # Callers should complete the Query (first/all) immediately so it executes; session will later be GC'ed/closed.
         db = SessionLocal()
         return db.query(cls).filter(*criteria)
 
@@ -117,6 +370,71 @@ class BaseModel:
             db.commit()
             return True
 
+    # ---------------------
+    # --- Async helpers ---
+    # ---------------------
+    # Same semantics as above on an AsyncSession. `afirst` / `aall` replace `filter(...).first()` /
+    # `filter(...).all()` and close their session once the rows are loaded. During a request the
+    # writes are flushed to the request's session and committed with it by `UnitOfWorkMiddleware`.
+
+    @staticmethod
+    async def _apersist(db: AsyncSession):
+        if _unit_of_work.get() is not None:
+            await db.flush()
+        else:
+            await db.commit()
+
+    @classmethod
+    async def acreate(cls, **kwargs) -> Any:
+        async with get_async_session() as db:
+            obj = cls(**kwargs)
+            db.add(obj)
+            await cls._apersist(db)
+            await db.refresh(obj)
+            return obj
+
+    @classmethod
+    async def aget(cls, pk: int) -> Any | None:
+        async with get_async_session() as db:
+            return await db.get(cls, pk)
+
+    @classmethod
+    async def aget_or_404(cls, pk: int) -> Any:
+        obj = await cls.aget(pk)
+        if obj is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{cls.__name__} not found.")
+        return obj
+
+    @classmethod
+    async def afirst(cls, *criteria) -> Any | None:
+        async with get_async_session() as db:
+            return (await db.execute(select(cls).where(*criteria).limit(1))).scalars().first()
+
+    @classmethod
+    async def aall(cls, *criteria) -> list:
+        async with get_async_session() as db:
+            return list((await db.execute(select(cls).where(*criteria))).scalars().all())
+
+    @classmethod
+    async def aupdate(cls, pk: int, **kwargs) -> Any | None:
+        async with get_async_session() as db:
+            result = await db.execute(update(cls).where(cls.id == pk).values(**kwargs))
+            if not result.rowcount:
+                return None
+            await cls._apersist(db)
+            # The UPDATE bypassed the identity map: reload the instance it may already hold
+            return await db.get(cls, pk, populate_existing=True)
+
+    @classmethod
+    async def adelete(cls, pk: int) -> bool:
+        async with get_async_session() as db:
+            obj = await db.get(cls, pk)
+            if not obj:
+                return False
+            await db.delete(obj)
+            await cls._apersist(db)
+            return True
+
 
 # Create the declarative base using our mixin so all models inherit helpers.
 Base = declarative_base(cls=BaseModel)
@@ -155,3 +473,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Async dependency for FastAPI routes (the request's session)
+async def get_async_db():
+    async with get_async_session() as db:
+        yield db
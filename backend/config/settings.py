@@ -91,6 +91,12 @@ if not DATABASE_URL:
         "Set it in Render environment variables."
     )
 
+# Optional: URL for the asyncpg engine. Defaults to DATABASE_URL converted for asyncpg
+# (sslmode -> ssl, libpq-only parameters such as channel_binding dropped).
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+# Log sessions that are still holding a connection when their request ends (with the stack that opened them).
+DB_SESSION_DEBUG = os.getenv("DB_SESSION_DEBUG", "false").lower() == "true"
+
 
 # -------------------------------------------------
 # Cloudinary (Optional but Recommended)
@@ -100,10 +106,152 @@ CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY")
 CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
 
 
+# -------------------------------------------------
+# Uploads
+# -------------------------------------------------
+# Image storage used by apps/core/services/uploads.py: dotted path of an UploadBackend.
+# LocalBackend writes files under UPLOADS_LOCAL_ROOT, served at UPLOADS_LOCAL_URL (development / tests).
+UPLOADS_BACKEND = os.getenv("UPLOADS_BACKEND") or "apps.core.services.uploads.CloudinaryBackend"
+UPLOADS_LOCAL_ROOT = os.getenv("UPLOADS_LOCAL_ROOT") or str(BASE_DIR / "media")
+UPLOADS_LOCAL_URL = os.getenv("UPLOADS_LOCAL_URL") or "/media"
+# Threads running the (blocking) backend calls; uploads beyond this wait their turn
+UPLOADS_WORKERS = int(os.getenv("UPLOADS_WORKERS") or 4)
+# Widths (px) of the WebP / AVIF copies made of listing, faculty and profile images
+IMAGE_DERIVATIVE_WIDTHS = [int(w) for w in (os.getenv("IMAGE_DERIVATIVE_WIDTHS") or "320,640,1024").split(",")]
+IMAGE_DERIVATIVE_QUALITY = int(os.getenv("IMAGE_DERIVATIVE_QUALITY") or 80)
+
+
+# -------------------------------------------------
+# Logging (apps/core/logger.py)
+# -------------------------------------------------
+# ENABLE_LOGS=false only lets errors through; LOG_LEVEL overrides the default level either way.
+ENABLE_LOGS = os.getenv("ENABLE_LOGS", "false").lower() == "true"
+LOG_LEVEL = (os.getenv("LOG_LEVEL") or ("DEBUG" if ENABLE_LOGS else "ERROR")).upper()
+# "text" (one line per record) or "json" (one object per line, for log collectors)
+LOG_FORMAT = (os.getenv("LOG_FORMAT") or "text").lower()
+# Per category overrides, e.g. "API=WARNING,DB=DEBUG" (categories: APP, LIFECYCLE, API, DB, SERVICE, AUTH, VALIDATION)
+LOG_LEVELS = dict(
+    item.split("=", 1) for item in (os.getenv("LOG_LEVELS") or "").replace(" ", "").split(",") if "=" in item
+)
+# Fraction of INFO / DEBUG records kept per category, e.g. "API=0.1,DB=0.01"; warnings and errors are always kept
+LOG_SAMPLE_RATES = {
+    category: float(rate) for category, rate in (
+        item.split("=", 1) for item in (os.getenv("LOG_SAMPLE_RATES") or "").replace(" ", "").split(",") if "=" in item
+    )
+}
+# Records waiting for the writer thread; beyond this they are dropped rather than block a request
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE") or 10000)
+
+
+# -------------------------------------------------
+# Metrics (apps/core/metrics.py)
+# -------------------------------------------------
+# Optional: when set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+# Statements taking at least this long are logged as slow queries (apps/core/query_stats.py)
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS") or 200)
+# Distinct statement fingerprints kept for GET /analytics/queries; least recently seen are dropped
+QUERY_STATS_MAX_ENTRIES = int(os.getenv("QUERY_STATS_MAX_ENTRIES") or 500)
+# Routes running more statements than their declared budget (apps/core/query_budget.py): "warn" logs them,
+# "raise" fails the request (tests, development), "off" stops counting
+QUERY_BUDGETS = (os.getenv("QUERY_BUDGETS") or "warn").lower()
+# Development: log statements a single request runs at least this many times (N+1 loops); 0 disables
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD") or 0)
+
+
+# -------------------------------------------------
+# Authentication
+# -------------------------------------------------
+# "stateless": the user's claims (role, is_active, is_approved_lister, token version)
+# travel in the JWT and revocation is checked against a token-version store, so
+# authenticated requests don't query the database. "stateful" keeps the legacy
+# per-request lookup of the user and its active access token.
+AUTH_MODE = (os.getenv("AUTH_MODE") or "stateless").lower()
+# How long (seconds) a worker trusts its cached token version before re-reading it.
+# Set AUTH_REVOCATION_URL (redis://...) to share revocations between workers instantly.
+AUTH_REVOCATION_TTL = int(os.getenv("AUTH_REVOCATION_TTL") or 60)
+AUTH_REVOCATION_MAX_ENTRIES = int(os.getenv("AUTH_REVOCATION_MAX_ENTRIES") or 10000)
+AUTH_REVOCATION_URL = os.getenv("AUTH_REVOCATION_URL")
+# Per-worker cache of the authenticated user row (0 disables it); writes to a user invalidate it.
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL") or 30)
+AUTH_USER_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_USER_CACHE_MAX_ENTRIES") or 5000)
+
+
+# -------------------------------------------------
+# Email outbox
+# -------------------------------------------------
+# Emails are queued in the `email_outbox` table and delivered by a worker (see
+# apps/core/services/email_outbox.py). EMAIL_TRANSPORT is the dotted path of an
+# EmailTransport; by default Resend, or the local stand-in when USE_LOCAL_FALLBACK is set.
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT") or (
+    "apps.core.services.email_outbox.LocalTransport"
+    if AppConfig.get_config().use_local_fallback else "apps.core.services.email_outbox.ResendTransport"
+)
+# Run the worker inside each API process; set to false when it runs on its own
+# (`python -m apps.core.services.email_outbox`).
+EMAIL_OUTBOX_WORKER = os.getenv("EMAIL_OUTBOX_WORKER", "true").lower() == "true"
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS") or 5)
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE") or 20)
+# Failed deliveries are retried after base * 2^(attempt - 1) seconds (capped), then given up
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS") or 8)
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_OUTBOX_RETRY_BASE_SECONDS") or 5)
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_OUTBOX_RETRY_MAX_SECONDS") or 1800)
+# Sent rows (they hold OTP codes) are deleted after this many hours
+EMAIL_OUTBOX_RETENTION_HOURS = int(os.getenv("EMAIL_OUTBOX_RETENTION_HOURS") or 24)
+
+
+# -------------------------------------------------
+# Password hashing pool
+# -------------------------------------------------
+# bcrypt runs on a dedicated thread pool so it never blocks the event loop.
+# Calls beyond workers + queue are rejected with 503 instead of piling up.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS") or (os.cpu_count() or 2))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE") or 64)
+
+
+# -------------------------------------------------
+# Analytics result cache
+# -------------------------------------------------
+# TTLs are in seconds (0 disables caching for that endpoint).
+# Set ANALYTICS_CACHE_URL (redis://...) to share the cache between workers.
+ANALYTICS_DASHBOARD_CACHE_TTL = int(os.getenv("ANALYTICS_DASHBOARD_CACHE_TTL") or 60)
+ANALYTICS_OWNER_CACHE_TTL = int(os.getenv("ANALYTICS_OWNER_CACHE_TTL") or 60)
+ANALYTICS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES") or 512)
+ANALYTICS_CACHE_URL = os.getenv("ANALYTICS_CACHE_URL")
+# Seconds a call to a redis:// cache (analytics, AUTH_REVOCATION_URL) may take before it counts as failed
+CACHE_SOCKET_TIMEOUT = float(os.getenv("CACHE_SOCKET_TIMEOUT") or 0.5)
+
+
+# -------------------------------------------------
+# HTTP caching
+# -------------------------------------------------
+# Cache-Control of the catalog endpoints answering conditional requests (listings, faculty,
+# payment info; see apps/core/http_cache.py). Browsers and CDNs reuse a response for max-age
+# seconds, then revalidate it with If-None-Match / If-Modified-Since and get a 304 if it is unchanged.
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL") or "public, max-age=60, stale-while-revalidate=300"
+
+
+# -------------------------------------------------
+# Geocoding
+# -------------------------------------------------
+# Resolves listing locations to coordinates for proximity search (see apps/core/geocoding.py).
+# GEOCODER is the dotted path of a Geocoder subclass; the default one reads a local
+# `name,latitude,longitude` CSV gazetteer.
+GEOCODER = os.getenv("GEOCODER") or "apps.core.geocoding.GazetteerGeocoder"
+GEOCODER_GAZETTEER_PATH = os.getenv("GEOCODER_GAZETTEER_PATH") or str(BASE_DIR / "data" / "gazetteer.csv")
+
+
 # -------------------------------------------------
 # App Limits
 # -------------------------------------------------
 MAX_FILE_SIZE_MB = 5
 PRODUCTS_LIST_LIMIT = 12
+LISTINGS_PAGE_LIMIT = 50
+LISTINGS_MAX_PAGE_LIMIT = 100
+LISTINGS_DEFAULT_RADIUS_KM = 10
+LISTINGS_MAX_RADIUS_KM = 100
+BOOKINGS_PAGE_LIMIT = 50
+BOOKINGS_MAX_PAGE_LIMIT = 100
+BOOKINGS_EXPORT_BATCH_SIZE = 1000
 
 
@@ -0,0 +1,82 @@
+"""
+Shared fixtures.
+
+Tests that need a database run against ``TEST_DATABASE_URL``: it is emptied and loaded
+with a `bench.seed` dataset once per session, so never point it at a database you want
+to keep. Those tests are skipped when it isn't set.
+
+    TEST_DATABASE_URL=postgresql://localhost/app_test python -m pytest tests
+"""
+
+import asyncio
+import os
+from typing import Dict
+
+import pytest
+import pytest_asyncio
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # Before anything imports config.settings
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.setdefault("EMAIL_OUTBOX_WORKER", "false")
+
+pytest_plugins = ["apps.core.pytest_plugin"]
+
+# Large enough that the planner's choices are the ones production data gets
+TEST_DATASET = {"users": 20_000, "listings": 20_000, "bookings": 200_000, "seed": 1}
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    # One loop for the session: the engine's pooled connections belong to the loop that opened them
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def seeded_database():
+    """The `bench.seed` dataset of `TEST_DATASET`, loaded into ``TEST_DATABASE_URL``"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+    from bench.seed import BenchDataset, seed
+    from config.database import async_engine
+
+    dataset = BenchDataset(**TEST_DATASET)
+    await seed(dataset, reset=True, force=False)
+    yield dataset
+    await async_engine.dispose()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def client(seeded_database):
+    """HTTP client of the app, started up, over the seeded database"""
+    import httpx
+
+    from apps.main import app
+
+    await app.router.startup()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+    finally:
+        await app.router.shutdown()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def tokens(client) -> Dict[str, str]:
+    """Access token of the seeded admin, lister1 and user1, each already in the authenticated-user cache"""
+    from bench import BENCH_EMAIL_DOMAIN, BENCH_PASSWORD
+
+    tokens = {}
+    for name in ("admin", "lister1", "user1"):
+        response = await client.post(
+            "/accounts/login", data={"username": f"{name}@{BENCH_EMAIL_DOMAIN}", "password": BENCH_PASSWORD}
+        )
+        assert response.status_code == 200, response.text
+        tokens[name] = response.json()["access_token"]
+        await client.get("/accounts/me", headers={"Authorization": f"Bearer {tokens[name]}"})
+    return tokens
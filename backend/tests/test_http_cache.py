@@ -0,0 +1,37 @@
+"""
+Validators of the catalog endpoints' conditional requests (see `apps.core.http_cache`), against
+the seeded database (see ``conftest.py``).
+"""
+
+import pytest
+
+OWNER_ID = 2  # lister1, owns listing 1
+
+# A page of the owner's listings, and one of them
+PATHS = [f"/listings/?owner_id={OWNER_ID}", "/listings/1"]
+
+
+@pytest.mark.asyncio
+async def test_owner_profile_change_invalidates_the_listing_etags(client, tokens):
+    etags, last_modified = {}, {}
+    for path in PATHS:
+        response = await client.get(path)
+        assert response.status_code == 200, response.text
+        etags[path] = response.headers["etag"]
+        last_modified[path] = response.headers.get("last-modified")
+        assert (await client.get(path, headers={"If-None-Match": etags[path]})).status_code == 304
+
+    response = await client.put(
+        "/accounts/me", json={"user": {"first_name": "Renamed"}},
+        headers={"Authorization": f"Bearer {tokens['lister1']}"},
+    )
+    assert response.status_code == 200, response.text
+
+    for path in PATHS:
+        response = await client.get(path, headers={"If-None-Match": etags[path]})
+        assert response.status_code == 200, f"{path} still answers 304 after the owner renamed themselves"
+        assert response.headers["etag"] != etags[path]
+        assert response.headers.get("last-modified") is None or response.headers["last-modified"] != last_modified[path]
+        body = response.json()
+        listing = body["listings"][0] if "listings" in body else body
+        assert listing["owner"]["first_name"] == "Renamed"
@@ -0,0 +1,87 @@
+"""
+Declared query budgets of the read routes.
+
+Each case requests a budgeted route of the app against the seeded database (see ``conftest.py``)
+inside the `query_budget` fixture, so a route running more statements than its ``@query_budget``
+fails the request. The budgets are those of a signed-in client whose user is already in the
+per-worker cache (see the `tokens` fixture).
+"""
+
+from typing import Dict, Tuple
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+
+from apps.bookings.models import Booking
+from config.database import AsyncSessionLocal
+
+# (path, signed in as), with the parameters of `path_ids`
+CASES: Dict[str, Tuple[str, str]] = {
+    "bookings: payment info": ("/bookings/payment-info", "user1"),
+    "bookings: user's bookings": ("/bookings/", "user1"),
+    "bookings: owner inbox": ("/bookings/", "lister1"),
+    "bookings: detail": ("/bookings/{booking_id}", "user1"),
+    "bookings: admin list": ("/bookings/admin/all", "admin"),
+    "bookings: admin export": ("/bookings/admin/export?created_from=2100-01-01", "admin"),
+    "bookings: admin settings": ("/bookings/admin/settings", "admin"),
+    "listings: list": ("/listings/", "user1"),
+    "listings: search": ("/listings/search?q=physics+coaching", "user1"),
+    "listings: detail": ("/listings/1", "user1"),
+    "listings: admin list": ("/listings/admin/all", "admin"),
+    "listings: admin details": ("/listings/admin/1/details", "admin"),
+    "accounts: me": ("/accounts/me", "user1"),
+    "accounts: admin user details": ("/accounts/admin/users/{user_id}/details", "admin"),
+    "analytics: dashboard": ("/analytics/dashboard", "admin"),
+    "analytics: owner": ("/analytics/owner", "lister1"),
+    "analytics: cache": ("/analytics/cache", "admin"),
+    "analytics: queries": ("/analytics/queries", "admin"),
+}
+
+
+@pytest_asyncio.fixture(scope="session")
+async def booking_counts(seeded_database) -> Dict[int, int]:
+    """Number of bookings of each user who has any"""
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(select(Booking.user_id, func.count()).group_by(Booking.user_id))
+        return dict(rows.all())
+
+
+@pytest_asyncio.fixture(scope="session")
+async def path_ids(client, tokens, booking_counts) -> Dict[str, int]:
+    """Values of the cases' path parameters"""
+    me = await client.get("/accounts/me", headers={"Authorization": f"Bearer {tokens['user1']}"})
+    async with AsyncSessionLocal() as db:
+        booking_id = await db.scalar(select(Booking.id).where(Booking.user_id == me.json()["user"]["id"]).limit(1))
+    return {"booking_id": booking_id, "user_id": max(booking_counts, key=booking_counts.get)}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", CASES)
+async def test_route_keeps_its_query_budget(client, tokens, path_ids, query_budget, name):
+    path, signed_in_as = CASES[name]
+    with query_budget(100):  # in raise mode the route's own, smaller budget fails the request
+        response = await client.get(
+            path.format(**path_ids), headers={"Authorization": f"Bearer {tokens[signed_in_as]}"}
+        )
+    assert response.status_code == 200, f"{name}: {response.status_code} {response.text}"
+
+
+@pytest.mark.asyncio
+async def test_user_details_runs_the_same_queries_for_any_number_of_bookings(client, tokens, booking_counts,
+                                                                            query_budget):
+    by_count = sorted(booking_counts, key=booking_counts.get)
+    few, many = by_count[0], by_count[-1]
+    assert booking_counts[few] < booking_counts[many]
+
+    statements = {}
+    for user_id in (few, many):
+        with query_budget(50) as counter:
+            response = await client.get(
+                f"/accounts/admin/users/{user_id}/details", headers={"Authorization": f"Bearer {tokens['admin']}"}
+            )
+        assert response.status_code == 200, response.text
+        assert len(response.json()["bookings"]) == booking_counts[user_id]
+        statements[user_id] = counter.count
+
+    assert statements[few] == statements[many], f"queries grow with the bookings: {statements}"
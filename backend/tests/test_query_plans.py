@@ -0,0 +1,116 @@
+"""
+Index coverage of the services' read queries.
+
+Each case runs a service read path against the seeded database (see ``conftest.py``), records
+the SELECT statements it sends and EXPLAINs them with the planner at its default settings.
+A ``Seq Scan`` of one of `LARGE_TABLES` fails the case, unless the case reports on every row
+of that table (`FULL_READS`).
+"""
+
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.accounts.models import UserVerification
+from apps.accounts.services.user import UserManager
+from apps.bookings.schemas import BookingAdminFilters, PaymentStatus
+from apps.bookings.services import BookingService
+from apps.core.analytics import AnalyticsService
+from apps.faculty.models import Faculty
+from apps.listings.services import ListingService
+from bench import BENCH_EMAIL_DOMAIN
+from config.database import AsyncSessionLocal, async_engine
+
+Case = Callable[[AsyncSession], Awaitable[Any]]
+
+LARGE_TABLES = {"bookings", "faculty", "listings", "users", "users_verifications"}
+
+OWNER_ID = 2  # first lister, owns listing 1
+USER_ID = 5_000  # a regular user (ids above the listers')
+
+# Service read paths, as the routers call them
+CASES: Dict[str, Case] = {
+    "listings: newest": lambda db: ListingService(db).list_listings(),
+    "listings: by type, cheapest": lambda db: ListingService(db).list_listings(listing_type="pg", sort="price"),
+    "listings: by owner": lambda db: ListingService(db).list_listings(owner_id=OWNER_ID),
+    "listings: by features": lambda db: ListingService(db).list_listings(features=["wifi"]),
+    "listings: by location": lambda db: ListingService(db).list_listings(location="delhi"),
+    "listings: search": lambda db: ListingService(db).search_listings("physics coaching"),
+    "listings: nearby": lambda db: ListingService(db).nearby_listings(28.61, 77.21, 10),
+    "listings: detail": lambda db: ListingService(db).get_listing(1),
+    "listings: detail version": lambda db: ListingService(db).listing_version(1),
+    "listings: admin list": lambda db: ListingService(db).get_all_listings_admin(),
+    "bookings: user's bookings": lambda db: BookingService(db).list_bookings(user_id=USER_ID),
+    "bookings: owner inbox": lambda db: BookingService(db).owner_inbox(OWNER_ID),
+    "bookings: owner inbox, pending": lambda db: BookingService(db).owner_inbox(OWNER_ID, statuses=["pending"]),
+    "bookings: admin list": lambda db: BookingService(db).list_bookings_admin(BookingAdminFilters()),
+    "bookings: admin list by status": lambda db: BookingService(db).list_bookings_admin(
+        BookingAdminFilters(statuses=["accepted"])
+    ),
+    "bookings: admin payment queue": lambda db: BookingService(db).list_bookings_admin(
+        BookingAdminFilters(payment_statuses=[PaymentStatus.pending])
+    ),
+    "bookings: detail": lambda db: BookingService(db).get_booking(1),
+    "analytics: dashboard": lambda db: AnalyticsService(db).dashboard("month"),
+    "analytics: owner": lambda db: AnalyticsService(db).owner(OWNER_ID, "month", include_listings=True),
+    "accounts: user by email": lambda db: UserManager.get_user(email=f"user1@{BENCH_EMAIL_DOMAIN}"),
+    "accounts: verification": lambda db: UserVerification.afirst(UserVerification.user_id == USER_ID),
+    "faculty: by listing": lambda db: db.execute(select(Faculty).where(Faculty.listing_id == 1)),
+}
+
+# Tables a case reports on in full (platform totals, the admin's list of every listing)
+FULL_READS: Dict[str, Set[str]] = {
+    "analytics: dashboard": {"users", "listings"},
+    "listings: admin list": {"users", "listings"},
+}
+
+
+async def capture(session: AsyncSession, case: Case) -> List[Tuple[str, Any]]:
+    """Run ``case`` and return the (statement, parameters) of every SELECT it sent"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        await case(session)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+        await session.rollback()
+    return statements
+
+
+async def explain(statement: str, parameters: Any) -> Dict[str, Any]:
+    async with async_engine.connect() as conn:
+        plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def seq_scans(plan: Dict[str, Any]) -> List[str]:
+    """Tables read by a sequential scan anywhere in the plan"""
+    tables = [plan["Relation Name"]] if plan.get("Node Type") == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        tables.extend(seq_scans(child))
+    return tables
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", CASES)
+async def test_no_sequential_scan_on_large_tables(seeded_database, name):
+    async with AsyncSessionLocal() as session:
+        statements = await capture(session, CASES[name])
+    assert statements, f"{name} sent no SELECT"
+
+    for statement, parameters in statements:
+        plan = await explain(statement, parameters)
+        scanned = set(seq_scans(plan)) & LARGE_TABLES - FULL_READS.get(name, set())
+        assert not scanned, (
+            f"{name}: sequential scan on {', '.join(sorted(scanned))}\n{statement}\n{json.dumps(plan, indent=2)}"
+        )
@@ -0,0 +1,141 @@
+import io
+import os
+
+import httpx
+import pytest
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from PIL import Image
+
+from apps.core.services.uploads import LocalBackend, UploadLimitMiddleware, UploadService
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    backend = LocalBackend(root=str(tmp_path), base_url="/media/")
+    monkeypatch.setattr(UploadService, "_backend", backend)
+    return backend
+
+
+def image_upload(width: int = 640, height: int = 480, image_format: str = "PNG") -> UploadFile:
+    data = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 80, 40)).save(data, image_format)
+    data.seek(0)
+    return UploadFile(file=data, filename=f"photo.{image_format.lower()}", size=len(data.getvalue()))
+
+
+def stored_path(backend: LocalBackend, url: str) -> str:
+    return os.path.join(backend.root, url.removeprefix(backend.base_url + "/"))
+
+
+@pytest.mark.asyncio
+async def test_upload_image_stores_the_file(backend):
+    upload = image_upload()
+    result = await UploadService.upload_image(upload, folder="tests/listings/1")
+
+    assert result["format"] == "png"
+    assert result["public_id"].startswith("tests/listings/1/")
+    assert result["url"] == f"/media/{result['public_id']}.png"
+    with open(stored_path(backend, result["url"]), "rb") as stored:
+        assert stored.read() == upload.file.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_upload_image_stores_derivatives(backend):
+    result = await UploadService.upload_image(image_upload(width=1200, height=800), folder="tests/listings/1",
+                                              derivatives=True)
+
+    assert result["variants"]
+    for variant in result["variants"]:
+        assert variant["width"] <= 1200
+        assert os.path.exists(stored_path(backend, variant["url"]))
+
+
+@pytest.mark.asyncio
+async def test_upload_image_checks_the_content_not_the_name(backend):
+    data = b"<html>not an image</html>"
+    upload = UploadFile(file=io.BytesIO(data), filename="photo.png", size=len(data))
+    with pytest.raises(HTTPException) as error:
+        await UploadService.upload_image(upload, folder="tests")
+
+    assert error.value.status_code == 400
+    assert not os.listdir(backend.root)
+
+
+@pytest.mark.asyncio
+async def test_upload_image_rejects_large_files(backend):
+    upload = image_upload()
+    upload.size = None  # not announced: the size is counted while reading
+    with pytest.raises(HTTPException) as error:
+        await UploadService.upload_image(upload, folder="tests", max_size_mb=0)
+
+    assert error.value.status_code == 413
+    assert not os.listdir(backend.root)
+
+
+@pytest.mark.asyncio
+async def test_delete_image(backend):
+    result = await UploadService.upload_image(image_upload(), folder="tests")
+
+    assert await UploadService.delete_image(result["public_id"])
+    assert not os.path.exists(stored_path(backend, result["url"]))
+    assert not await UploadService.delete_image(result["public_id"])
+
+
+def limited_app(max_bytes: int, received: list) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        received.append(file.filename)
+        return {"size": file.size}
+
+    app.add_middleware(UploadLimitMiddleware, max_bytes=max_bytes)
+    return app
+
+
+def multipart(size: int) -> bytes:
+    return (b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"photo.png\"\r\n\r\n"
+            + b"x" * size + b"\r\n--b--\r\n")
+
+
+async def post_upload(app: FastAPI, body: bytes, chunk_size: int = 0, sent: list = None) -> httpx.Response:
+    """POST ``body``; with ``chunk_size``, streamed without a Content-Length, recording each chunk in ``sent``"""
+    sent = [] if sent is None else sent
+
+    async def chunks():
+        for start in range(0, len(body), chunk_size):
+            sent.append(start)
+            yield body[start:start + chunk_size]
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.post("/upload", content=chunks() if chunk_size else body,
+                                 headers={"Content-Type": "multipart/form-data; boundary=b"})
+
+
+@pytest.mark.asyncio
+async def test_upload_limit_lets_small_uploads_through():
+    received = []
+    response = await post_upload(limited_app(4096, received), multipart(1000), chunk_size=256)
+
+    assert response.status_code == 200
+    assert response.json() == {"size": 1000}
+    assert received == ["photo.png"]
+
+
+@pytest.mark.asyncio
+async def test_upload_limit_rejects_a_declared_length_without_reading_the_body():
+    received = []
+    response = await post_upload(limited_app(4096, received), multipart(10_000))
+
+    assert response.status_code == 413
+    assert not received
+
+
+@pytest.mark.asyncio
+async def test_upload_limit_stops_reading_a_streamed_body_at_the_limit():
+    received, sent = [], []
+    response = await post_upload(limited_app(4096, received), multipart(10_000_000), chunk_size=1024, sent=sent)
+
+    assert response.status_code == 413
+    assert not received
+    assert len(sent) <= 8  # stopped just past the limit, not at the end of the 10MB body
@@ -35,7 +35,7 @@ const AdminPaymentVerificationPage: React.FC = () => {
     try {
       setLoading(true);
       const data = await BookingsService.getAllBookingsAdmin();
-      setBookings(Array.isArray(data) ? data : []);
+      setBookings(data?.bookings || []);
     } catch (error: any) {
       console.error('Failed to load bookings:', error);
       toast.error('Failed to load bookings');
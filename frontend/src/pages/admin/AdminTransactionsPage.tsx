@@ -65,8 +65,8 @@ const AdminTransactionsPage: React.FC = () => {
   const fetchTransactions = async () => {
     try {
       setLoading(true);
-      const data = await api.get('/bookings/admin/all');
-      setTransactions(data || []);
+      const data = await api.get('/bookings/admin/all?limit=100');
+      setTransactions(data?.bookings || []);
     } catch (error: any) {
       console.error('Error fetching transactions:', error);
       toast.error(error.message || 'Failed to fetch transactions');
@@ -19,7 +19,8 @@ export interface BookingStatusRequest {
 
 export interface BookingsResponse {
   bookings: Booking[];
-  total: number;
+  next_cursor: string | null;
+  total: number | null;
 }
 
 export interface PaymentInfo {
@@ -61,10 +62,10 @@ export class BookingsService {
     });
   }
 
-  static async getAllBookingsAdmin(): Promise<Booking[]> {
-    const response = await api.get('/bookings/admin/all');
-    // Backend returns array directly, not wrapped in object
-    return Array.isArray(response) ? response : [];
+  static async getAllBookingsAdmin(after?: string, limit = 100): Promise<BookingsResponse> {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (after) params.append('after', after);
+    return api.get(`/bookings/admin/all?${params.toString()}`);
   }
 
   static async updateBooking(id: number, data: Partial<BookingCreateRequest>): Promise<Booking> {
@@ -21,18 +21,29 @@ export interface ListingUpdateRequest {
 
 export interface ListingsResponse {
   listings: Listing[];
-  total: number;
+  next_cursor: string | null;
+  total: number | null;
 }
 
 export class ListingsService {
-  static async getListings(type?: string, ownerId?: number): Promise<Listing[]> {
-    const params = new URLSearchParams();
+  static async getListingsPage(type?: string, ownerId?: number, after?: string, limit = 100): Promise<ListingsResponse> {
+    const params = new URLSearchParams({ limit: String(limit) });
     if (type) params.append('type', type);
     if (ownerId) params.append('owner_id', ownerId.toString());
-    
-    const query = params.toString() ? `?${params.toString()}` : '';
-    const response: ListingsResponse = await api.get(`/listings/${query}`);
-    return response.listings;
+    if (after) params.append('after', after);
+    return api.get(`/listings/?${params.toString()}`);
+  }
+
+  // Every matching listing: follows `next_cursor` through the pages
+  static async getListings(type?: string, ownerId?: number): Promise<Listing[]> {
+    const listings: Listing[] = [];
+    let after: string | undefined;
+    do {
+      const page = await ListingsService.getListingsPage(type, ownerId, after);
+      listings.push(...page.listings);
+      after = page.next_cursor ?? undefined;
+    } while (after);
+    return listings;
   }
 
   static async getListing(id: number): Promise<Listing> {